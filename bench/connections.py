@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import grpc
+
+from bench.ingest import MIB, rss_bytes
+from bench.loadgen import wait_ready
+from client.client import subscribe_request
+from device.device import make_reading
+from gen import alert_pb2_grpc
+from gen import device_pb2
+from gen import device_pb2_grpc
+
+MODES = {
+    "default": [],
+    "high-connections": ["--high-connections"],
+    "high-connections+uvloop": ["--high-connections", "--uvloop"],
+}
+
+
+async def open_alert_stream(channel, index):
+    stream = alert_pb2_grpc.AlertServiceStub(channel).StreamAlerts()
+    await stream.write(subscribe_request(f"client{index}", str(index)))
+    await stream.read()
+    return stream
+
+
+async def open_device_stream(channel, index):
+    stream = device_pb2_grpc.DeviceServiceStub(channel).StreamDeviceData()
+    # below every threshold, so the stream stays quiet once opened
+    await stream.write(make_reading(index, device_pb2.SMART_PLUG, 10.0))
+    return stream
+
+
+async def settle(pid):
+    # RSS once it stops moving, so lazily freed buffers don't skew a sample
+    previous = rss_bytes(pid)
+    while True:
+        await asyncio.sleep(0.5)
+        current = rss_bytes(pid)
+        if abs(current - previous) < 64 * 1024:
+            return current
+        previous = current
+
+
+async def run(mode, args):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "server.server", "--port", str(args.port)] + MODES[mode],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        target = f"127.0.0.1:{args.port}"
+        await wait_ready(target, 15)
+        # a subchannel pool per channel, or they would all share one connection
+        options = [("grpc.use_local_subchannel_pool", 1)]
+        channels = [
+            grpc.aio.insecure_channel(target, options=options)
+            for _ in range(args.connections)
+        ]
+        try:
+            for channel in channels:
+                await channel.channel_ready()
+            before = await settle(server.pid)
+            start = time.perf_counter()
+            streams = []
+            for offset in range(0, args.streams, args.connections):
+                opened = [
+                    (open_device_stream if i % 2 else open_alert_stream)(
+                        channels[i % args.connections], i
+                    )
+                    for i in range(offset, min(offset + args.connections, args.streams))
+                ]
+                streams += await asyncio.gather(*opened)
+            elapsed = time.perf_counter() - start
+            after = await settle(server.pid)
+            for stream in streams:
+                stream.cancel()
+        finally:
+            for channel in channels:
+                await channel.close()
+        return before, after, elapsed
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args):
+    print(
+        f"{'mode':>24} {'rss idle MiB':>13} {'rss open MiB':>13}"
+        f" {'KiB/stream':>11} {'opened/s':>9}"
+    )
+    for mode in args.modes:
+        before, after, elapsed = await run(mode, args)
+        per_stream = (after - before) / args.streams / 1024
+        print(
+            f"{mode:>24} {before / MIB:>13.1f} {after / MIB:>13.1f}"
+            f" {per_stream:>11.1f} {args.streams / elapsed:>9,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Server RSS per open stream, default vs --high-connections;"
+        " half the streams are subscribed alert streams, half idle device streams"
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(MODES),
+        default=["default", "high-connections"],
+    )
+    parser.add_argument("--streams", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--port", type=int, default=50131)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import time
+
+from server.server import AlertManager, DeviceService
+
+
+def build(clients, debounce):
+    alert_manager = AlertManager(queue_size=1 << 20)
+    for i in range(clients):
+        alert_manager.subscribe(f"client{i}", "1", alert_manager.new_queue(), debounce)
+    return alert_manager
+
+
+async def breach(service, rate, duration):
+    """Feeds one device above its threshold at ``rate`` alerts per second;
+    returns the seconds spent sending them."""
+    interval = 1 / rate
+    busy = 0.0
+    deadline = time.perf_counter() + duration
+    sequence = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        sequence += 1
+        await service.send_alert_to_subscribers(
+            1, f"Alert! Value = {sequence}", str(sequence), value=float(sequence)
+        )
+        busy += time.perf_counter() - start
+        await asyncio.sleep(interval)
+    return busy, sequence
+
+
+async def main(args):
+    print(
+        f"{'debounce ms':>12} {'alerts':>8} {'messages':>9} {'per client/s':>13}"
+        f" {'send us/alert':>14}"
+    )
+    for debounce_ms in args.debounce_ms:
+        alert_manager = build(args.clients, debounce_ms / 1000)
+        service = DeviceService(alert_manager)
+        busy, alerts = await breach(service, args.rate, args.duration)
+        # let the last windows close so their summaries are counted
+        await asyncio.sleep(debounce_ms / 1000 * 2)
+        messages = sum(queue.enqueued for queue in alert_manager.queues.values())
+        per_client = messages / args.clients / args.duration
+        print(
+            f"{debounce_ms:>12} {alerts:>8} {messages:>9,} {per_client:>13.1f}"
+            f" {busy / alerts * 1e6:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Messages sent to subscribers of a device in sustained breach,"
+        " immediate vs debounced delivery"
+    )
+    parser.add_argument("--debounce-ms", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=100, help="alerts per second")
+    parser.add_argument("--duration", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
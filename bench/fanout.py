@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import random
+import time
+
+from server.server import AlertManager, DeviceService
+
+
+# the pre-index fan-out: scan every client's subscription set per alert
+async def linear_fanout(alert_manager, device_id, message, timestamp):
+    device_id_str = str(device_id)
+    for client_id, subscribed_devices in alert_manager.subscriptions.items():
+        if device_id_str in subscribed_devices:
+            queue = alert_manager.queues.get(client_id)
+            if queue is not None:
+                queue.put_alert(device_id_str, (device_id_str, message, timestamp))
+
+
+def build(clients, devices, per_client):
+    alert_manager = AlertManager()
+    rng = random.Random(0)
+    for i in range(clients):
+        queue = alert_manager.new_queue()
+        for device_id in rng.sample(range(1, devices + 1), per_client):
+            alert_manager.subscribe(f"client{i}", str(device_id), queue)
+    return alert_manager
+
+
+def drain(alert_manager):
+    for queue in alert_manager.queues.values():
+        queue.clear()
+
+
+async def time_alerts(fanout, alert_manager, devices, alerts):
+    rng = random.Random(1)
+    device_ids = [rng.randint(1, devices) for _ in range(alerts)]
+    start = time.perf_counter()
+    for device_id in device_ids:
+        await fanout(device_id, "Alert! Value = 70.0", "")
+    elapsed = time.perf_counter() - start
+    drain(alert_manager)
+    return elapsed / alerts * 1e6
+
+
+async def main(args):
+    print(f"{'clients':>8} {'linear us/alert':>16} {'indexed us/alert':>17}")
+    for clients in args.clients:
+        alert_manager = build(clients, args.devices, args.per_client)
+        service = DeviceService(alert_manager)
+
+        async def linear(device_id, message, timestamp):
+            await linear_fanout(alert_manager, device_id, message, timestamp)
+
+        linear_us = await time_alerts(linear, alert_manager, args.devices, args.alerts)
+        indexed_us = await time_alerts(
+            service.send_alert_to_subscribers, alert_manager, args.devices, args.alerts
+        )
+        print(f"{clients:>8} {linear_us:>16.2f} {indexed_us:>17.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Alert fan-out latency as the client count grows"
+    )
+    parser.add_argument(
+        "--clients", type=int, nargs="+", default=[100, 1000, 10000, 50000]
+    )
+    parser.add_argument("--devices", type=int, default=5000)
+    parser.add_argument("--per-client", type=int, default=5)
+    parser.add_argument("--alerts", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
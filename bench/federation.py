@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import grpc
+
+from bench.loadgen import percentile, wait_ready
+from client.client import bulk_subscribe_request
+from device.device import make_reading
+from gen import alert_pb2_grpc
+from gen import device_pb2
+from gen import device_pb2_grpc
+from server.federation import HashRing
+
+
+def start_nodes(nodes, port):
+    ports = [port + i for i in range(nodes)]
+    addresses = [f"127.0.0.1:{p}" for p in ports]
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "server.server", "--port", str(p)]
+            + ["--history-size", "0", "--peers"]
+            + [a for a in addresses if a != address],
+            stdout=subprocess.DEVNULL,
+        )
+        for p, address in zip(ports, addresses)
+    ]
+    return addresses, processes
+
+
+def cases(addresses, devices):
+    """Devices, and the node their readings are sent to, for a subscriber on
+    the first node: owned and sent there, owned by a peer and sent to it,
+    and owned by a peer but sent to a third node."""
+    ring = HashRing(addresses)
+    subscriber, owner = addresses[0], addresses[1]
+    entry = addresses[-1]
+    local = [i for i in range(1, devices * 10) if ring.owner(i) == subscriber]
+    remote = [i for i in range(1, devices * 10) if ring.owner(i) == owner]
+    yield "local", subscriber, local[:devices]
+    yield "1 hop", owner, remote[:devices]
+    if entry != owner:
+        yield "2 hops", entry, remote[devices : devices * 2]
+
+
+async def measure(subscriber, target, device_ids, args):
+    latencies = []
+    async with grpc.aio.insecure_channel(subscriber) as channel:
+        alerts = alert_pb2_grpc.AlertServiceStub(channel).StreamAlerts()
+        await alerts.write(
+            bulk_subscribe_request("bench", [str(i) for i in device_ids])
+        )
+        await alerts.read()
+        # interest reaches the owners over their links
+        await asyncio.sleep(0.5)
+
+        async def receive(expected):
+            while len(latencies) < expected:
+                response = await alerts.read()
+                latencies.append(time.time_ns() - response.alert.timestamp_unix_nanos)
+
+        expected = int(args.rate * args.duration)
+        receiver = asyncio.create_task(receive(expected))
+        async with grpc.aio.insecure_channel(target) as device_channel:
+            stream = device_pb2_grpc.DeviceServiceStub(
+                device_channel
+            ).StreamDeviceData()
+            interval = 1 / args.rate
+            start = time.perf_counter()
+            for n in range(expected):
+                # paced against the schedule, so slow sends don't lower the rate
+                delay = start + n * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                device_id = device_ids[n % len(device_ids)]
+                await stream.write(
+                    make_reading(device_id, device_pb2.THERMOMETER, 80.0)
+                )
+            await stream.done_writing()
+            await stream
+        try:
+            await asyncio.wait_for(receiver, 5)
+        except asyncio.TimeoutError:
+            pass
+        alerts.cancel()
+    return sorted(latencies), expected
+
+
+async def main(args):
+    addresses, processes = start_nodes(args.nodes, args.port)
+    try:
+        for address in addresses:
+            await wait_ready(address, 15)
+        # let every node open its links to the others
+        await asyncio.sleep(1)
+        print(
+            f"{'path':>8} {'alerts':>8} {'lost':>6} {'p50 ms':>8} {'p99 ms':>8}"
+            f" {'max ms':>8}"
+        )
+        for name, target, device_ids in cases(addresses, args.devices):
+            latencies, expected = await measure(addresses[0], target, device_ids, args)
+            print(
+                f"{name:>8} {len(latencies):>8} {expected - len(latencies):>6}"
+                f" {percentile(latencies, 0.5):>8.2f}"
+                f" {percentile(latencies, 0.99):>8.2f}"
+                f" {percentile(latencies, 1.0):>8.2f}"
+            )
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Alert latency across federated nodes: subscriber on the"
+        " device's owner, on another node, and readings entering a third node"
+    )
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--rate", type=int, default=1000, help="readings per second")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--port", type=int, default=50141)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import gzip
+import random
+import subprocess
+import sys
+import time
+
+import grpc
+
+from bench.loadgen import wait_ready
+from device.device import make_reading
+from device.gateway import Gateway
+from gen import device_pb2
+from gen import device_pb2_grpc
+
+
+def make_readings(count, devices):
+    rng = random.Random(0)
+    return [
+        (rng.randrange(devices), device_pb2.THERMOMETER, 60 + rng.random() * 5)
+        for _ in range(count)
+    ]
+
+
+async def per_message(target, readings):
+    # what device.py did before the gateway: one Data message per write
+    async with grpc.aio.insecure_channel(target) as channel:
+        stream = device_pb2_grpc.DeviceServiceStub(channel).StreamDeviceData()
+        for device_id, device_type, value in readings:
+            await stream.write(make_reading(device_id, device_type, value))
+        await stream.done_writing()
+        await stream
+    return len(make_reading(*readings[0]).SerializeToString()) + 5
+
+
+async def batched(target, readings, batch_size, compression):
+    gateway = Gateway(target, batch_size=batch_size, compression=compression)
+    gateway.start()
+    for i, (device_id, device_type, value) in enumerate(readings):
+        gateway.submit(device_id, device_type, value)
+        if i % batch_size == batch_size - 1:
+            # lets the sender drain, as sensors reporting over time would
+            await asyncio.sleep(0)
+    await gateway.close()
+
+    sample = device_pb2.DataBatch()
+    for device_id, device_type, value in readings[:batch_size]:
+        sample.device_ids.append(device_id)
+        sample.device_types.append(device_type)
+        sample.values.append(value)
+        sample.timestamps_unix_nanos.append(time.time_ns())
+    payload = sample.SerializeToString()
+    if compression == "gzip":
+        payload = gzip.compress(payload)
+    return (len(payload) + 5) / batch_size
+
+
+async def main(args):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "server.server", "--port", str(args.port)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        target = f"127.0.0.1:{args.port}"
+        await wait_ready(target, 15)
+        readings = make_readings(args.readings, args.devices)
+        print(f"{'mode':>22} {'readings/s':>12} {'wire bytes/reading':>19}")
+        start = time.perf_counter()
+        size = await per_message(target, readings)
+        rate = args.readings / (time.perf_counter() - start)
+        print(f"{'per-message':>22} {rate:>12,.0f} {size:>19.1f}")
+        for compression in args.compression:
+            for batch_size in args.batch_sizes:
+                start = time.perf_counter()
+                size = await batched(target, readings, batch_size, compression)
+                rate = args.readings / (time.perf_counter() - start)
+                name = f"batch {batch_size} {compression}"
+                print(f"{name:>22} {rate:>12,.0f} {size:>19.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gateway ingest throughput, per-message writes vs batches"
+    )
+    parser.add_argument("--readings", type=int, default=100000)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 500])
+    parser.add_argument(
+        "--compression", nargs="+", choices=["none", "gzip"], default=["none", "gzip"]
+    )
+    parser.add_argument("--port", type=int, default=50111)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import grpc
+
+from bench.loadgen import wait_ready
+from gen import device_pb2
+
+MIB = 1024 * 1024
+
+
+def rss_bytes(pid):
+    with open(f"/proc/{pid}/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def make_batch(size):
+    return device_pb2.DataBatch(
+        device_ids=[i % 1000 for i in range(size)],
+        device_types=[device_pb2.THERMOMETER] * size,
+        values=[60.0 + i % 10 for i in range(size)],
+        timestamps_unix_nanos=[time.time_ns()] * size,
+    )
+
+
+async def flood_batches(channel, payload, stop):
+    # writes as fast as the transport takes them; nothing tells the producer
+    # how far behind the server is
+    stream = channel.stream_unary(
+        "/DeviceService/StreamDeviceBatches",
+        response_deserializer=device_pb2.Response.FromString,
+    )()
+    while not stop.is_set():
+        await stream.write(payload)
+    await stream.done_writing()
+    await stream
+
+
+async def flood_ingest(channel, payload, stop):
+    # pre-encoded batch field; only the sequence number changes per request
+    batch_field = device_pb2.IngestRequest(
+        batch=device_pb2.DataBatch.FromString(payload)
+    ).SerializeToString()
+    stream = channel.stream_stream(
+        "/DeviceService/StreamIngest",
+        response_deserializer=device_pb2.IngestResponse.FromString,
+    )()
+    limit = 0
+    granted = asyncio.Event()
+
+    async def read_acks():
+        nonlocal limit
+        async for response in stream:
+            limit = response.acked_sequence + response.credits
+            granted.set()
+
+    acks = asyncio.create_task(read_acks())
+    sequence = 0
+    while not stop.is_set():
+        while sequence >= limit:
+            granted.clear()
+            await granted.wait()
+        sequence += 1
+        await stream.write(
+            device_pb2.IngestRequest(sequence=sequence).SerializeToString()
+            + batch_field
+        )
+    await stream.done_writing()
+    await acks
+
+
+async def run(mode, args):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "server.server", "--port", str(args.port)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        target = f"127.0.0.1:{args.port}"
+        await wait_ready(target, 15)
+        payload = make_batch(args.batch).SerializeToString()
+        flood = flood_ingest if mode == "ingest" else flood_batches
+        stop = asyncio.Event()
+        async with grpc.aio.insecure_channel(target) as channel:
+            producers = [
+                asyncio.create_task(flood(channel, payload, stop))
+                for _ in range(args.streams)
+            ]
+            samples = []
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.duration:
+                await asyncio.sleep(0.25)
+                samples.append(rss_bytes(server.pid))
+            stop.set()
+            stopped = time.perf_counter()
+            await asyncio.gather(*producers)
+            # how long the server kept working through readings it had
+            # accepted but not yet processed
+            drain = time.perf_counter() - stopped
+        return samples, drain
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args):
+    print(
+        f"{'rpc':>20} {'rss start MiB':>14} {'rss max MiB':>12} {'growth MiB':>11}"
+        f" {'drain s':>8}"
+    )
+    bounded = True
+    for mode in args.modes:
+        samples, drain = await run(mode, args)
+        third = max(1, len(samples) // 3)
+        growth = max(samples[-third:]) - max(samples[:third])
+        name = "StreamIngest" if mode == "ingest" else "StreamDeviceBatches"
+        print(
+            f"{name:>20} {samples[0] / MIB:>14.1f} {max(samples) / MIB:>12.1f}"
+            f" {growth / MIB:>11.1f} {drain:>8.2f}"
+        )
+        if mode == "ingest" and growth > args.max_growth * MIB:
+            bounded = False
+            print(f"StreamIngest RSS kept growing, past {args.max_growth} MiB")
+    sys.exit(0 if bounded else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Server memory under a producer overload, with and without"
+        " credit-based flow control; exits 1 if StreamIngest memory keeps growing"
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["batches", "ingest"],
+        default=["batches", "ingest"],
+    )
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=8,
+        help="MiB the server's RSS may grow between the first and last third",
+    )
+    parser.add_argument("--port", type=int, default=50121)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import grpc
+
+from client.client import subscribe_request
+from device.device import make_reading
+from gen import alert_pb2_grpc
+from gen import device_pb2
+from gen import device_pb2_grpc
+
+DEVICE_TYPES = {
+    "thermometer": device_pb2.THERMOMETER,
+    "smart_plug": device_pb2.SMART_PLUG,
+    "motion": device_pb2.MOTION_SENSOR,
+}
+# value ranges of the device.py simulators, and the server's default thresholds
+SIM_RANGES = {
+    device_pb2.THERMOMETER: (60.0, 90.0),
+    device_pb2.SMART_PLUG: (0.0, 1500.0),
+}
+THRESHOLDS = {device_pb2.THERMOMETER: 65.0, device_pb2.SMART_PLUG: 200.0}
+VALUE_POOL = 4096
+
+
+class Recorder:
+    def __init__(self):
+        self.window = None
+        self.sent = 0
+        self.received = 0
+        self.latencies = []
+
+    def in_window(self, sent_ns):
+        return self.window is not None and self.window[0] <= sent_ns < self.window[1]
+
+    def record_send(self, sent_ns):
+        if self.in_window(sent_ns):
+            self.sent += 1
+
+    def record_alert(self, sent_ns, received_ns):
+        if self.in_window(sent_ns):
+            self.received += 1
+            self.latencies.append(received_ns - sent_ns)
+
+
+def value_pool(rng, device_type, args):
+    values = []
+    for _ in range(VALUE_POOL):
+        if device_type == device_pb2.MOTION_SENSOR:
+            values.append(rng.random() < 0.5)
+        elif args.distribution == "sim":
+            values.append(rng.uniform(*SIM_RANGES[device_type]))
+        else:
+            threshold = THRESHOLDS[device_type]
+            over = rng.random() < args.alert_fraction
+            values.append(threshold * (1.5 if over else 0.5))
+    return values
+
+
+async def device_stream(stub, devices, rate, pools, recorder, stop):
+    stream = stub.StreamDeviceData()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    sent = 0
+    while not stop.is_set():
+        due = int((loop.time() - start) * rate) - sent
+        for i in range(sent, sent + due):
+            device_id, device_type = devices[i % len(devices)]
+            value = pools[device_type][i % VALUE_POOL]
+            sent_ns = time.time_ns()
+            # the send time rides in the timestamp and comes back on the alert
+            await stream.write(make_reading(device_id, device_type, value, sent_ns))
+            recorder.record_send(sent_ns)
+        sent += due
+        await asyncio.sleep(0.005)
+    await stream.done_writing()
+    await stream
+
+
+async def subscriber(stub, client_id, device_ids, recorder, ready):
+    stream = stub.StreamAlerts()
+    for device_id in device_ids:
+        await stream.write(subscribe_request(client_id, str(device_id)))
+    acks = 0
+    async for response in stream:
+        if response.HasField("alert"):
+            recorder.record_alert(response.alert.timestamp_unix_nanos, time.time_ns())
+        else:
+            acks += 1
+            if acks == len(device_ids):
+                ready.set()
+
+
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] / 1e6
+
+
+async def run_load(args, target):
+    rng = random.Random(args.seed)
+    types = [DEVICE_TYPES[name] for name in args.types]
+    devices = [(i, types[i % len(types)]) for i in range(1, args.devices + 1)]
+    pools = {t: value_pool(rng, t, args) for t in types}
+    recorder = Recorder()
+
+    async with grpc.aio.insecure_channel(target) as channel:
+        alert_stub = alert_pb2_grpc.AlertServiceStub(channel)
+        device_stub = device_pb2_grpc.DeviceServiceStub(channel)
+
+        readies = []
+        subscribers = []
+        for i in range(args.subscribers):
+            ready = asyncio.Event()
+            device_ids = rng.sample(range(1, args.devices + 1), args.fan_in)
+            readies.append(ready)
+            subscribers.append(
+                asyncio.create_task(
+                    subscriber(alert_stub, f"bench{i}", device_ids, recorder, ready)
+                )
+            )
+        await asyncio.gather(*(ready.wait() for ready in readies))
+
+        stop = asyncio.Event()
+        per_stream = [devices[i :: args.streams] for i in range(args.streams)]
+        streams = [
+            asyncio.create_task(
+                device_stream(
+                    device_stub,
+                    chunk,
+                    len(chunk) * args.rate,
+                    pools,
+                    recorder,
+                    stop,
+                )
+            )
+            for chunk in per_stream
+            if chunk
+        ]
+
+        await asyncio.sleep(args.warmup)
+        start_ns = time.time_ns()
+        recorder.window = (start_ns, start_ns + int(args.duration * 1e9))
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*streams)
+        # let alerts sent inside the window finish arriving
+        await asyncio.sleep(args.drain)
+        for task in subscribers:
+            task.cancel()
+        await asyncio.gather(*subscribers, return_exceptions=True)
+
+    latencies = sorted(recorder.latencies)
+    return {
+        "target_ingest_per_s": args.devices * args.rate,
+        "ingest_per_s": recorder.sent / args.duration,
+        "alerts_per_s": recorder.received / args.duration,
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "p999_ms": percentile(latencies, 0.999),
+    }
+
+
+async def wait_ready(target, timeout):
+    async with grpc.aio.insecure_channel(target) as channel:
+        await asyncio.wait_for(channel.channel_ready(), timeout)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report(result, baseline=None):
+    print(
+        f"{'metric':>20} {'value':>14}"
+        + (f" {'baseline':>14} {'change':>8}" if baseline else "")
+    )
+    for key in (
+        "target_ingest_per_s",
+        "ingest_per_s",
+        "alerts_per_s",
+        "p50_ms",
+        "p99_ms",
+        "p999_ms",
+    ):
+        line = f"{key:>20} {result[key]:>14,.2f}"
+        if baseline:
+            before = baseline["results"][key]
+            change = (result[key] - before) / before * 100 if before else 0.0
+            line += f" {before:>14,.2f} {change:>+7.1f}%"
+        print(line)
+
+
+async def main(args):
+    server = None
+    target = args.target
+    if target is None:
+        target = f"127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "server.server", "--port", str(args.port)]
+            + args.server_arg,
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        await wait_ready(target, 15)
+        result = await run_load(args, target)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(result, baseline)
+
+    if args.json:
+        config = vars(args).copy()
+        for key in ("json", "compare", "target", "port"):
+            config.pop(key)
+        with open(args.json, "w") as f:
+            json.dump(
+                {"revision": git_revision(), "config": config, "results": result},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="End-to-end load test: devices -> server -> subscribers"
+    )
+    parser.add_argument("--target", help="use a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=50061)
+    parser.add_argument(
+        "--server-arg",
+        action="append",
+        default=[],
+        help="extra flag for the started server, e.g. --server-arg=--queue-size=64",
+    )
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument(
+        "--rate", type=float, default=10.0, help="readings/s per device"
+    )
+    parser.add_argument("--streams", type=int, default=4, help="device gRPC streams")
+    parser.add_argument(
+        "--types", nargs="+", choices=DEVICE_TYPES, default=list(DEVICE_TYPES)
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=("sim", "fraction"),
+        default="fraction",
+        help="sim: device.py value ranges; fraction: --alert-fraction over threshold",
+    )
+    parser.add_argument("--alert-fraction", type=float, default=0.1)
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument("--fan-in", type=int, default=10, help="devices per subscriber")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--drain", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results and config to this file")
+    parser.add_argument("--compare", help="results file from an earlier run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+import argparse
+import random
+import time
+
+from gen import device_pb2
+from server.patterns import PREFIX, RANGE, TYPE, PatternIndex
+
+
+def build(count, rng):
+    # a mix of id ranges, prefixes and type patterns; ranges narrow as their
+    # number grows, so an alert matches about one pattern whatever the total
+    index = PatternIndex()
+    width = 30_000_000 // count
+    for client in range(count):
+        kind = client % 3
+        if kind == 0:
+            first = rng.randrange(10_000_000)
+            index.add((RANGE, first, first + width), client)
+        elif kind == 1:
+            index.add((PREFIX, str(rng.randrange(1_000_000, 10_000_000))), client)
+        else:
+            index.add((TYPE, device_pb2.SMART_PLUG), client)
+    return index
+
+
+def churn(index, device_ids, count, rng):
+    """Alerts/s while, between every two alerts, one client unsubscribes
+    from its range and another subscribes to a new one."""
+    width = 30_000_000 // count
+    ranges = [
+        (pattern, client)
+        for pattern, clients in index.clients.items()
+        if pattern[0] == RANGE
+        for client in clients
+    ]
+    start = time.perf_counter()
+    for i, device_id in enumerate(device_ids):
+        slot = i % len(ranges)
+        index.remove(*ranges[slot])
+        first = rng.randrange(10_000_000)
+        ranges[slot] = ((RANGE, first, first + width), count + i)
+        index.add(*ranges[slot])
+        index.match(device_id, device_pb2.THERMOMETER)
+    return len(device_ids) / (time.perf_counter() - start)
+
+
+def main(args):
+    rng = random.Random(0)
+    device_ids = [str(rng.randrange(10_000_000)) for _ in range(args.alerts)]
+    print(
+        f"{'patterns':>9} {'matches/alert':>14} {'alerts/s':>12}"
+        f" {'with churn/s':>13}"
+    )
+    for count in args.patterns:
+        index = build(count, rng)
+        matched = 0
+        start = time.perf_counter()
+        for device_id in device_ids:
+            matched += len(index.match(device_id, device_pb2.THERMOMETER))
+        elapsed = time.perf_counter() - start
+        churned = churn(index, device_ids, count, rng)
+        print(
+            f"{count:>9} {matched / args.alerts:>14.2f} {args.alerts / elapsed:>12,.0f}"
+            f" {churned:>13,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pattern matching cost per alert as the pattern count grows"
+    )
+    parser.add_argument(
+        "--patterns", type=int, nargs="+", default=[1000, 10000, 100000, 1000000]
+    )
+    parser.add_argument("--alerts", type=int, default=100000)
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import grpc
+
+from bench.loadgen import wait_ready
+from client.client import bulk_subscribe_request, subscribe_request
+from device.device import make_reading
+from gen import alert_pb2_grpc
+from gen import device_pb2
+from gen import device_pb2_grpc
+
+
+async def feed(stub, device_id, stop):
+    # keeps one device, the last one subscribed, above its threshold
+    stream = stub.StreamDeviceData()
+    reading = make_reading(device_id, device_pb2.THERMOMETER, 100.0)
+    while not stop.is_set():
+        await stream.write(reading)
+        await asyncio.sleep(0.001)
+    await stream.done_writing()
+    await stream
+
+
+async def reconnect(stub, client_id, device_ids, bulk):
+    """Seconds until every subscription is acknowledged and until the first
+    alert arrives, measured from opening the stream."""
+    start = time.perf_counter()
+    stream = stub.StreamAlerts()
+    if bulk:
+        await stream.write(bulk_subscribe_request(client_id, device_ids))
+        expected_acks = 1
+    else:
+        for device_id in device_ids:
+            await stream.write(subscribe_request(client_id, device_id))
+        expected_acks = len(device_ids)
+
+    acks = 0
+    acked = None
+    async for response in stream:
+        if response.HasField("ack"):
+            acks += 1
+            if acks == expected_acks:
+                acked = time.perf_counter() - start
+        elif acked is not None:
+            first_alert = time.perf_counter() - start
+            break
+    stream.cancel()
+    return acked, first_alert
+
+
+async def main(args):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "server.server", "--port", str(args.port)],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        target = f"127.0.0.1:{args.port}"
+        await wait_ready(target, 15)
+        device_ids = [str(i) for i in range(1, args.subscriptions + 1)]
+        async with grpc.aio.insecure_channel(target) as channel:
+            stop = asyncio.Event()
+            feeder = asyncio.create_task(
+                feed(
+                    device_pb2_grpc.DeviceServiceStub(channel),
+                    args.subscriptions,
+                    stop,
+                )
+            )
+            stub = alert_pb2_grpc.AlertServiceStub(channel)
+            print(f"{'mode':>12} {'all acked ms':>13} {'first alert ms':>15}")
+            for bulk in (False, True):
+                results = [
+                    await reconnect(stub, f"bench-{bulk}-{i}", device_ids, bulk)
+                    for i in range(args.repeat)
+                ]
+                acked = min(result[0] for result in results) * 1000
+                first_alert = min(result[1] for result in results) * 1000
+                name = "bulk" if bulk else "per-device"
+                print(f"{name:>12} {acked:>13,.1f} {first_alert:>15,.1f}")
+            stop.set()
+            await feeder
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Reconnect-to-first-alert time, per-device vs bulk subscribe"
+    )
+    parser.add_argument("--subscriptions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N")
+    parser.add_argument("--port", type=int, default=50101)
+    asyncio.run(main(parser.parse_args()))
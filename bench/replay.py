@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import grpc
+
+from bench.loadgen import wait_ready
+from gen import device_pb2
+from server.recorder import BATCH, DATA, INGEST, records, segment_paths
+
+
+def load(directory, limit):
+    """Recorded readings as the bytes to send: Data messages, and batches.
+    StreamIngest batches are sent as DataBatch, since their sequence numbers
+    belonged to the recorded streams."""
+    data, batches = [], []
+    readings = 0
+    for path in segment_paths(directory):
+        with open(path, "rb") as f:
+            buffer = f.read()
+        for kind, payload in records(buffer):
+            if kind == DATA:
+                data.append(payload)
+                readings += 1
+            elif kind in (BATCH, INGEST):
+                if kind == INGEST:
+                    batch = device_pb2.IngestRequest.FromString(payload).batch
+                    payload = batch.SerializeToString()
+                else:
+                    batch = device_pb2.DataBatch.FromString(payload)
+                batches.append(payload)
+                readings += len(batch.device_ids)
+            if limit and readings >= limit:
+                return data, batches, readings
+    return data, batches, readings
+
+
+async def send(channel, method, payloads, repeat):
+    # already encoded; written as they were received
+    stream = channel.stream_unary(
+        method,
+        request_serializer=None,
+        response_deserializer=device_pb2.Response.FromString,
+    )()
+    for _ in range(repeat):
+        for payload in payloads:
+            await stream.write(payload)
+    await stream.done_writing()
+    await stream
+
+
+async def replay(target, data, batches, repeat):
+    async with grpc.aio.insecure_channel(target) as channel:
+        sends = []
+        if data:
+            sends.append(send(channel, "/DeviceService/StreamDeviceData", data, repeat))
+        if batches:
+            sends.append(
+                send(channel, "/DeviceService/StreamDeviceBatches", batches, repeat)
+            )
+        start = time.perf_counter()
+        # a stream's response comes once the server has processed all of it
+        await asyncio.gather(*sends)
+        return time.perf_counter() - start
+
+
+async def main(args):
+    data, batches, readings = load(args.directory, args.limit)
+    if not readings:
+        raise SystemExit(f"No recorded readings in {args.directory}")
+    server = None
+    target = args.target
+    if target is None:
+        target = f"127.0.0.1:{args.port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "server.server", "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        await wait_ready(target, 15)
+        print(f"{readings} readings, {len(data)} Data messages, {len(batches)} batches")
+        print(f"{'run':>4} {'seconds':>8} {'readings/s':>12}")
+        for run in range(1, args.runs + 1):
+            elapsed = await replay(target, data, batches, args.repeat)
+            rate = readings * args.repeat / elapsed
+            print(f"{run:>4} {elapsed:>8.2f} {rate:>12,.0f}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Server ingest throughput replaying readings recorded with"
+        " server --record, as fast as the server takes them"
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--target", default=None, help="replay to this server instead of a local one"
+    )
+    parser.add_argument("--port", type=int, default=50151)
+    parser.add_argument(
+        "--limit", type=int, default=0, help="replay only the first readings"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="send the recording this many times"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
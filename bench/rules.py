@@ -0,0 +1,70 @@
+import argparse
+import random
+import time
+
+from gen import device_pb2
+from server.rules import DEFAULT_RULES, compile_rules
+
+
+def make_rules(count, devices):
+    # every other streaming device has its own rule, so the share of readings
+    # hitting an override is the same at every size; the rest cover devices
+    # that are not streaming
+    device_ids = list(range(0, devices, 2))
+    device_ids += range(devices, devices + count - len(device_ids))
+    overrides = {
+        str(device_id): {"kind": "threshold", "threshold": 60 + device_id % 20}
+        for device_id in device_ids
+    }
+    return compile_rules(dict(DEFAULT_RULES, devices=overrides))
+
+
+def make_readings(count, devices):
+    rng = random.Random(0)
+    device_ids = [rng.randrange(devices) for _ in range(count)]
+    device_types = [device_pb2.THERMOMETER] * count
+    values = [60 + rng.randint(0, 300) * 0.1 for _ in range(count)]
+    return device_ids, device_types, values
+
+
+def main(args):
+    print(f"{'rules':>8} {'per-reading/s':>14} {'batched/s':>12}")
+    for count in args.rules:
+        rules = make_rules(count, args.devices)
+        device_ids, device_types, values = make_readings(args.readings, args.devices)
+
+        start = time.perf_counter()
+        lookup = rules.lookup
+        for device_id, device_type, value in zip(device_ids, device_types, values):
+            strategy = lookup(device_id, device_type)
+            if strategy is not None:
+                strategy.observe(device_id, value)
+        scalar = args.readings / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, args.readings, args.batch):
+            rules.evaluate(
+                device_ids[i : i + args.batch],
+                device_types[i : i + args.batch],
+                values[i : i + args.batch],
+            )
+        batched = args.readings / (time.perf_counter() - start)
+        print(f"{count:>8} {scalar:>14,.0f} {batched:>12,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rule lookup and evaluation throughput as the rule count grows"
+    )
+    parser.add_argument(
+        "--rules", type=int, nargs="+", default=[1000, 10000, 100000, 1000000]
+    )
+    parser.add_argument("--readings", type=int, default=200000)
+    parser.add_argument(
+        "--devices",
+        type=int,
+        default=2000,
+        help="devices the readings come from",
+    )
+    parser.add_argument("--batch", type=int, default=1024)
+    main(parser.parse_args())
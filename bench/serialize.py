@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from gen import alert_pb2
+from server.server import AlertManager, DeviceService, serialize_alert_response
+
+
+# the previous fan-out: a fresh message per subscriber, each encoded on write
+async def per_client_fanout(alert_manager, device_id, message, timestamp):
+    device_id_str = str(device_id)
+    for client_id in alert_manager.subscribers_of(device_id_str):
+        queue = alert_manager.queues.get(client_id)
+        if queue is not None:
+            queue.put_alert(
+                device_id_str,
+                alert_pb2.AlertResponse(
+                    alert=alert_pb2.AlertNotification(
+                        device_id=device_id_str,
+                        message=message,
+                        timestamp=timestamp,
+                    )
+                ),
+            )
+
+
+def build(subscribers, alerts):
+    alert_manager = AlertManager(queue_size=alerts)
+    for i in range(subscribers):
+        alert_manager.subscribe(f"client{i}", "1", alert_manager.new_queue())
+    return alert_manager
+
+
+# what the gRPC write path does with each queued response
+async def drain(alert_manager):
+    for queue in alert_manager.queues.values():
+        response = queue.pop()
+        while response is not None:
+            serialize_alert_response(response)
+            response = queue.pop()
+
+
+async def run(fanout, alert_manager, alerts, trace):
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(alerts):
+        await fanout(1, f"Alert! Value = {70 + i * 0.1}", "2025-08-20T16:04:18Z")
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    await drain(alert_manager)
+    elapsed = time.perf_counter() - start
+    if trace:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def per_client(subscribers, alerts):
+    alert_manager = build(subscribers, alerts)
+
+    async def fanout(device_id, message, timestamp):
+        await per_client_fanout(alert_manager, device_id, message, timestamp)
+
+    return fanout, alert_manager
+
+
+def shared(subscribers, alerts):
+    alert_manager = build(subscribers, alerts)
+    return DeviceService(alert_manager).send_alert_to_subscribers, alert_manager
+
+
+async def main(args):
+    print(
+        f"{'subscribers':>11} {'mode':>11} {'deliveries/s':>14} "
+        f"{'queued peak KiB':>16}"
+    )
+    for subscribers in args.subscribers:
+        deliveries = subscribers * args.alerts
+        for name, setup in (("per-client", per_client), ("shared", shared)):
+            # time and allocations are measured in separate runs since
+            # tracemalloc itself slows allocation down
+            elapsed, _ = await run(*setup(subscribers, args.alerts), args.alerts, False)
+            _, peak = await run(*setup(subscribers, args.alerts), args.alerts, True)
+            print(
+                f"{subscribers:>11} {name:>11} {deliveries / elapsed:>14,.0f} "
+                f"{peak / 1024:>16,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Per-client alert construction vs serialize-once fan-out"
+    )
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 5000])
+    parser.add_argument("--alerts", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
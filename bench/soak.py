@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import gc
+import os
+import resource
+
+import grpc
+
+from device.device import make_reading
+from gen import alert_pb2
+from gen import alert_pb2_grpc
+from gen import device_pb2
+from gen import device_pb2_grpc
+from server.server import (
+    AlertManager,
+    AlertService,
+    DeviceService,
+    add_alert_service_to_server,
+)
+from server.sessions import SessionManager
+
+
+def rss_kib():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        # peak rather than current RSS, but still shows unbounded growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def cycle(stub, client_id, devices):
+    stream = stub.StreamAlerts()
+    for device_id in range(1, devices + 1):
+        await stream.write(
+            alert_pb2.AlertRequest(
+                subscribe=alert_pb2.SubscribeRequest(
+                    client_id=client_id, device_id=str(device_id)
+                )
+            )
+        )
+    for _ in range(devices):
+        await stream.read()
+    stream.cancel()
+
+
+async def feed(stub, devices, stop):
+    # every reading alerts, so clients are often cancelled mid-write
+    stream = stub.StreamDeviceData()
+    while not stop.is_set():
+        for device_id in range(1, devices + 1):
+            await stream.write(make_reading(device_id, device_pb2.THERMOMETER, 100.0))
+        await asyncio.sleep(0)
+    await stream.done_writing()
+    await stream
+
+
+async def main(args):
+    # anything asyncio would log, such as a writer task's exception that
+    # nobody retrieved
+    errors = []
+    asyncio.get_running_loop().set_exception_handler(
+        lambda loop, context: errors.append(context)
+    )
+    server = grpc.aio.server()
+    alert_manager = AlertManager()
+    session_manager = SessionManager(alert_manager, args.grace)
+    device_pb2_grpc.add_DeviceServiceServicer_to_server(
+        DeviceService(alert_manager), server
+    )
+    add_alert_service_to_server(AlertService(alert_manager, session_manager), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    session_manager.start()
+
+    print(
+        f"{'cycles':>8} {'rss KiB':>9} {'sessions':>9} {'queues':>7} "
+        f"{'subscribed':>11} {'tasks':>6} {'errors':>7}"
+    )
+    async with grpc.aio.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = alert_pb2_grpc.AlertServiceStub(channel)
+        stop = asyncio.Event()
+        if args.alerting:
+            feeder = asyncio.create_task(
+                feed(device_pb2_grpc.DeviceServiceStub(channel), args.devices, stop)
+            )
+        for done in range(1, args.cycles + 1):
+            # fresh client ids exercise cleanup, not reconnection
+            await asyncio.gather(
+                *(
+                    cycle(stub, f"client{done}-{i}", args.devices)
+                    for i in range(args.concurrency)
+                )
+            )
+            if done % args.report_every == 0 or done == args.cycles:
+                await asyncio.sleep(0.05)
+                # unretrieved task exceptions are reported when collected
+                gc.collect()
+                print(
+                    f"{done:>8} {rss_kib():>9} {len(session_manager.sessions):>9} "
+                    f"{len(alert_manager.queues):>7} "
+                    f"{len(alert_manager.subscriptions):>11} "
+                    f"{len(asyncio.all_tasks()):>6} {len(errors):>7}"
+                )
+        stop.set()
+        if args.alerting:
+            await feeder
+    await server.stop(None)
+    if errors:
+        raise SystemExit(f"{len(errors)} unhandled errors, first: {errors[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="RSS and registry sizes over many connect/disconnect cycles"
+    )
+    parser.add_argument("--cycles", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--grace", type=float, default=0.0)
+    parser.add_argument("--report-every", type=int, default=50)
+    parser.add_argument(
+        "--alerting",
+        action="store_true",
+        help="keep the devices alerting, so clients disconnect mid-stream",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,60 @@
+import argparse
+import random
+import time
+
+from gen import device_pb2
+from server.strategies import (
+    MotionSensorStrategy,
+    SmartPlugStrategy,
+    ThermometerStrategy,
+    evaluate_batch,
+    fired_indices,
+)
+
+
+def make_readings(count):
+    rng = random.Random(0)
+    device_types = []
+    values = []
+    for _ in range(count):
+        device_type = rng.choice(
+            [device_pb2.THERMOMETER, device_pb2.SMART_PLUG, device_pb2.MOTION_SENSOR]
+        )
+        if device_type == device_pb2.THERMOMETER:
+            value = 60 + rng.randint(0, 300) * 0.1
+        elif device_type == device_pb2.SMART_PLUG:
+            value = rng.randint(0, 15000) * 0.1
+        else:
+            value = float(rng.random() < 0.5)
+        device_types.append(device_type)
+        values.append(value)
+    return device_types, values
+
+
+def main(args):
+    strategies = {
+        device_pb2.THERMOMETER: ThermometerStrategy(65),
+        device_pb2.SMART_PLUG: SmartPlugStrategy(200),
+        device_pb2.MOTION_SENSOR: MotionSensorStrategy(True),
+    }
+    print(f"{'chunk':>8} {'scalar readings/s':>18} {'vectorized readings/s':>22}")
+    for chunk in args.chunks:
+        device_types, values = make_readings(chunk)
+        results = {}
+        for vectorized in (False, True):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                mask = evaluate_batch(strategies, device_types, values, vectorized)
+            elapsed = time.perf_counter() - start
+            results[vectorized] = (chunk * args.repeat / elapsed, fired_indices(mask))
+        assert results[False][1] == results[True][1], "vectorized mask differs"
+        print(f"{chunk:>8} {results[False][0]:>18,.0f} {results[True][0]:>22,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Threshold evaluation throughput, scalar vs vectorized"
+    )
+    parser.add_argument("--chunks", type=int, nargs="+", default=[64, 1024, 16384])
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
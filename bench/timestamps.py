@@ -0,0 +1,140 @@
+import argparse
+import time
+
+from datetime import datetime, timezone
+
+from gen import alert_pb2
+from gen import device_pb2
+
+
+def string_reading(device_id):
+    # what devices sent before readings carried timestamp_unix_nanos
+    return device_pb2.Data(
+        device_id=device_id,
+        device_type=device_pb2.THERMOMETER,
+        timestamp=datetime.now(timezone.utc).isoformat() + "Z",
+        temperature=device_pb2.TemperatureData(temperature=70.0),
+    )
+
+
+def nanos_reading(device_id):
+    return device_pb2.Data(
+        device_id=device_id,
+        device_type=device_pb2.THERMOMETER,
+        timestamp_unix_nanos=time.time_ns(),
+        temperature=device_pb2.TemperatureData(temperature=70.0),
+    )
+
+
+def string_alert(reading):
+    return alert_pb2.AlertResponse(
+        alert=alert_pb2.AlertNotification(
+            device_id=str(reading.device_id),
+            message="Alert! Value = 70.0",
+            timestamp=reading.timestamp,
+            device_type=reading.device_type,
+            value=70.0,
+        )
+    )
+
+
+def nanos_alert(reading):
+    return alert_pb2.AlertResponse(
+        alert=alert_pb2.AlertNotification(
+            device_id=str(reading.device_id),
+            message="Alert! Value = 70.0",
+            timestamp_unix_nanos=reading.timestamp_unix_nanos,
+            device_type=reading.device_type,
+            value=70.0,
+        )
+    )
+
+
+def batch(size, nanos):
+    batch = device_pb2.DataBatch(
+        device_ids=range(size),
+        device_types=[device_pb2.THERMOMETER] * size,
+        values=[70.0] * size,
+    )
+    now = time.time_ns()
+    if nanos:
+        batch.timestamps_unix_nanos.extend(now + i for i in range(size))
+    else:
+        batch.timestamps.extend(
+            datetime.fromtimestamp((now + i) / 1e9, timezone.utc).isoformat() + "Z"
+            for i in range(size)
+        )
+    return batch
+
+
+def measure(make, decode, count):
+    """Bytes per message, and microseconds to build and encode one and to
+    decode one and read its timestamp."""
+    start = time.perf_counter()
+    encoded = [make(i).SerializeToString() for i in range(count)]
+    encode_us = (time.perf_counter() - start) / count * 1e6
+    start = time.perf_counter()
+    for payload in encoded:
+        decode(payload)
+    decode_us = (time.perf_counter() - start) / count * 1e6
+    size = sum(map(len, encoded)) / count
+    return size, encode_us, decode_us
+
+
+def main(args):
+    reading = nanos_reading(1)
+    legacy = string_reading(1)
+    decode_reading = device_pb2.Data.FromString
+    decode_alert = alert_pb2.AlertResponse.FromString
+    cases = [
+        (
+            "reading",
+            "string",
+            string_reading,
+            lambda payload: decode_reading(payload).timestamp,
+        ),
+        (
+            "reading",
+            "int64",
+            nanos_reading,
+            lambda payload: decode_reading(payload).timestamp_unix_nanos,
+        ),
+        (
+            "alert",
+            "string",
+            lambda i: string_alert(legacy),
+            lambda payload: decode_alert(payload).alert.timestamp,
+        ),
+        (
+            "alert",
+            "int64",
+            lambda i: nanos_alert(reading),
+            lambda payload: decode_alert(payload).alert.timestamp_unix_nanos,
+        ),
+    ]
+    print(
+        f"{'message':>8} {'timestamp':>10} {'bytes':>8} {'encode us':>10}"
+        f" {'decode us':>10}"
+    )
+    for name, kind, make, decode in cases:
+        size, encode_us, decode_us = measure(make, decode, args.messages)
+        print(
+            f"{name:>8} {kind:>10} {size:>8.1f} {encode_us:>10.2f} {decode_us:>10.2f}"
+        )
+    for nanos in (False, True):
+        kind = "int64" if nanos else "string"
+        payload = batch(args.batch, nanos).SerializeToString()
+        per_row = len(payload) / args.batch
+        print(f"{'batch':>8} {kind:>10} {per_row:>8.1f} {'':>10} {'':>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Message size and encode/decode time, ISO-8601 string vs"
+        " int64 epoch-nanosecond timestamps"
+    )
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument(
+        "--batch", type=int, default=1024, help="rows per DataBatch; bytes per row"
+    )
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import gc
+import time
+
+from device.device import make_reading
+from gen import device_pb2
+from server.server import AlertManager, DeviceService
+
+
+async def ingest(service, payloads, sample_rate):
+    """Microseconds per reading through decode and process_reading, the
+    path StreamDeviceData takes. ``sample_rate`` is None for tracing off,
+    or "plain" to skip the tracer's deserializer and claim altogether."""
+    tracer = service.tracer
+    plain = sample_rate == "plain"
+    tracer.enabled = not plain and sample_rate is not None
+    tracer.sample_rate = sample_rate if tracer.enabled else 0.0
+    decode = device_pb2.Data.FromString
+    if not plain:
+        decode = tracer.deserializer(decode)
+    process_reading = service.process_reading
+    gc.collect()
+    start = time.perf_counter()
+    if plain:
+        for payload in payloads:
+            await process_reading(decode(payload), time.perf_counter())
+    else:
+        for payload in payloads:
+            data = decode(payload)
+            await process_reading(
+                data, time.perf_counter(), tracer.enabled and tracer.claim(data)
+            )
+    elapsed = time.perf_counter() - start
+    for queue in service.alert_manager.queues.values():
+        queue.clear()
+    return elapsed / len(payloads) * 1e6
+
+
+async def main(args):
+    alert_manager = AlertManager(queue_size=1 << 20)
+    for i in range(args.subscribers):
+        alert_manager.subscribe(f"client{i}", "1", alert_manager.new_queue())
+    service = DeviceService(alert_manager)
+    # every other reading is over the threshold and fans out
+    payloads = [
+        make_reading(
+            1, device_pb2.THERMOMETER, 70.0 if i % 2 else 60.0
+        ).SerializeToString()
+        for i in range(args.readings)
+    ]
+    modes = ["plain", None, *args.sample_rates]
+    costs = {mode: [] for mode in modes}
+    # interleaved rounds, best of each, so drift and hiccups don't count
+    for _ in range(args.rounds):
+        for mode in modes:
+            costs[mode].append(await ingest(service, payloads, mode))
+    baseline = min(costs["plain"])
+    print(f"{'tracing':>14} {'us/reading':>11} {'overhead':>9}")
+    for mode in modes:
+        cost = min(costs[mode])
+        if mode == "plain":
+            name = "uninstrumented"
+        else:
+            name = "off" if mode is None else f"{mode:g}"
+        print(f"{name:>14} {cost:>11.2f} {cost / baseline - 1:>9.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Per-reading cost of stage tracing, off and at sample rates"
+    )
+    parser.add_argument("--readings", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--subscribers", type=int, default=10)
+    parser.add_argument(
+        "--sample-rates", type=float, nargs="+", default=[0.0, 0.01, 1.0]
+    )
+    asyncio.run(main(parser.parse_args()))
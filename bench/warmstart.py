@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import grpc
+
+from bench.loadgen import wait_ready
+from client.client import bulk_subscribe_request
+from device.device import make_reading
+from gen import alert_pb2_grpc
+from gen import device_pb2
+from gen import device_pb2_grpc
+from server.server import AlertManager, DeviceService
+from server.sessions import SessionManager
+from server.snapshot import Snapshotter
+
+
+def client_devices(args):
+    per_client = args.subscriptions // args.clients
+    return {
+        f"bench-{i}": [
+            str(j) for j in range(1 + i * per_client, 1 + (i + 1) * per_client)
+        ]
+        for i in range(args.clients)
+    }
+
+
+async def build_snapshot(path, clients):
+    """Saves a registry holding ``clients``' subscriptions to ``path``;
+    returns the save time and the longest the event loop was held up."""
+    alert_manager = AlertManager()
+    for client_id, device_ids in clients.items():
+        alert_manager.subscribe_many(client_id, device_ids, alert_manager.new_queue())
+    snapshotter = Snapshotter(
+        path, alert_manager, SessionManager(alert_manager), DeviceService(alert_manager)
+    )
+    stalls = []
+    saved = asyncio.Event()
+
+    async def tick():
+        last = time.perf_counter()
+        while not saved.is_set():
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    started = time.perf_counter()
+    await snapshotter.save()
+    elapsed = time.perf_counter() - started
+    saved.set()
+    await ticker
+    return elapsed, max(stalls)
+
+
+async def feed(stub, device_id, stop):
+    # keeps the first client's first device above its threshold
+    stream = stub.StreamDeviceData()
+    reading = make_reading(device_id, device_pb2.THERMOMETER, 100.0)
+    while not stop.is_set():
+        await stream.write(reading)
+        await asyncio.sleep(0.001)
+    await stream.done_writing()
+    await stream
+
+
+async def reconnect(stub, client_id, device_ids, first_alert):
+    """Reconnects ``client_id``, resubscribing to ``device_ids``; the first
+    client also waits for an alert. Returns the open stream, as a stream
+    that ends takes its client's subscriptions with it, and the ack time."""
+    stream = stub.StreamAlerts()
+    await stream.write(bulk_subscribe_request(client_id, device_ids))
+    async for response in stream:
+        if response.HasField("ack"):
+            acked = time.perf_counter()
+            if first_alert is None:
+                break
+        elif first_alert is not None:
+            first_alert.append(time.perf_counter())
+            break
+    return stream, acked
+
+
+async def run(clients, snapshot, args):
+    """Seconds from starting the server to accepting connections, to every
+    client being subscribed again, and to the first alert."""
+    command = [sys.executable, "-m", "server.server", "--port", str(args.port)]
+    command += ["--history-size", "0"]
+    if snapshot is not None:
+        command += ["--snapshot", snapshot, "--snapshot-interval", "3600"]
+    start = time.perf_counter()
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        target = f"127.0.0.1:{args.port}"
+        await wait_ready(target, 120)
+        ready = time.perf_counter()
+        async with grpc.aio.insecure_channel(target) as channel:
+            stop = asyncio.Event()
+            feeder = asyncio.create_task(
+                feed(device_pb2_grpc.DeviceServiceStub(channel), 1, stop)
+            )
+            stub = alert_pb2_grpc.AlertServiceStub(channel)
+            first_alert = []
+            reconnected = await asyncio.gather(
+                *(
+                    reconnect(
+                        stub,
+                        client_id,
+                        # restored clients only name themselves to reattach
+                        [] if snapshot is not None else device_ids,
+                        first_alert if i == 0 else None,
+                    )
+                    for i, (client_id, device_ids) in enumerate(clients.items())
+                )
+            )
+            stop.set()
+            await feeder
+            for stream, _ in reconnected:
+                stream.cancel()
+        resubscribed = max(acked for _, acked in reconnected)
+        return ready - start, resubscribed - start, first_alert[0] - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args):
+    clients = client_devices(args)
+    with tempfile.TemporaryDirectory(prefix="iot-warmstart-") as directory:
+        path = os.path.join(directory, "subscriptions.snap")
+        seconds, stall = await build_snapshot(path, clients)
+        size = os.path.getsize(path)
+        print(
+            f"Snapshot of {args.subscriptions} subscriptions: {size / 1024 / 1024:.1f}"
+            f" MiB, saved in {seconds:.2f} s, event loop held up at most"
+            f" {stall * 1000:.1f} ms"
+        )
+        print(
+            f"{'start':>6} {'ready s':>8} {'resubscribed s':>15} {'first alert s':>14}"
+        )
+        for mode in ("cold", "warm"):
+            snapshot = None
+            if mode == "warm":
+                # the server saves over its snapshot when it stops
+                snapshot = os.path.join(directory, "server.snap")
+                shutil.copyfile(path, snapshot)
+            ready, resubscribed, first_alert = await run(clients, snapshot, args)
+            print(f"{mode:>6} {ready:>8.2f} {resubscribed:>15.2f} {first_alert:>14.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Process start to serving alerts, with every client"
+        " resubscribing vs restored from a snapshot"
+    )
+    parser.add_argument("--subscriptions", type=int, default=1000000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--port", type=int, default=50161)
+    asyncio.run(main(parser.parse_args()))
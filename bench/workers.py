@@ -0,0 +1,104 @@
+import argparse
+import asyncio
+import multiprocessing
+import subprocess
+import sys
+import time
+
+import grpc
+
+from device.device import make_reading
+from gen import device_pb2
+from gen import device_pb2_grpc
+
+
+async def push(target, device_ids, duration):
+    readings = [
+        make_reading(device_id, device_pb2.THERMOMETER, 60.0)
+        for device_id in device_ids
+    ]
+    sent = 0
+    async with grpc.aio.insecure_channel(target) as channel:
+        stream = device_pb2_grpc.DeviceServiceStub(channel).StreamDeviceData()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            for reading in readings:
+                await stream.write(reading)
+            sent += len(readings)
+        await stream.done_writing()
+        await stream
+    return sent
+
+
+def generator(target, device_ids, duration, results):
+    results.put(asyncio.run(push(target, device_ids, duration)))
+
+
+async def wait_ready(target):
+    async with grpc.aio.insecure_channel(target) as channel:
+        await asyncio.wait_for(channel.channel_ready(), 15)
+
+
+def run(workers, args):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "server.server",
+            "--port",
+            str(args.port),
+            "--workers",
+            str(workers),
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        ports = (
+            [args.port + 1 + i for i in range(workers)] if workers > 1 else [args.port]
+        )
+        for port in ports:
+            asyncio.run(wait_ready(f"127.0.0.1:{port}"))
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = []
+        for g in range(args.generators_per_worker * workers):
+            index = g % workers
+            # shard-aware: stream only devices the target worker owns
+            device_ids = [index + workers * k for k in range(1, args.devices + 1)]
+            target = f"127.0.0.1:{ports[index]}"
+            processes.append(
+                context.Process(
+                    target=generator, args=(target, device_ids, args.duration, results)
+                )
+            )
+        for process in processes:
+            process.start()
+        total = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return total / args.duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args):
+    print(f"{'workers':>8} {'readings/s':>12} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        rate = run(workers, args)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Ingest throughput as the number of server workers grows"
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--generators-per-worker", type=int, default=2)
+    parser.add_argument("--devices", type=int, default=100, help="per generator")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=50091)
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+import grpc
+from gen import admin_pb2
+from gen import admin_pb2_grpc
+import argparse
+import asyncio
+
+
+def bucket_percentile(stage, q):
+    """Upper bound, in microseconds, of the bucket holding the ``q``
+    quantile; inf if it is past the last bound."""
+    rank = q * stage.count
+    seen = 0
+    for bound, count in zip(stage.bounds, stage.counts):
+        seen += count
+        if seen >= rank:
+            return bound * 1e6
+    return float("inf")
+
+
+def print_tracing(response):
+    state = "on" if response.enabled else "off"
+    print(f"Tracing {state}, sample rate {response.sample_rate:g}")
+    print(f"{'stage':>11} {'count':>8} {'mean us':>9} {'p50 us':>8} {'p99 us':>8}")
+    for stage in response.stages:
+        mean = stage.sum / stage.count * 1e6 if stage.count else 0.0
+        print(
+            f"{stage.stage:>11} {stage.count:>8} {mean:>9.1f}"
+            f" {bucket_percentile(stage, 0.5):>8.1f}"
+            f" {bucket_percentile(stage, 0.99):>8.1f}"
+        )
+
+
+async def run(args):
+    async with grpc.aio.insecure_channel(args.target) as channel:
+        stub = admin_pb2_grpc.AdminServiceStub(channel)
+        if args.command == "tracing":
+            request = admin_pb2.SetTracingRequest(reset=args.reset)
+            if args.enabled is not None:
+                request.enabled = args.enabled
+            if args.sample_rate is not None:
+                request.sample_rate = args.sample_rate
+            print_tracing(await stub.SetTracing(request))
+            return
+        if args.command == "profile":
+            mode = admin_pb2.SAMPLING if args.mode == "sampling" else admin_pb2.CPROFILE
+            response = await stub.Profile(
+                admin_pb2.ProfileRequest(
+                    seconds=args.seconds, mode=mode, interval_ms=args.interval_ms
+                )
+            )
+            output = args.output or (
+                "profile.folded" if args.mode == "sampling" else "profile.prof"
+            )
+            with open(output, "wb") as f:
+                f.write(response.data)
+            print(response.summary)
+            print(f"Profile written to {output}")
+            return
+        if args.command == "get-rules":
+            response = await stub.GetRules(admin_pb2.GetRulesRequest())
+        else:
+            with open(args.file) as f:
+                rules_json = f.read()
+            response = await stub.SetRules(
+                admin_pb2.SetRulesRequest(rules_json=rules_json)
+            )
+            print(f"{response.message} | Success: {response.success}")
+        print(f"Rules version {response.version}: {response.rules_json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IoT alert server admin")
+    parser.add_argument("--target", default="localhost:50051")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("get-rules")
+    commands.add_parser("set-rules").add_argument("file")
+    tracing = commands.add_parser(
+        "tracing", help="show per-stage latencies; the flags change tracing first"
+    )
+    switch = tracing.add_mutually_exclusive_group()
+    switch.add_argument("--enable", dest="enabled", action="store_true", default=None)
+    switch.add_argument("--disable", dest="enabled", action="store_false")
+    tracing.add_argument("--sample-rate", type=float, default=None)
+    tracing.add_argument("--reset", action="store_true", help="clear the histograms")
+    profile = commands.add_parser("profile", help="profile the server for a while")
+    profile.add_argument("--seconds", type=float, default=10)
+    profile.add_argument("--mode", choices=["cprofile", "sampling"], default="cprofile")
+    profile.add_argument("--interval-ms", type=float, default=5)
+    profile.add_argument(
+        "--output",
+        default=None,
+        help="default profile.prof (cprofile) or profile.folded (sampling)",
+    )
+    asyncio.run(run(parser.parse_args()))
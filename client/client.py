@@ -1,7 +1,109 @@
 import grpc
 from gen import alert_pb2
 from gen import alert_pb2_grpc
+from gen import device_pb2
 import asyncio
+import re
+
+from datetime import datetime, timezone
+
+
+def parse_pattern(target):
+    """``type:THERMOMETER``, ``100-200`` and ``12*`` become patterns; any
+    other target is an exact device_id and gives None."""
+    if target.startswith("type:"):
+        return alert_pb2.DevicePattern(
+            device_type=device_pb2.DeviceType.Value(target[5:].upper())
+        )
+    match = re.fullmatch(r"(-?\d+)-(-?\d+)", target)
+    if match:
+        first, last = map(int, match.groups())
+        return alert_pb2.DevicePattern(
+            id_range=alert_pb2.IdRange(first=first, last=last)
+        )
+    if target.endswith("*"):
+        return alert_pb2.DevicePattern(prefix=target[:-1])
+    return None
+
+
+def format_time(unix_nanos, text):
+    """The int64 timestamp as ISO-8601, or the deprecated string one from
+    servers and devices that only send that."""
+    if not unix_nanos:
+        return text
+    seconds, nanos = divmod(unix_nanos, 1_000_000_000)
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    return moment.replace(microsecond=nanos // 1000, tzinfo=None).isoformat() + "Z"
+
+
+def subscribe_request(client_id, device_id="", pattern=None, debounce_ms=0):
+    return alert_pb2.AlertRequest(
+        subscribe=alert_pb2.SubscribeRequest(
+            client_id=client_id,
+            device_id=device_id,
+            pattern=pattern,
+            debounce_ms=debounce_ms,
+        )
+    )
+
+
+def unsubscribe_request(client_id, device_id="", pattern=None):
+    return alert_pb2.AlertRequest(
+        unsubscribe=alert_pb2.UnsubscribeRequest(
+            client_id=client_id, device_id=device_id, pattern=pattern
+        )
+    )
+
+
+def replay_request(client_id, after_offset):
+    return alert_pb2.AlertRequest(
+        replay=alert_pb2.ReplayRequest(client_id=client_id, after_offset=after_offset)
+    )
+
+
+def split_targets(targets):
+    device_ids = []
+    patterns = []
+    for target in targets:
+        pattern = parse_pattern(target)
+        if pattern is None:
+            device_ids.append(target)
+        else:
+            patterns.append(pattern)
+    return device_ids, patterns
+
+
+def bulk_subscribe_request(client_id, targets, debounce_ms=0):
+    device_ids, patterns = split_targets(targets)
+    return alert_pb2.AlertRequest(
+        bulk_subscribe=alert_pb2.BulkSubscribeRequest(
+            client_id=client_id,
+            device_ids=device_ids,
+            patterns=patterns,
+            debounce_ms=debounce_ms,
+        )
+    )
+
+
+def bulk_unsubscribe_request(client_id, targets):
+    device_ids, patterns = split_targets(targets)
+    return alert_pb2.AlertRequest(
+        bulk_unsubscribe=alert_pb2.BulkUnsubscribeRequest(
+            client_id=client_id, device_ids=device_ids, patterns=patterns
+        )
+    )
+
+
+def load_targets(path):
+    """One device_id or pattern per line; blank lines and # comments are
+    skipped."""
+    targets = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                targets.append(line)
+    return targets
 
 
 async def send_requests(stream):
@@ -9,28 +111,57 @@ async def send_requests(stream):
     print("Enter commands:")
     print("subscribe client1 device123")
     print("unsubscribe client1 device123")
+    print("subscribe client1 type:THERMOMETER | 100-200 | 12*")
+    print("subscribe client1 device123 500  (debounce ms)")
+    print("replay client1 0")
+    print("load client1 subscriptions.txt")
+    print("unload client1 subscriptions.txt")
 
     while True:
         user_input = await loop.run_in_executor(None, input, "> ")
 
         parts = user_input.strip().split()
-        if len(parts) < 3:
+        if not 3 <= len(parts) <= 4:
             print("Incorrect arg count")
             continue
-        command, client_id, device_id = parts
+        command, client_id, device_id, *debounce = parts
+        if debounce and (
+            command not in ("subscribe", "load") or not debounce[0].isdigit()
+        ):
+            print("Debounce is a number of milliseconds for subscribe or load")
+            continue
+        debounce_ms = int(debounce[0]) if debounce else 0
 
-        if command == "subscribe":
-            request = alert_pb2.AlertRequest(
-                subscribe=alert_pb2.SubscribeRequest(
-                    client_id=client_id, device_id=device_id
-                )
-            )
-        elif command == "unsubscribe":
-            request = alert_pb2.AlertRequest(
-                unsubscribe=alert_pb2.UnsubscribeRequest(
-                    client_id=client_id, device_id=device_id
-                )
-            )
+        if command in ("load", "unload"):
+            try:
+                targets = load_targets(device_id)
+                if command == "load":
+                    request = bulk_subscribe_request(client_id, targets, debounce_ms)
+                else:
+                    request = bulk_unsubscribe_request(client_id, targets)
+            except OSError as e:
+                print(f"Cannot read {device_id}: {e.strerror}")
+                continue
+            except ValueError:
+                print("Unknown device type")
+                continue
+        elif command == "replay":
+            if not device_id.isdigit():
+                print("Offset must be a non-negative integer")
+                continue
+            request = replay_request(client_id, int(device_id))
+        elif command in ("subscribe", "unsubscribe"):
+            try:
+                pattern = parse_pattern(device_id)
+            except ValueError:
+                print("Unknown device type")
+                continue
+            if pattern is not None:
+                device_id = ""
+            if command == "subscribe":
+                request = subscribe_request(client_id, device_id, pattern, debounce_ms)
+            else:
+                request = unsubscribe_request(client_id, device_id, pattern)
         else:
             print("Unknown command")
             continue
@@ -42,9 +173,18 @@ async def receive_responses(stream):
         if response.HasField("ack"):
             print(f"[ACK] {response.ack.message} | Success: {response.ack.success}")
         elif response.HasField("alert"):
-            print(
-                f"[ALERT] {response.alert.device_id}: {response.alert.message} at {response.alert.timestamp}"
-            )
+            alert = response.alert
+            offset = f" (offset {alert.offset})" if alert.offset else ""
+            at = format_time(alert.timestamp_unix_nanos, alert.timestamp)
+            print(f"[ALERT] {alert.device_id}: {alert.message} at {at}{offset}")
+            if alert.count:
+                since = format_time(
+                    alert.first_timestamp_unix_nanos, alert.first_timestamp
+                )
+                print(
+                    f"        {alert.count} alerts since {since},"
+                    f" max value {alert.max_value}"
+                )
 
 
 async def run():
@@ -1,75 +1,98 @@
-import grpc
 from gen import device_pb2
-from gen import device_pb2_grpc
+import argparse
 import asyncio
 import random
-
-from datetime import datetime, timezone
-
-
-async def serialize(stream, queue):
-    while True:
-        data = await queue.get()
-        await stream.write(data)
+import time
+
+from device.gateway import COMPRESSION, Gateway
+
+
+def make_reading(device_id, device_type, value, timestamp=None):
+    """``timestamp`` is epoch nanoseconds, now by default; a string fills the
+    deprecated ISO-8601 field instead, as older devices do."""
+    if timestamp is None:
+        timestamp = time.time_ns()
+    if device_type == device_pb2.DeviceType.THERMOMETER:
+        payload = {"temperature": device_pb2.TemperatureData(temperature=value)}
+    elif device_type == device_pb2.DeviceType.SMART_PLUG:
+        payload = {"wattage": device_pb2.PowerData(wattage=value)}
+    else:
+        payload = {"motion": device_pb2.MotionData(motion=value)}
+    if isinstance(timestamp, str):
+        return device_pb2.Data(
+            device_id=device_id, timestamp=timestamp, device_type=device_type, **payload
+        )
+    return device_pb2.Data(
+        device_id=device_id,
+        timestamp_unix_nanos=timestamp,
+        device_type=device_type,
+        **payload,
+    )
 
 
-async def thermometer_device(queue):
+async def thermometer_device(gateway):
     while True:
         await asyncio.sleep(3)
         temperature = 60 + (random.randint(0, 300) * 0.1)
-        temperatureData = device_pb2.Data(
-            device_id=1,
-            timestamp=datetime.now(timezone.utc).isoformat() + "Z",
-            device_type=device_pb2.DeviceType.THERMOMETER,
-            temperature=device_pb2.TemperatureData(temperature=temperature),
-        )
-        await queue.put(temperatureData)
+        gateway.submit(1, device_pb2.DeviceType.THERMOMETER, temperature)
 
 
-async def smart_plug_device(queue):
+async def smart_plug_device(gateway):
     while True:
         await asyncio.sleep(1)
         wattage = random.randint(0, 15000) * 0.1
-        wattageData = device_pb2.Data(
-            device_id=2,
-            timestamp=datetime.now(timezone.utc).isoformat() + "Z",
-            device_type=device_pb2.DeviceType.SMART_PLUG,
-            wattage=device_pb2.PowerData(wattage=wattage),
-        )
-        await queue.put(wattageData)
+        gateway.submit(2, device_pb2.DeviceType.SMART_PLUG, wattage)
 
 
-async def motion_sensor_device(queue):
+async def motion_sensor_device(gateway):
     while True:
         await asyncio.sleep(5)
         motion = random.choice([True, False])
-        motionData = device_pb2.Data(
-            device_id=3,
-            timestamp=datetime.now(timezone.utc).isoformat() + "Z",
-            device_type=device_pb2.DeviceType.MOTION_SENSOR,
-            motion=device_pb2.MotionData(motion=motion),
+        gateway.submit(3, device_pb2.DeviceType.MOTION_SENSOR, motion)
+
+
+async def simulate_devices(args):
+    gateway = Gateway(
+        args.target,
+        batch_size=args.batch_size,
+        max_delay=args.max_delay,
+        compression=args.compression,
+        buffer_size=args.buffer_size,
+        spill_dir=args.spill_dir,
+    )
+    gateway.start()
+    try:
+        await asyncio.gather(
+            thermometer_device(gateway),
+            smart_plug_device(gateway),
+            motion_sensor_device(gateway),
         )
-        await queue.put(motionData)
-
-
-async def simulate_devices():
-    async with grpc.aio.insecure_channel("localhost:50051") as channel:
-        stub = device_pb2_grpc.DeviceServiceStub(channel)
-
-        stream = stub.StreamDeviceData()
-
-        queue = asyncio.Queue()
-
-        task = asyncio.create_task(serialize(stream, queue))
-
-        simulate = asyncio.gather(
-            thermometer_device(queue),
-            smart_plug_device(queue),
-            motion_sensor_device(queue),
-        )
-
-        await asyncio.gather(task, simulate)
+    finally:
+        await gateway.close(timeout=5)
 
 
 if __name__ == "__main__":
-    asyncio.run(simulate_devices())
+    parser = argparse.ArgumentParser(description="Simulated devices behind a gateway")
+    parser.add_argument("--target", default="localhost:50051")
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="readings per DataBatch"
+    )
+    parser.add_argument(
+        "--max-delay",
+        type=float,
+        default=0.05,
+        help="seconds a reading may wait for its batch to fill",
+    )
+    parser.add_argument("--compression", choices=COMPRESSION, default="none")
+    parser.add_argument(
+        "--buffer-size",
+        type=int,
+        default=100_000,
+        help="readings held in memory while the server is unreachable",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        default=None,
+        help="spill readings beyond --buffer-size here instead of dropping them",
+    )
+    asyncio.run(simulate_devices(parser.parse_args()))
@@ -0,0 +1,328 @@
+import asyncio
+import collections
+import os
+import random
+import struct
+import time
+import zlib
+
+import grpc
+
+from gen import device_pb2
+from gen import device_pb2_grpc
+
+COMPRESSION = {
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
+# crc32 of the batch, length of the batch
+RECORD = struct.Struct("<II")
+SPILL_SUFFIX = ".spill"
+
+
+def records(buffer):
+    """Yield the DataBatch messages in a spill file, stopping at the first
+    torn or corrupt record."""
+    position = 0
+    end = len(buffer)
+    while position + RECORD.size <= end:
+        crc, length = RECORD.unpack_from(buffer, position)
+        start = position + RECORD.size
+        position = start + length
+        if position > end or zlib.crc32(buffer[start:position]) != crc:
+            return
+        yield device_pb2.DataBatch.FromString(buffer[start:position])
+
+
+class Spill:
+    """Batches written to ``directory`` while the memory buffer is full, read
+    back a file at a time, oldest first. Files left by an earlier run are
+    picked up, so readings survive a gateway restart during an outage."""
+
+    def __init__(self, directory, file_bytes=4 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.file_bytes = file_bytes
+        names = sorted(
+            name for name in os.listdir(directory) if name.endswith(SPILL_SUFFIX)
+        )
+        self.files = collections.deque(os.path.join(directory, n) for n in names)
+        # starts high so write_first always has lower numbers to use
+        self.sequence = int(names[-1][: -len(SPILL_SUFFIX)]) + 1 if names else 1 << 32
+        self.file = None
+        self.file_size = 0
+
+    def __bool__(self):
+        return bool(self.files)
+
+    def write(self, batch):
+        if self.file is None or self.file_size >= self.file_bytes:
+            self.rotate()
+        payload = batch.SerializeToString()
+        self.file.write(RECORD.pack(zlib.crc32(payload), len(payload)) + payload)
+        # handed to the OS per batch, so a crashed gateway loses nothing spilled
+        self.file.flush()
+        self.file_size += RECORD.size + len(payload)
+
+    def rotate(self):
+        self.close()
+        path = self.path(self.sequence)
+        self.sequence += 1
+        self.files.append(path)
+        self.file = open(path, "ab")
+        self.file_size = 0
+
+    def write_first(self, batches):
+        """Spills ``batches`` ahead of every spilled file."""
+        if not self.files:
+            for batch in batches:
+                self.write(batch)
+            return
+        first = os.path.basename(self.files[0])
+        path = self.path(int(first[: -len(SPILL_SUFFIX)]) - 1)
+        with open(path, "wb") as f:
+            for batch in batches:
+                payload = batch.SerializeToString()
+                f.write(RECORD.pack(zlib.crc32(payload), len(payload)) + payload)
+        self.files.appendleft(path)
+
+    def path(self, sequence):
+        return os.path.join(self.directory, f"{sequence:016d}{SPILL_SUFFIX}")
+
+    def take(self):
+        """Removes the oldest file and returns its batches."""
+        path = self.files.popleft()
+        if self.file is not None and self.file.name == path:
+            self.close()
+        with open(path, "rb") as f:
+            batches = list(records(f.read()))
+        os.remove(path)
+        return batches
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class Gateway:
+    """Streams the readings of many local sensors to the server as DataBatch
+    messages.
+
+    ``submit`` adds a reading to the open batch, which is sealed once it
+    holds ``batch_size`` readings or its first reading is ``max_delay``
+    seconds old. Sealed batches wait in a buffer of up to ``buffer_size``
+    readings; past that they spill to ``spill_dir``, or the oldest are
+    dropped when there is none. A single StreamIngest stream sends them in
+    order, as far ahead of the server's acks as its credits allow, and a
+    batch leaves memory only once acked. When the stream fails the gateway
+    reconnects with jittered exponential backoff and resends the unacked
+    batches, then the rest of the buffer and the spilled batches.
+    """
+
+    def __init__(
+        self,
+        target,
+        batch_size=500,
+        max_delay=0.05,
+        compression="none",
+        buffer_size=100_000,
+        spill_dir=None,
+        backoff_base=0.1,
+        backoff_cap=10.0,
+    ):
+        self.target = target
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.compression = COMPRESSION[compression]
+        self.buffer_size = buffer_size
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.batch = device_pb2.DataBatch()
+        self.opened_at = 0.0
+        # bumped per sealed batch, so the latency timer skips batches sealed
+        # by size in the meantime
+        self.generation = 0
+        self.opened = asyncio.Event()
+        self.buffer = collections.deque()
+        self.buffered = 0
+        self.spill = Spill(spill_dir) if spill_dir is not None else None
+        self.ready = asyncio.Event()
+        # (sequence, batch) written to the current stream but not yet acked
+        self.inflight = collections.deque()
+        self.acked = 0
+        self.credits = 0
+        self.granted = asyncio.Event()
+        self.attempt = 0
+        self.closing = False
+        self.tasks = []
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def submit(self, device_id, device_type, value, timestamp=None):
+        batch = self.batch
+        batch.device_ids.append(device_id)
+        batch.device_types.append(device_type)
+        batch.values.append(float(value))
+        batch.timestamps_unix_nanos.append(
+            time.time_ns() if timestamp is None else timestamp
+        )
+        count = len(batch.device_ids)
+        if count >= self.batch_size:
+            self.seal()
+        elif count == 1:
+            self.opened_at = time.monotonic()
+            self.opened.set()
+
+    def seal(self):
+        batch = self.batch
+        if not batch.device_ids:
+            return
+        self.batch = device_pb2.DataBatch()
+        self.generation += 1
+        self.opened.clear()
+        self.enqueue(batch)
+        self.ready.set()
+
+    def enqueue(self, batch):
+        count = len(batch.device_ids)
+        if self.spill:
+            # once spilling, later batches follow the spilled ones to disk
+            self.spill.write(batch)
+            return
+        if self.buffered + count > self.buffer_size:
+            if self.spill is not None:
+                self.spill.write(batch)
+                return
+            while self.buffer and self.buffered + count > self.buffer_size:
+                dropped = self.buffer.popleft()
+                self.buffered -= len(dropped.device_ids)
+                self.dropped += len(dropped.device_ids)
+        self.buffer.append(batch)
+        self.buffered += count
+
+    async def next_batch(self):
+        while True:
+            if self.buffer:
+                batch = self.buffer.popleft()
+                self.buffered -= len(batch.device_ids)
+                return batch
+            if self.spill:
+                for batch in self.spill.take():
+                    self.buffer.append(batch)
+                    self.buffered += len(batch.device_ids)
+                continue
+            if self.closing:
+                return None
+            self.ready.clear()
+            await self.ready.wait()
+
+    async def flush_on_delay(self):
+        while True:
+            await self.opened.wait()
+            generation = self.generation
+            await asyncio.sleep(self.opened_at + self.max_delay - time.monotonic())
+            if generation == self.generation:
+                self.seal()
+
+    async def send(self):
+        while True:
+            try:
+                async with grpc.aio.insecure_channel(self.target) as channel:
+                    stub = device_pb2_grpc.DeviceServiceStub(channel)
+                    stream = stub.StreamIngest(compression=self.compression)
+                    if await self.stream_batches(stream):
+                        return
+            except (grpc.aio.AioRpcError, asyncio.InvalidStateError):
+                pass
+            # full jitter, so gateways cut off together don't return together
+            delay = min(self.backoff_cap, self.backoff_base * 2**self.attempt)
+            self.attempt += 1
+            self.reconnects += 1
+            await asyncio.sleep(random.uniform(0, delay))
+
+    async def stream_batches(self, stream):
+        """Sends batches until the gateway closes; True once all are acked."""
+        inflight = self.inflight
+        sequence = 0
+        self.acked = 0
+        self.credits = 0
+        acks = asyncio.create_task(self.read_acks(stream))
+        try:
+            while True:
+                while sequence >= self.acked + self.credits:
+                    if acks.done():
+                        acks.result()
+                        return False
+                    self.granted.clear()
+                    await self.granted.wait()
+                batch = await self.next_batch()
+                if batch is None:
+                    break
+                sequence += 1
+                inflight.append((sequence, batch))
+                await stream.write(
+                    device_pb2.IngestRequest(sequence=sequence, batch=batch)
+                )
+            await stream.done_writing()
+            await acks
+            return not inflight
+        finally:
+            acks.cancel()
+            # unacked batches go out first on the next stream
+            while inflight:
+                _, batch = inflight.pop()
+                self.buffer.appendleft(batch)
+                self.buffered += len(batch.device_ids)
+
+    async def read_acks(self, stream):
+        try:
+            async for response in stream:
+                self.acked = response.acked_sequence
+                self.credits = response.credits
+                inflight = self.inflight
+                while inflight and inflight[0][0] <= self.acked:
+                    _, batch = inflight.popleft()
+                    self.sent += len(batch.device_ids)
+                self.attempt = 0
+                self.granted.set()
+        finally:
+            self.granted.set()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self.tasks = [
+            loop.create_task(self.flush_on_delay()),
+            loop.create_task(self.send()),
+        ]
+
+    async def close(self, timeout=None):
+        """Sends what is buffered, waiting up to ``timeout`` seconds while
+        the server is unreachable; anything left stays spilled."""
+        flusher, sender = self.tasks
+        flusher.cancel()
+        self.seal()
+        self.closing = True
+        self.ready.set()
+        try:
+            await asyncio.wait_for(sender, timeout)
+        except asyncio.TimeoutError:
+            if self.spill is not None:
+                self.spill.write_first(self.buffer)
+                self.buffer.clear()
+                self.buffered = 0
+        if self.spill is not None:
+            self.spill.close()
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "buffered": self.buffered,
+            "inflight": len(self.inflight),
+            "spilled_files": len(self.spill.files) if self.spill is not None else 0,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: admin.proto
+# Protobuf Python Version: 6.31.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC, 6, 31, 1, "", "admin.proto"
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
+    b'\n\x0b\x61\x64min.proto"\x11\n\x0fGetRulesRequest"%\n\x0fSetRulesRequest\x12\x12\n\nrules_json\x18\x01 \x01(\t"V\n\rRulesResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0f\n\x07version\x18\x03 \x01(\x04\x12\x12\n\nrules_json\x18\x04 \x01(\t"\x13\n\x11GetTracingRequest"n\n\x11SetTracingRequest\x12\x14\n\x07\x65nabled\x18\x01 \x01(\x08H\x00\x88\x01\x01\x12\x18\n\x0bsample_rate\x18\x02 \x01(\x01H\x01\x88\x01\x01\x12\r\n\x05reset\x18\x03 \x01(\x08\x42\n\n\x08_enabledB\x0e\n\x0c_sample_rate"Y\n\x0cStageLatency\x12\r\n\x05stage\x18\x01 \x01(\t\x12\x0e\n\x06\x62ounds\x18\x02 \x03(\x01\x12\x0e\n\x06\x63ounts\x18\x03 \x03(\x04\x12\r\n\x05\x63ount\x18\x04 \x01(\x04\x12\x0b\n\x03sum\x18\x05 \x01(\x01"V\n\x0fTracingResponse\x12\x0f\n\x07\x65nabled\x18\x01 \x01(\x08\x12\x13\n\x0bsample_rate\x18\x02 \x01(\x01\x12\x1d\n\x06stages\x18\x03 \x03(\x0b\x32\r.StageLatency"R\n\x0eProfileRequest\x12\x0f\n\x07seconds\x18\x01 \x01(\x01\x12\x1a\n\x04mode\x18\x02 \x01(\x0e\x32\x0c.ProfileMode\x12\x13\n\x0binterval_ms\x18\x03 \x01(\x01"0\n\x0fProfileResponse\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\x12\x0f\n\x07summary\x18\x02 \x01(\t*)\n\x0bProfileMode\x12\x0c\n\x08\x43PROFILE\x10\x00\x12\x0c\n\x08SAMPLING\x10\x01\x32\x80\x02\n\x0c\x41\x64minService\x12,\n\x08GetRules\x12\x10.GetRulesRequest\x1a\x0e.RulesResponse\x12,\n\x08SetRules\x12\x10.SetRulesRequest\x1a\x0e.RulesResponse\x12\x32\n\nGetTracing\x12\x12.GetTracingRequest\x1a\x10.TracingResponse\x12\x32\n\nSetTracing\x12\x12.SetTracingRequest\x1a\x10.TracingResponse\x12,\n\x07Profile\x12\x0f.ProfileRequest\x1a\x10.ProfileResponseb\x06proto3'
+)
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, "admin_pb2", _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+    DESCRIPTOR._loaded_options = None
+    _globals["_PROFILEMODE"]._serialized_start = 607
+    _globals["_PROFILEMODE"]._serialized_end = 648
+    _globals["_GETRULESREQUEST"]._serialized_start = 15
+    _globals["_GETRULESREQUEST"]._serialized_end = 32
+    _globals["_SETRULESREQUEST"]._serialized_start = 34
+    _globals["_SETRULESREQUEST"]._serialized_end = 71
+    _globals["_RULESRESPONSE"]._serialized_start = 73
+    _globals["_RULESRESPONSE"]._serialized_end = 159
+    _globals["_GETTRACINGREQUEST"]._serialized_start = 161
+    _globals["_GETTRACINGREQUEST"]._serialized_end = 180
+    _globals["_SETTRACINGREQUEST"]._serialized_start = 182
+    _globals["_SETTRACINGREQUEST"]._serialized_end = 292
+    _globals["_STAGELATENCY"]._serialized_start = 294
+    _globals["_STAGELATENCY"]._serialized_end = 383
+    _globals["_TRACINGRESPONSE"]._serialized_start = 385
+    _globals["_TRACINGRESPONSE"]._serialized_end = 471
+    _globals["_PROFILEREQUEST"]._serialized_start = 473
+    _globals["_PROFILEREQUEST"]._serialized_end = 555
+    _globals["_PROFILERESPONSE"]._serialized_start = 557
+    _globals["_PROFILERESPONSE"]._serialized_end = 605
+    _globals["_ADMINSERVICE"]._serialized_start = 651
+    _globals["_ADMINSERVICE"]._serialized_end = 907
+# @@protoc_insertion_point(module_scope)
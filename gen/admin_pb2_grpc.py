@@ -0,0 +1,293 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+from . import admin_pb2 as admin__pb2
+
+GRPC_GENERATED_VERSION = "1.74.0"
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+
+    _version_not_supported = first_version_is_lower(
+        GRPC_VERSION, GRPC_GENERATED_VERSION
+    )
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f"The grpc package installed is at version {GRPC_VERSION},"
+        + f" but the generated code in admin_pb2_grpc.py depends on"
+        + f" grpcio>={GRPC_GENERATED_VERSION}."
+        + f" Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}"
+        + f" or downgrade your generated code using grpcio-tools<={GRPC_VERSION}."
+    )
+
+
+class AdminServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.GetRules = channel.unary_unary(
+            "/AdminService/GetRules",
+            request_serializer=admin__pb2.GetRulesRequest.SerializeToString,
+            response_deserializer=admin__pb2.RulesResponse.FromString,
+            _registered_method=True,
+        )
+        self.SetRules = channel.unary_unary(
+            "/AdminService/SetRules",
+            request_serializer=admin__pb2.SetRulesRequest.SerializeToString,
+            response_deserializer=admin__pb2.RulesResponse.FromString,
+            _registered_method=True,
+        )
+        self.GetTracing = channel.unary_unary(
+            "/AdminService/GetTracing",
+            request_serializer=admin__pb2.GetTracingRequest.SerializeToString,
+            response_deserializer=admin__pb2.TracingResponse.FromString,
+            _registered_method=True,
+        )
+        self.SetTracing = channel.unary_unary(
+            "/AdminService/SetTracing",
+            request_serializer=admin__pb2.SetTracingRequest.SerializeToString,
+            response_deserializer=admin__pb2.TracingResponse.FromString,
+            _registered_method=True,
+        )
+        self.Profile = channel.unary_unary(
+            "/AdminService/Profile",
+            request_serializer=admin__pb2.ProfileRequest.SerializeToString,
+            response_deserializer=admin__pb2.ProfileResponse.FromString,
+            _registered_method=True,
+        )
+
+
+class AdminServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def GetRules(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SetRules(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def GetTracing(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def SetTracing(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def Profile(self, request, context):
+        """Profiles the server for a while, then returns the profile."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+
+def add_AdminServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+        "GetRules": grpc.unary_unary_rpc_method_handler(
+            servicer.GetRules,
+            request_deserializer=admin__pb2.GetRulesRequest.FromString,
+            response_serializer=admin__pb2.RulesResponse.SerializeToString,
+        ),
+        "SetRules": grpc.unary_unary_rpc_method_handler(
+            servicer.SetRules,
+            request_deserializer=admin__pb2.SetRulesRequest.FromString,
+            response_serializer=admin__pb2.RulesResponse.SerializeToString,
+        ),
+        "GetTracing": grpc.unary_unary_rpc_method_handler(
+            servicer.GetTracing,
+            request_deserializer=admin__pb2.GetTracingRequest.FromString,
+            response_serializer=admin__pb2.TracingResponse.SerializeToString,
+        ),
+        "SetTracing": grpc.unary_unary_rpc_method_handler(
+            servicer.SetTracing,
+            request_deserializer=admin__pb2.SetTracingRequest.FromString,
+            response_serializer=admin__pb2.TracingResponse.SerializeToString,
+        ),
+        "Profile": grpc.unary_unary_rpc_method_handler(
+            servicer.Profile,
+            request_deserializer=admin__pb2.ProfileRequest.FromString,
+            response_serializer=admin__pb2.ProfileResponse.SerializeToString,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+        "AdminService", rpc_method_handlers
+    )
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers("AdminService", rpc_method_handlers)
+
+
+# This class is part of an EXPERIMENTAL API.
+class AdminService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def GetRules(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/AdminService/GetRules",
+            admin__pb2.GetRulesRequest.SerializeToString,
+            admin__pb2.RulesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SetRules(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/AdminService/SetRules",
+            admin__pb2.SetRulesRequest.SerializeToString,
+            admin__pb2.RulesResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def GetTracing(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/AdminService/GetTracing",
+            admin__pb2.GetTracingRequest.SerializeToString,
+            admin__pb2.TracingResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def SetTracing(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/AdminService/SetTracing",
+            admin__pb2.SetTracingRequest.SerializeToString,
+            admin__pb2.TracingResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def Profile(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/AdminService/Profile",
+            admin__pb2.ProfileRequest.SerializeToString,
+            admin__pb2.ProfileResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
@@ -18,8 +18,10 @@ _runtime_version.ValidateProtobufRuntimeVersion(
 _sym_db = _symbol_database.Default()
 
 
+from . import device_pb2 as device__pb2
+
 DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
-    b'\n\x0b\x61lert.proto"r\n\x0c\x41lertRequest\x12&\n\tsubscribe\x18\x01 \x01(\x0b\x32\x11.SubscribeRequestH\x00\x12*\n\x0bunsubscribe\x18\x02 \x01(\x0b\x32\x13.UnsubscribeRequestH\x00\x42\x0e\n\x0crequest_type"8\n\x10SubscribeRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x11\n\tdevice_id\x18\x02 \x01(\t":\n\x12UnsubscribeRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x11\n\tdevice_id\x18\x02 \x01(\t"b\n\rAlertResponse\x12\x1b\n\x03\x61\x63k\x18\x01 \x01(\x0b\x32\x0c.AckResponseH\x00\x12#\n\x05\x61lert\x18\x02 \x01(\x0b\x32\x12.AlertNotificationH\x00\x42\x0f\n\rresponse_type"/\n\x0b\x41\x63kResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08"J\n\x11\x41lertNotification\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\t2A\n\x0c\x41lertService\x12\x31\n\x0cStreamAlerts\x12\r.AlertRequest\x1a\x0e.AlertResponse(\x01\x30\x01\x62\x06proto3'
+    b'\n\x0b\x61lert.proto\x1a\x0c\x64\x65vice.proto"\xfa\x01\n\x0c\x41lertRequest\x12&\n\tsubscribe\x18\x01 \x01(\x0b\x32\x11.SubscribeRequestH\x00\x12*\n\x0bunsubscribe\x18\x02 \x01(\x0b\x32\x13.UnsubscribeRequestH\x00\x12 \n\x06replay\x18\x03 \x01(\x0b\x32\x0e.ReplayRequestH\x00\x12/\n\x0e\x62ulk_subscribe\x18\x04 \x01(\x0b\x32\x15.BulkSubscribeRequestH\x00\x12\x33\n\x10\x62ulk_unsubscribe\x18\x05 \x01(\x0b\x32\x17.BulkUnsubscribeRequestH\x00\x42\x0e\n\x0crequest_type"n\n\x10SubscribeRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x11\n\tdevice_id\x18\x02 \x01(\t\x12\x1f\n\x07pattern\x18\x03 \x01(\x0b\x32\x0e.DevicePattern\x12\x13\n\x0b\x64\x65\x62ounce_ms\x18\x04 \x01(\r"[\n\x12UnsubscribeRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x11\n\tdevice_id\x18\x02 \x01(\t\x12\x1f\n\x07pattern\x18\x03 \x01(\x0b\x32\x0e.DevicePattern"t\n\x14\x42ulkSubscribeRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x12\n\ndevice_ids\x18\x02 \x03(\t\x12 \n\x08patterns\x18\x03 \x03(\x0b\x32\x0e.DevicePattern\x12\x13\n\x0b\x64\x65\x62ounce_ms\x18\x04 \x01(\r"a\n\x16\x42ulkUnsubscribeRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x12\n\ndevice_ids\x18\x02 \x03(\t\x12 \n\x08patterns\x18\x03 \x03(\x0b\x32\x0e.DevicePattern"l\n\rDevicePattern\x12"\n\x0b\x64\x65vice_type\x18\x01 \x01(\x0e\x32\x0b.DeviceTypeH\x00\x12\x1c\n\x08id_range\x18\x02 \x01(\x0b\x32\x08.IdRangeH\x00\x12\x10\n\x06prefix\x18\x03 \x01(\tH\x00\x42\x07\n\x05match"&\n\x07IdRange\x12\r\n\x05\x66irst\x18\x01 \x01(\x03\x12\x0c\n\x04last\x18\x02 \x01(\x03"_\n\rReplayRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x16\n\x0c\x61\x66ter_offset\x18\x02 \x01(\x04H\x00\x12\x1a\n\x10since_unix_nanos\x18\x03 \x01(\x03H\x00\x42\x07\n\x05start"b\n\rAlertResponse\x12\x1b\n\x03\x61\x63k\x18\x01 \x01(\x0b\x32\x0c.AckResponseH\x00\x12#\n\x05\x61lert\x18\x02 \x01(\x0b\x32\x12.AlertNotificationH\x00\x42\x0f\n\rresponse_type">\n\x0b\x41\x63kResponse\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\r\n\x05\x63ount\x18\x03 \x01(\r"\x90\x02\n\x11\x41lertNotification\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x15\n\ttimestamp\x18\x03 \x01(\tB\x02\x18\x01\x12\x0e\n\x06offset\x18\x04 \x01(\x04\x12 \n\x0b\x64\x65vice_type\x18\x05 \x01(\x0e\x32\x0b.DeviceType\x12\r\n\x05value\x18\x06 \x01(\x01\x12\r\n\x05\x63ount\x18\x07 \x01(\r\x12\x1b\n\x0f\x66irst_timestamp\x18\x08 \x01(\tB\x02\x18\x01\x12\x11\n\tmax_value\x18\t \x01(\x01\x12\x1c\n\x14timestamp_unix_nanos\x18\n \x01(\x03\x12"\n\x1a\x66irst_timestamp_unix_nanos\x18\x0b \x01(\x03\x32\x41\n\x0c\x41lertService\x12\x31\n\x0cStreamAlerts\x12\r.AlertRequest\x1a\x0e.AlertResponse(\x01\x30\x01\x62\x06proto3'
 )
 
 _globals = globals()
@@ -27,18 +29,38 @@ _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, "alert_pb2", _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
     DESCRIPTOR._loaded_options = None
-    _globals["_ALERTREQUEST"]._serialized_start = 15
-    _globals["_ALERTREQUEST"]._serialized_end = 129
-    _globals["_SUBSCRIBEREQUEST"]._serialized_start = 131
-    _globals["_SUBSCRIBEREQUEST"]._serialized_end = 187
-    _globals["_UNSUBSCRIBEREQUEST"]._serialized_start = 189
-    _globals["_UNSUBSCRIBEREQUEST"]._serialized_end = 247
-    _globals["_ALERTRESPONSE"]._serialized_start = 249
-    _globals["_ALERTRESPONSE"]._serialized_end = 347
-    _globals["_ACKRESPONSE"]._serialized_start = 349
-    _globals["_ACKRESPONSE"]._serialized_end = 396
-    _globals["_ALERTNOTIFICATION"]._serialized_start = 398
-    _globals["_ALERTNOTIFICATION"]._serialized_end = 472
-    _globals["_ALERTSERVICE"]._serialized_start = 474
-    _globals["_ALERTSERVICE"]._serialized_end = 539
+    _globals["_ALERTNOTIFICATION"].fields_by_name["timestamp"]._loaded_options = None
+    _globals["_ALERTNOTIFICATION"].fields_by_name[
+        "timestamp"
+    ]._serialized_options = b"\030\001"
+    _globals["_ALERTNOTIFICATION"].fields_by_name[
+        "first_timestamp"
+    ]._loaded_options = None
+    _globals["_ALERTNOTIFICATION"].fields_by_name[
+        "first_timestamp"
+    ]._serialized_options = b"\030\001"
+    _globals["_ALERTREQUEST"]._serialized_start = 30
+    _globals["_ALERTREQUEST"]._serialized_end = 280
+    _globals["_SUBSCRIBEREQUEST"]._serialized_start = 282
+    _globals["_SUBSCRIBEREQUEST"]._serialized_end = 392
+    _globals["_UNSUBSCRIBEREQUEST"]._serialized_start = 394
+    _globals["_UNSUBSCRIBEREQUEST"]._serialized_end = 485
+    _globals["_BULKSUBSCRIBEREQUEST"]._serialized_start = 487
+    _globals["_BULKSUBSCRIBEREQUEST"]._serialized_end = 603
+    _globals["_BULKUNSUBSCRIBEREQUEST"]._serialized_start = 605
+    _globals["_BULKUNSUBSCRIBEREQUEST"]._serialized_end = 702
+    _globals["_DEVICEPATTERN"]._serialized_start = 704
+    _globals["_DEVICEPATTERN"]._serialized_end = 812
+    _globals["_IDRANGE"]._serialized_start = 814
+    _globals["_IDRANGE"]._serialized_end = 852
+    _globals["_REPLAYREQUEST"]._serialized_start = 854
+    _globals["_REPLAYREQUEST"]._serialized_end = 949
+    _globals["_ALERTRESPONSE"]._serialized_start = 951
+    _globals["_ALERTRESPONSE"]._serialized_end = 1049
+    _globals["_ACKRESPONSE"]._serialized_start = 1051
+    _globals["_ACKRESPONSE"]._serialized_end = 1113
+    _globals["_ALERTNOTIFICATION"]._serialized_start = 1116
+    _globals["_ALERTNOTIFICATION"]._serialized_end = 1388
+    _globals["_ALERTSERVICE"]._serialized_start = 1390
+    _globals["_ALERTSERVICE"]._serialized_end = 1455
 # @@protoc_insertion_point(module_scope)
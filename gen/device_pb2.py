@@ -19,7 +19,7 @@ _sym_db = _symbol_database.Default()
 
 
 DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
-    b'\n\x0c\x64\x65vice.proto"\xc0\x01\n\x04\x44\x61ta\x12\x11\n\tdevice_id\x18\x01 \x01(\x05\x12 \n\x0b\x64\x65vice_type\x18\x02 \x01(\x0e\x32\x0b.DeviceType\x12\x11\n\ttimestamp\x18\x03 \x01(\t\x12\'\n\x0btemperature\x18\x04 \x01(\x0b\x32\x10.TemperatureDataH\x00\x12\x1d\n\x07wattage\x18\x05 \x01(\x0b\x32\n.PowerDataH\x00\x12\x1d\n\x06motion\x18\x06 \x01(\x0b\x32\x0b.MotionDataH\x00\x42\t\n\x07payload"&\n\x0fTemperatureData\x12\x13\n\x0btemperature\x18\x01 \x01(\x02"\x1c\n\tPowerData\x12\x0f\n\x07wattage\x18\x01 \x01(\x02"\x1c\n\nMotionData\x12\x0e\n\x06motion\x18\x01 \x01(\x08"\x1a\n\x08Response\x12\x0e\n\x06status\x18\x01 \x01(\t*M\n\nDeviceType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0f\n\x0bTHERMOMETER\x10\x01\x12\x0e\n\nSMART_PLUG\x10\x02\x12\x11\n\rMOTION_SENSOR\x10\x03\x32\x37\n\rDeviceService\x12&\n\x10StreamDeviceData\x12\x05.Data\x1a\t.Response(\x01\x62\x06proto3'
+    b'\n\x0c\x64\x65vice.proto"\xe2\x01\n\x04\x44\x61ta\x12\x11\n\tdevice_id\x18\x01 \x01(\x05\x12 \n\x0b\x64\x65vice_type\x18\x02 \x01(\x0e\x32\x0b.DeviceType\x12\x15\n\ttimestamp\x18\x03 \x01(\tB\x02\x18\x01\x12\x1c\n\x14timestamp_unix_nanos\x18\x07 \x01(\x03\x12\'\n\x0btemperature\x18\x04 \x01(\x0b\x32\x10.TemperatureDataH\x00\x12\x1d\n\x07wattage\x18\x05 \x01(\x0b\x32\n.PowerDataH\x00\x12\x1d\n\x06motion\x18\x06 \x01(\x0b\x32\x0b.MotionDataH\x00\x42\t\n\x07payload"&\n\x0fTemperatureData\x12\x13\n\x0btemperature\x18\x01 \x01(\x02"\x1c\n\tPowerData\x12\x0f\n\x07wattage\x18\x01 \x01(\x02"\x1c\n\nMotionData\x12\x0e\n\x06motion\x18\x01 \x01(\x08"\x89\x01\n\tDataBatch\x12\x12\n\ndevice_ids\x18\x01 \x03(\x05\x12!\n\x0c\x64\x65vice_types\x18\x02 \x03(\x0e\x32\x0b.DeviceType\x12\x16\n\ntimestamps\x18\x03 \x03(\tB\x02\x18\x01\x12\x0e\n\x06values\x18\x04 \x03(\x02\x12\x1d\n\x15timestamps_unix_nanos\x18\x05 \x03(\x03"<\n\rIngestRequest\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12\x19\n\x05\x62\x61tch\x18\x02 \x01(\x0b\x32\n.DataBatch"9\n\x0eIngestResponse\x12\x16\n\x0e\x61\x63ked_sequence\x18\x01 \x01(\x04\x12\x0f\n\x07\x63redits\x18\x02 \x01(\r"v\n\x0eHistoryRequest\x12\x11\n\tdevice_id\x18\x01 \x01(\x05\x12\x18\n\x10start_unix_nanos\x18\x02 \x01(\x03\x12\x16\n\x0e\x65nd_unix_nanos\x18\x03 \x01(\x03\x12\x1f\n\nresolution\x18\x04 \x01(\x0e\x32\x0b.Resolution"l\n\x0fHistoryResponse\x12\x12\n\ntimestamps\x18\x01 \x03(\x03\x12\x0e\n\x06values\x18\x02 \x03(\x01\x12\x0b\n\x03min\x18\x03 \x03(\x01\x12\x0b\n\x03max\x18\x04 \x03(\x01\x12\x0c\n\x04mean\x18\x05 \x03(\x01\x12\r\n\x05\x63ount\x18\x06 \x03(\x03"\x1a\n\x08Response\x12\x0e\n\x06status\x18\x01 \x01(\t*M\n\nDeviceType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0f\n\x0bTHERMOMETER\x10\x01\x12\x0e\n\nSMART_PLUG\x10\x02\x12\x11\n\rMOTION_SENSOR\x10\x03*-\n\nResolution\x12\x07\n\x03RAW\x10\x00\x12\n\n\x06SECOND\x10\x01\x12\n\n\x06MINUTE\x10\x02\x32\xcf\x01\n\rDeviceService\x12&\n\x10StreamDeviceData\x12\x05.Data\x1a\t.Response(\x01\x12.\n\x13StreamDeviceBatches\x12\n.DataBatch\x1a\t.Response(\x01\x12\x33\n\x0cStreamIngest\x12\x0e.IngestRequest\x1a\x0f.IngestResponse(\x01\x30\x01\x12\x31\n\x0cQueryHistory\x12\x0f.HistoryRequest\x1a\x10.HistoryResponseb\x06proto3'
 )
 
 _globals = globals()
@@ -27,18 +27,36 @@ _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, "device_pb2", _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
     DESCRIPTOR._loaded_options = None
-    _globals["_DEVICETYPE"]._serialized_start = 339
-    _globals["_DEVICETYPE"]._serialized_end = 416
+    _globals["_DATA"].fields_by_name["timestamp"]._loaded_options = None
+    _globals["_DATA"].fields_by_name["timestamp"]._serialized_options = b"\030\001"
+    _globals["_DATABATCH"].fields_by_name["timestamps"]._loaded_options = None
+    _globals["_DATABATCH"].fields_by_name[
+        "timestamps"
+    ]._serialized_options = b"\030\001"
+    _globals["_DEVICETYPE"]._serialized_start = 864
+    _globals["_DEVICETYPE"]._serialized_end = 941
+    _globals["_RESOLUTION"]._serialized_start = 943
+    _globals["_RESOLUTION"]._serialized_end = 988
     _globals["_DATA"]._serialized_start = 17
-    _globals["_DATA"]._serialized_end = 209
-    _globals["_TEMPERATUREDATA"]._serialized_start = 211
-    _globals["_TEMPERATUREDATA"]._serialized_end = 249
-    _globals["_POWERDATA"]._serialized_start = 251
-    _globals["_POWERDATA"]._serialized_end = 279
-    _globals["_MOTIONDATA"]._serialized_start = 281
-    _globals["_MOTIONDATA"]._serialized_end = 309
-    _globals["_RESPONSE"]._serialized_start = 311
-    _globals["_RESPONSE"]._serialized_end = 337
-    _globals["_DEVICESERVICE"]._serialized_start = 418
-    _globals["_DEVICESERVICE"]._serialized_end = 473
+    _globals["_DATA"]._serialized_end = 243
+    _globals["_TEMPERATUREDATA"]._serialized_start = 245
+    _globals["_TEMPERATUREDATA"]._serialized_end = 283
+    _globals["_POWERDATA"]._serialized_start = 285
+    _globals["_POWERDATA"]._serialized_end = 313
+    _globals["_MOTIONDATA"]._serialized_start = 315
+    _globals["_MOTIONDATA"]._serialized_end = 343
+    _globals["_DATABATCH"]._serialized_start = 346
+    _globals["_DATABATCH"]._serialized_end = 483
+    _globals["_INGESTREQUEST"]._serialized_start = 485
+    _globals["_INGESTREQUEST"]._serialized_end = 545
+    _globals["_INGESTRESPONSE"]._serialized_start = 547
+    _globals["_INGESTRESPONSE"]._serialized_end = 604
+    _globals["_HISTORYREQUEST"]._serialized_start = 606
+    _globals["_HISTORYREQUEST"]._serialized_end = 724
+    _globals["_HISTORYRESPONSE"]._serialized_start = 726
+    _globals["_HISTORYRESPONSE"]._serialized_end = 834
+    _globals["_RESPONSE"]._serialized_start = 836
+    _globals["_RESPONSE"]._serialized_end = 862
+    _globals["_DEVICESERVICE"]._serialized_start = 991
+    _globals["_DEVICESERVICE"]._serialized_end = 1198
 # @@protoc_insertion_point(module_scope)
@@ -43,6 +43,24 @@ class DeviceServiceStub(object):
             response_deserializer=device__pb2.Response.FromString,
             _registered_method=True,
         )
+        self.StreamDeviceBatches = channel.stream_unary(
+            "/DeviceService/StreamDeviceBatches",
+            request_serializer=device__pb2.DataBatch.SerializeToString,
+            response_deserializer=device__pb2.Response.FromString,
+            _registered_method=True,
+        )
+        self.StreamIngest = channel.stream_stream(
+            "/DeviceService/StreamIngest",
+            request_serializer=device__pb2.IngestRequest.SerializeToString,
+            response_deserializer=device__pb2.IngestResponse.FromString,
+            _registered_method=True,
+        )
+        self.QueryHistory = channel.unary_unary(
+            "/DeviceService/QueryHistory",
+            request_serializer=device__pb2.HistoryRequest.SerializeToString,
+            response_deserializer=device__pb2.HistoryResponse.FromString,
+            _registered_method=True,
+        )
 
 
 class DeviceServiceServicer(object):
@@ -54,6 +72,24 @@ class DeviceServiceServicer(object):
         context.set_details("Method not implemented!")
         raise NotImplementedError("Method not implemented!")
 
+    def StreamDeviceBatches(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def StreamIngest(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+    def QueryHistory(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
 
 def add_DeviceServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -62,6 +98,21 @@ def add_DeviceServiceServicer_to_server(servicer, server):
             request_deserializer=device__pb2.Data.FromString,
             response_serializer=device__pb2.Response.SerializeToString,
         ),
+        "StreamDeviceBatches": grpc.stream_unary_rpc_method_handler(
+            servicer.StreamDeviceBatches,
+            request_deserializer=device__pb2.DataBatch.FromString,
+            response_serializer=device__pb2.Response.SerializeToString,
+        ),
+        "StreamIngest": grpc.stream_stream_rpc_method_handler(
+            servicer.StreamIngest,
+            request_deserializer=device__pb2.IngestRequest.FromString,
+            response_serializer=device__pb2.IngestResponse.SerializeToString,
+        ),
+        "QueryHistory": grpc.unary_unary_rpc_method_handler(
+            servicer.QueryHistory,
+            request_deserializer=device__pb2.HistoryRequest.FromString,
+            response_serializer=device__pb2.HistoryResponse.SerializeToString,
+        ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
         "DeviceService", rpc_method_handlers
@@ -103,3 +154,93 @@ class DeviceService(object):
             metadata,
             _registered_method=True,
         )
+
+    @staticmethod
+    def StreamDeviceBatches(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            "/DeviceService/StreamDeviceBatches",
+            device__pb2.DataBatch.SerializeToString,
+            device__pb2.Response.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def StreamIngest(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            "/DeviceService/StreamIngest",
+            device__pb2.IngestRequest.SerializeToString,
+            device__pb2.IngestResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
+
+    @staticmethod
+    def QueryHistory(
+        request,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            "/DeviceService/QueryHistory",
+            device__pb2.HistoryRequest.SerializeToString,
+            device__pb2.HistoryResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: federation.proto
+# Protobuf Python Version: 6.31.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC, 6, 31, 1, "", "federation.proto"
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from . import device_pb2 as device__pb2
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(
+    b'\n\x10\x66\x65\x64\x65ration.proto\x1a\x0c\x64\x65vice.proto"D\n\x08Interest\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12\x14\n\x0cpattern_json\x18\x02 \x01(\t\x12\x0f\n\x07present\x18\x03 \x01(\x08"Q\n\tPeerAlert\x12\x11\n\tdevice_id\x18\x01 \x01(\t\x12 \n\x0b\x64\x65vice_type\x18\x02 \x01(\x0e\x32\x0b.DeviceType\x12\x0f\n\x07payload\x18\x03 \x01(\x0c"\x9c\x01\n\tPeerBatch\x12\x0c\n\x04node\x18\x01 \x01(\t\x12\x1b\n\x08interest\x18\x02 \x03(\x0b\x32\t.Interest\x12\x1a\n\x06\x61lerts\x18\x03 \x03(\x0b\x32\n.PeerAlert\x12\x17\n\x08readings\x18\x04 \x03(\x0b\x32\x05.Data\x12\x1b\n\x07\x62\x61tches\x18\x05 \x03(\x0b\x32\n.DataBatch\x12\x12\n\nrules_json\x18\x06 \x01(\t"\x0e\n\x0cLinkResponse28\n\x11\x46\x65\x64\x65rationService\x12#\n\x04Link\x12\n.PeerBatch\x1a\r.LinkResponse(\x01\x62\x06proto3'
+)
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, "federation_pb2", _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+    DESCRIPTOR._loaded_options = None
+    _globals["_INTEREST"]._serialized_start = 34
+    _globals["_INTEREST"]._serialized_end = 102
+    _globals["_PEERALERT"]._serialized_start = 104
+    _globals["_PEERALERT"]._serialized_end = 185
+    _globals["_PEERBATCH"]._serialized_start = 188
+    _globals["_PEERBATCH"]._serialized_end = 344
+    _globals["_LINKRESPONSE"]._serialized_start = 346
+    _globals["_LINKRESPONSE"]._serialized_end = 360
+    _globals["_FEDERATIONSERVICE"]._serialized_start = 362
+    _globals["_FEDERATIONSERVICE"]._serialized_end = 418
+# @@protoc_insertion_point(module_scope)
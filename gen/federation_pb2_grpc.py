@@ -0,0 +1,114 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+from . import federation_pb2 as federation__pb2
+
+GRPC_GENERATED_VERSION = "1.74.0"
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+
+    _version_not_supported = first_version_is_lower(
+        GRPC_VERSION, GRPC_GENERATED_VERSION
+    )
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f"The grpc package installed is at version {GRPC_VERSION},"
+        + f" but the generated code in federation_pb2_grpc.py depends on"
+        + f" grpcio>={GRPC_GENERATED_VERSION}."
+        + f" Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}"
+        + f" or downgrade your generated code using grpcio-tools<={GRPC_VERSION}."
+    )
+
+
+class FederationServiceStub(object):
+    """Links between the nodes of a federated deployment. Every node keeps one
+    Link call open to each peer and streams to it whatever accumulated since
+    its last message.
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Link = channel.stream_unary(
+            "/FederationService/Link",
+            request_serializer=federation__pb2.PeerBatch.SerializeToString,
+            response_deserializer=federation__pb2.LinkResponse.FromString,
+            _registered_method=True,
+        )
+
+
+class FederationServiceServicer(object):
+    """Links between the nodes of a federated deployment. Every node keeps one
+    Link call open to each peer and streams to it whatever accumulated since
+    its last message.
+    """
+
+    def Link(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details("Method not implemented!")
+        raise NotImplementedError("Method not implemented!")
+
+
+def add_FederationServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+        "Link": grpc.stream_unary_rpc_method_handler(
+            servicer.Link,
+            request_deserializer=federation__pb2.PeerBatch.FromString,
+            response_serializer=federation__pb2.LinkResponse.SerializeToString,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+        "FederationService", rpc_method_handlers
+    )
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers("FederationService", rpc_method_handlers)
+
+
+# This class is part of an EXPERIMENTAL API.
+class FederationService(object):
+    """Links between the nodes of a federated deployment. Every node keeps one
+    Link call open to each peer and streams to it whatever accumulated since
+    its last message.
+    """
+
+    @staticmethod
+    def Link(
+        request_iterator,
+        target,
+        options=(),
+        channel_credentials=None,
+        call_credentials=None,
+        insecure=False,
+        compression=None,
+        wait_for_ready=None,
+        timeout=None,
+        metadata=None,
+    ):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            "/FederationService/Link",
+            federation__pb2.PeerBatch.SerializeToString,
+            federation__pb2.LinkResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True,
+        )
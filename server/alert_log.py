@@ -0,0 +1,293 @@
+import asyncio
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+# crc32 of the rest, length of the rest, offset, append time, device_id length
+HEADER = struct.Struct("<IIQqH")
+SEGMENT_SUFFIX = ".log"
+
+
+class Segment:
+    __slots__ = ("base", "path")
+
+    def __init__(self, base, path):
+        self.base = base
+        self.path = path
+
+
+def encode(offset, appended_ns, device_id, payload):
+    device_id = device_id.encode()
+    body = (
+        struct.pack("<QqH", offset, appended_ns, len(device_id)) + device_id + payload
+    )
+    length = struct.pack("<I", len(body))
+    return struct.pack("<I", zlib.crc32(length + body)) + length + body
+
+
+def records(buffer):
+    """Yield (end, offset, appended_ns, device_id, payload) per record, where
+    ``end`` is the position just past it, stopping at the end of the buffer
+    or the first torn or corrupt record."""
+    position = 0
+    end = len(buffer)
+    while position + HEADER.size <= end:
+        crc, length, offset, appended_ns, device_id_size = HEADER.unpack_from(
+            buffer, position
+        )
+        record_end = position + 8 + length
+        if length < HEADER.size - 8 + device_id_size or record_end > end:
+            return
+        if zlib.crc32(buffer[position + 4 : record_end]) != crc:
+            return
+        device_start = position + HEADER.size
+        payload_start = device_start + device_id_size
+        yield (
+            record_end,
+            offset,
+            appended_ns,
+            bytes(buffer[device_start:payload_start]).decode(),
+            bytes(buffer[payload_start:record_end]),
+        )
+        position = record_end
+
+
+class AlertLog:
+    """Append-only alert log split into segment files.
+
+    ``append`` only buffers the record and hands out its offset; a background
+    task writes buffered records and fsyncs them in a worker thread every
+    ``flush_interval`` seconds, so ingest never waits on the disk. Sealed
+    segments are read through mmap for replay, and are deleted once the log
+    exceeds ``max_bytes`` or they are older than ``max_age`` seconds. With
+    ``compact`` set, sealed segments are rewritten to keep only the newest
+    alert per device.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segment_bytes=64 * 1024 * 1024,
+        flush_interval=0.05,
+        max_bytes=None,
+        max_age=None,
+        compact=False,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compact_sealed = compact
+        self.compacted_upto = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # segments and the active file are only touched under this lock,
+        # since flushing happens on a worker thread
+        self.lock = threading.Lock()
+        self.segments = []
+        self.active = None
+        self.active_size = 0
+        self.next_offset = 1
+        self.flushed_offset = 0
+        # (offset, appended_ns, device_id, payload, encoded) not yet on disk
+        self.pending = []
+        self.flushing = []
+        self.task = None
+        self.recover()
+
+    def segment_path(self, base):
+        return os.path.join(self.directory, f"{base:020d}{SEGMENT_SUFFIX}")
+
+    def recover(self):
+        bases = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        self.segments = [Segment(base, self.segment_path(base)) for base in bases]
+        if not self.segments:
+            self.open_segment(1)
+            return
+
+        # drop anything after the last intact record of the newest segment
+        last = self.segments[-1]
+        with open(last.path, "rb") as f:
+            data = f.read()
+        valid = 0
+        self.next_offset = last.base
+        for valid, offset, _, _, _ in records(data):
+            self.next_offset = offset + 1
+        with open(last.path, "r+b") as f:
+            f.truncate(valid)
+        self.flushed_offset = self.next_offset - 1
+        self.active = open(last.path, "ab")
+        self.active_size = valid
+
+    def open_segment(self, base):
+        path = self.segment_path(base)
+        self.active = open(path, "ab")
+        self.active_size = 0
+        self.segments.append(Segment(base, path))
+
+    # the alert gets next_offset, which callers may embed in the payload first
+    def append(self, device_id, payload):
+        offset = self.next_offset
+        self.next_offset = offset + 1
+        appended_ns = time.time_ns()
+        self.pending.append(
+            (
+                offset,
+                appended_ns,
+                device_id,
+                payload,
+                encode(offset, appended_ns, device_id, payload),
+            )
+        )
+        return offset
+
+    def write(self, batch):
+        with self.lock:
+            for offset, _, _, _, encoded in batch:
+                if self.active_size >= self.segment_bytes:
+                    self.active.flush()
+                    os.fsync(self.active.fileno())
+                    self.active.close()
+                    self.open_segment(offset)
+                self.active.write(encoded)
+                self.active_size += len(encoded)
+            self.active.flush()
+            os.fsync(self.active.fileno())
+
+    async def flush(self):
+        if not self.pending:
+            return
+        self.flushing, self.pending = self.pending, []
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.write, self.flushing)
+        self.flushed_offset = self.flushing[-1][0]
+        self.flushing = []
+
+    async def run(self):
+        last_retention = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.monotonic() - last_retention >= 1.0:
+                last_retention = time.monotonic()
+                await loop.run_in_executor(None, self.enforce_retention)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+        with self.lock:
+            self.active.close()
+
+    def enforce_retention(self):
+        if self.compact_sealed:
+            self.compact()
+        now = time.time()
+        with self.lock:
+            sizes = [os.path.getsize(s.path) for s in self.segments]
+            total = sum(sizes)
+            # the active segment is always kept
+            while len(self.segments) > 1:
+                oldest = self.segments[0]
+                too_big = self.max_bytes is not None and total > self.max_bytes
+                too_old = (
+                    self.max_age is not None
+                    and now - os.path.getmtime(oldest.path) > self.max_age
+                )
+                if not (too_big or too_old):
+                    break
+                # readers that already mmapped the file keep their view
+                os.unlink(oldest.path)
+                total -= sizes.pop(0)
+                self.segments.pop(0)
+
+    def compact(self):
+        with self.lock:
+            sealed = list(self.segments[:-1])
+        # only worth redoing once another segment has been sealed
+        if not sealed or sealed[-1].base <= self.compacted_upto:
+            return
+        self.compacted_upto = sealed[-1].base
+
+        latest = {}
+        for segment in sealed:
+            with open(segment.path, "rb") as f:
+                for _, offset, _, device_id, _ in records(f.read()):
+                    latest[device_id] = offset
+
+        for segment in sealed:
+            with open(segment.path, "rb") as f:
+                data = f.read()
+            kept = bytearray()
+            for _, offset, appended_ns, device_id, payload in records(data):
+                if latest[device_id] == offset:
+                    kept += encode(offset, appended_ns, device_id, payload)
+            if len(kept) == len(data):
+                continue
+            temporary = segment.path + ".compact"
+            with open(temporary, "wb") as f:
+                f.write(kept)
+                f.flush()
+                os.fsync(f.fileno())
+            with self.lock:
+                if os.path.exists(segment.path):
+                    os.replace(temporary, segment.path)
+                else:
+                    os.unlink(temporary)
+
+    def read(self, after_offset=None, since_ns=None):
+        """Yield (offset, device_id, payload) for alerts after ``after_offset``
+        or appended at or after ``since_ns``, oldest first, up to the newest
+        buffered alert."""
+        with self.lock:
+            segments = list(self.segments)
+            flushed_offset = self.flushed_offset
+        in_memory = self.flushing + self.pending
+
+        def wanted(offset, appended_ns):
+            if after_offset is not None:
+                return offset > after_offset
+            return appended_ns >= since_ns
+
+        start = 0
+        if after_offset is not None:
+            bases = [segment.base for segment in segments]
+            start = max(bisect.bisect_right(bases, after_offset + 1) - 1, 0)
+
+        for segment in segments[start:]:
+            try:
+                f = open(segment.path, "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size == 0:
+                    continue
+                # the last write to a segment is its newest record
+                if since_ns is not None and stat.st_mtime_ns < since_ns:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    for _, offset, appended_ns, device_id, payload in records(view):
+                        if offset > flushed_offset:
+                            break
+                        if wanted(offset, appended_ns):
+                            yield offset, device_id, payload
+
+        for offset, appended_ns, device_id, payload, _ in in_memory:
+            if offset > flushed_offset and wanted(offset, appended_ns):
+                yield offset, device_id, payload
@@ -0,0 +1,235 @@
+import argparse
+import collections
+import csv
+import mmap
+import multiprocessing
+import os
+import time
+from array import array
+
+from gen import device_pb2
+from server.metrics import type_name
+from server.recorder import BATCH, DATA, INGEST, records, segment_paths
+from server.rules import DEFAULT_RULES, RuleError, compile_rules, load_rules
+from server.strategies import fired_indices
+
+
+def decode_segment(path):
+    """Columns of every reading in a recorded segment, in recorded order:
+    device ids, device types, values and timestamps in unix nanos (0 for
+    readings that only had the deprecated string timestamp)."""
+    device_ids = array("i")
+    device_types = array("i")
+    values = array("d")
+    timestamps = array("q")
+    if os.path.getsize(path) == 0:
+        return path, device_ids, device_types, values, timestamps
+    with open(path, "rb") as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapped:
+        for kind, payload in records(mapped):
+            if kind == DATA:
+                data = device_pb2.Data.FromString(payload)
+                payload_type = data.WhichOneof("payload")
+                if payload_type == "temperature":
+                    value = data.temperature.temperature
+                elif payload_type == "wattage":
+                    value = data.wattage.wattage
+                elif payload_type == "motion":
+                    value = 1.0 if data.motion.motion else 0.0
+                else:
+                    continue
+                device_ids.append(data.device_id)
+                device_types.append(data.device_type)
+                values.append(value)
+                timestamps.append(data.timestamp_unix_nanos)
+                continue
+            if kind == BATCH:
+                batch = device_pb2.DataBatch.FromString(payload)
+            elif kind == INGEST:
+                batch = device_pb2.IngestRequest.FromString(payload).batch
+            else:
+                continue
+            count = len(batch.device_ids)
+            if len(batch.device_types) != count or len(batch.values) != count:
+                # rejected by the server as well
+                continue
+            device_ids.extend(batch.device_ids)
+            device_types.extend(batch.device_types)
+            values.extend(batch.values)
+            if len(batch.timestamps_unix_nanos) == count:
+                timestamps.extend(batch.timestamps_unix_nanos)
+            else:
+                timestamps.extend([0] * count)
+    return path, device_ids, device_types, values, timestamps
+
+
+def decode_segments(paths, processes):
+    """Yields decoded segments in order. With more than one process the
+    segments are decoded in parallel, ahead of the one being evaluated."""
+    if processes <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield decode_segment(path)
+        return
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(min(processes, len(paths))) as pool:
+        yield from pool.imap(decode_segment, paths)
+
+
+class Backtest:
+    """Alerts a rule set fires over recorded readings, fed to it in recorded
+    order, so stateful rules see each device's readings as the server did."""
+
+    def __init__(self, config, keep_alerts=False):
+        self.rules = compile_rules(config)
+        self.readings = collections.Counter()
+        self.alerts = collections.Counter()
+        self.device_alerts = collections.Counter()
+        # (row, device_id, device_type, timestamp, value) per alert
+        self.fired = [] if keep_alerts else None
+        self.seconds = 0.0
+
+    def run(self, device_ids, device_types, values, timestamps, offset, batch_size):
+        started = time.perf_counter()
+        evaluate = self.rules.evaluate
+        self.readings.update(device_types)
+        for start in range(0, len(device_ids), batch_size):
+            end = start + batch_size
+            batch_ids = device_ids[start:end]
+            batch_types = device_types[start:end]
+            mask = evaluate(batch_ids, batch_types, values[start:end])
+            for i in fired_indices(mask):
+                device_id = batch_ids[i]
+                self.alerts[batch_types[i]] += 1
+                self.device_alerts[device_id] += 1
+                if self.fired is not None:
+                    self.fired.append(
+                        (
+                            offset + start + i,
+                            device_id,
+                            batch_types[i],
+                            timestamps[start + i],
+                            values[start + i],
+                        )
+                    )
+        self.seconds += time.perf_counter() - started
+
+
+def print_report(candidate, baseline, readings, top):
+    columns = f"{'device type':>14} {'readings':>10} {'alerts':>9}"
+    if baseline is not None:
+        columns += f" {'baseline':>9} {'change':>8}"
+    print(columns)
+    for device_type in sorted(candidate.readings):
+        alerts = candidate.alerts[device_type]
+        line = (
+            f"{type_name(device_type):>14} {candidate.readings[device_type]:>10}"
+            f" {alerts:>9}"
+        )
+        if baseline is not None:
+            before = baseline.alerts[device_type]
+            line += f" {before:>9} {alerts - before:>+8}"
+        print(line)
+    total = sum(candidate.alerts.values())
+    print(f"{'total':>14} {readings:>10} {total:>9}", end="")
+    if baseline is not None:
+        before = sum(baseline.alerts.values())
+        print(f" {before:>9} {total - before:>+8}")
+    else:
+        print()
+
+    if baseline is None:
+        print(f"\nTop {top} devices by alerts:")
+        for device_id, count in candidate.device_alerts.most_common(top):
+            print(f"{device_id:>14} {count:>9}")
+        return
+    changes = collections.Counter(candidate.device_alerts)
+    changes.subtract(baseline.device_alerts)
+    changed = [(d, c) for d, c in changes.items() if c]
+    print(f"\n{len(changed)} devices alert differently; top {top} by change:")
+    changed.sort(key=lambda item: -abs(item[1]))
+    for device_id, change in changed[:top]:
+        print(
+            f"{device_id:>14} {baseline.device_alerts[device_id]:>9}"
+            f" -> {candidate.device_alerts[device_id]:<9} {change:>+8}"
+        )
+
+
+def write_alerts(path, backtest):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["reading", "device_id", "device_type", "timestamp_unix_nanos", "value"]
+        )
+        for row, device_id, device_type, timestamp, value in backtest.fired:
+            writer.writerow([row, device_id, type_name(device_type), timestamp, value])
+
+
+def main(args):
+    try:
+        config = load_rules(args.rules) if args.rules else DEFAULT_RULES
+        candidate = Backtest(config, keep_alerts=args.alerts is not None)
+        baseline = Backtest(load_rules(args.baseline)) if args.baseline else None
+    except (OSError, RuleError) as e:
+        raise SystemExit(e)
+    paths = segment_paths(args.directory)
+    if not paths:
+        raise SystemExit(f"No recorded segments in {args.directory}")
+
+    started = time.perf_counter()
+    readings = 0
+    segments = decode_segments(paths, args.processes)
+    for _, device_ids, device_types, values, timestamps in segments:
+        for backtest in (candidate, baseline):
+            if backtest is not None:
+                backtest.run(
+                    device_ids,
+                    device_types,
+                    values,
+                    timestamps,
+                    readings,
+                    args.batch_size,
+                )
+        readings += len(device_ids)
+    elapsed = time.perf_counter() - started
+
+    size = sum(os.path.getsize(path) for path in paths)
+    print(
+        f"{readings} readings in {len(paths)} segments ({size / 1024 / 1024:.1f} MiB)"
+    )
+    print_report(candidate, baseline, readings, args.top)
+    evaluated = candidate.seconds + (baseline.seconds if baseline else 0.0)
+    print(
+        f"\n{elapsed:.2f} s with {args.processes} decoding processes,"
+        f" {evaluated:.2f} s of it evaluating,"
+        f" {readings / elapsed if elapsed else 0:,.0f} readings/s"
+    )
+    if args.alerts is not None:
+        write_alerts(args.alerts, candidate)
+        print(f"Alerts written to {args.alerts}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay readings recorded with server --record through a"
+        " rule set, as fast as they decode, and report the alerts it fires"
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--rules", default=None, help="candidate rules file; default rules if unset"
+    )
+    parser.add_argument(
+        "--baseline", default=None, help="rules file to compare the candidate with"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="decode segments in this many processes",
+    )
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--alerts", default=None, metavar="CSV", help="write the candidate's alerts"
+    )
+    main(parser.parse_args())
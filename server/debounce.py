@@ -0,0 +1,89 @@
+import asyncio
+
+from gen import alert_pb2
+
+
+class Summary:
+    __slots__ = ("alert", "count", "first", "max_value")
+
+    def __init__(self, alert):
+        self.alert = alert
+        self.count = 1
+        self.first = alert
+        self.max_value = alert.value
+
+    def add(self, alert):
+        self.alert = alert
+        self.count += 1
+        if alert.value > self.max_value:
+            self.max_value = alert.value
+
+    def encode(self):
+        alert = self.alert
+        return alert_pb2.AlertResponse(
+            alert=alert_pb2.AlertNotification(
+                device_id=alert.device_id,
+                message=alert.message,
+                timestamp=alert.timestamp,
+                timestamp_unix_nanos=alert.timestamp_unix_nanos,
+                offset=alert.offset,
+                device_type=alert.device_type,
+                value=alert.value,
+                count=self.count,
+                first_timestamp=self.first.timestamp,
+                first_timestamp_unix_nanos=self.first.timestamp_unix_nanos,
+                max_value=self.max_value,
+            )
+        ).SerializeToString()
+
+
+class Debouncer:
+    """Merges the alerts of debounced subscriptions per (client, device).
+
+    The first alert after a quiet period is delivered at once and opens a
+    window. Alerts arriving during the window are folded into one summary,
+    sent when the window closes, which opens the next window. A sustained
+    breach costs one message per window per subscriber rather than one per
+    reading, and nothing is encoded for the alerts folded in. ``summaries``
+    counts the summaries queued so far.
+    """
+
+    def __init__(self, queues):
+        # shared with AlertManager, so a takeover's new queue is picked up
+        self.queues = queues
+        # (client_id, device_id) -> Summary, or None for a window with no
+        # alerts folded in yet
+        self.windows = {}
+        self.summaries = 0
+
+    def offer(self, client_id, window, device_id, payload, alert=None):
+        """Returns True if the alert was queued now rather than folded in."""
+        key = (client_id, device_id)
+        windows = self.windows
+        if key not in windows:
+            queue = self.queues.get(client_id)
+            queued = queue is not None and queue.put_alert(device_id, payload)
+            self.open(key, window)
+            return queued
+        if alert is None:
+            alert = alert_pb2.AlertResponse.FromString(payload).alert
+        summary = windows[key]
+        if summary is None:
+            windows[key] = Summary(alert)
+        else:
+            summary.add(alert)
+        return False
+
+    def open(self, key, window):
+        self.windows[key] = None
+        asyncio.get_running_loop().call_later(window, self.close, key, window)
+
+    def close(self, key, window):
+        summary = self.windows.pop(key, None)
+        if summary is None:
+            return
+        queue = self.queues.get(key[0])
+        if queue is not None:
+            if queue.put_alert(key[1], summary.encode()):
+                self.summaries += 1
+            self.open(key, window)
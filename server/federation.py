@@ -0,0 +1,354 @@
+import asyncio
+import bisect
+import collections
+import functools
+import hashlib
+import json
+import random
+
+import grpc
+
+from gen import federation_pb2
+from gen import federation_pb2_grpc
+from server.patterns import PatternIndex
+from server.workers import split_batch
+
+# device ids whose owner node is remembered
+OWNER_CACHE_SIZE = 65536
+
+
+def ring_hash(key):
+    # stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hashing of device ids onto nodes.
+
+    Every node takes ``points`` positions on the ring and owns the ids that
+    hash up to each of them, so adding or removing a node moves only the
+    devices of the ring segments it takes or gives up.
+    """
+
+    def __init__(self, nodes, points=64):
+        ring = sorted(
+            (ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(points)
+        )
+        self.hashes = [h for h, _ in ring]
+        self.nodes = [node for _, node in ring]
+
+    def owner(self, key):
+        i = bisect.bisect(self.hashes, ring_hash(str(key)))
+        return self.nodes[i % len(self.nodes)]
+
+
+class PeerLink:
+    """The Link call this node keeps open to one peer.
+
+    What is sent to the peer accumulates in ``batch`` while the previous
+    message is being written, so a burst crosses in a few large messages
+    and a lone alert goes out at once. A batch is sealed after
+    ``max_batch`` alerts or reading rows, and at most ``max_pending`` of
+    them wait; past that, and while the peer is unreachable, they are
+    dropped. Interest is never dropped: each new link starts with all of
+    it.
+    """
+
+    def __init__(
+        self,
+        federation,
+        node,
+        max_batch=1000,
+        max_pending=100_000,
+        backoff_base=0.1,
+        backoff_cap=2.0,
+    ):
+        self.federation = federation
+        self.node = node
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.batch = federation_pb2.PeerBatch()
+        self.batch_size = 0
+        self.sealed = collections.deque()
+        self.pending = 0
+        self.connected = False
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def data_batch(self, count=1):
+        """The batch to add ``count`` alerts or reading rows to, or None if
+        they are dropped."""
+        if not self.connected or self.pending + count > self.max_pending:
+            self.dropped += count
+            return None
+        if self.batch_size >= self.max_batch:
+            self.sealed.append((self.batch, self.batch_size))
+            self.batch = federation_pb2.PeerBatch()
+            self.batch_size = 0
+        self.batch_size += count
+        self.pending += count
+        self.ready.set()
+        return self.batch
+
+    def control_batch(self):
+        """The batch to add interest or rules to, or None while there is no
+        link; the next one carries the full interest anyway."""
+        if not self.connected:
+            return None
+        self.ready.set()
+        return self.batch
+
+    def take(self):
+        if self.sealed:
+            batch, size = self.sealed.popleft()
+        else:
+            batch, size = self.batch, self.batch_size
+            self.batch = federation_pb2.PeerBatch()
+            self.batch_size = 0
+        self.pending -= size
+        return batch, size
+
+    async def run(self):
+        attempt = 0
+        while True:
+            try:
+                async with grpc.aio.insecure_channel(self.node) as channel:
+                    stream = federation_pb2_grpc.FederationServiceStub(channel).Link()
+                    hello = federation_pb2.PeerBatch(node=self.federation.node)
+                    self.federation.add_interest(self.node, hello)
+                    self.connected = True
+                    closed = asyncio.create_task(self.watch(stream))
+                    try:
+                        await stream.write(hello)
+                        attempt = 0
+                        await self.stream_batches(stream, closed)
+                    finally:
+                        closed.cancel()
+            except (grpc.aio.AioRpcError, asyncio.InvalidStateError):
+                pass
+            finally:
+                self.connected = False
+                self.dropped += self.pending
+                self.batch = federation_pb2.PeerBatch()
+                self.batch_size = 0
+                self.sealed.clear()
+                self.pending = 0
+            delay = min(self.backoff_cap, self.backoff_base * 2**attempt)
+            attempt += 1
+            self.reconnects += 1
+            await asyncio.sleep(random.uniform(0, delay))
+
+    async def stream_batches(self, stream, closed):
+        while not closed.done():
+            if not self.sealed and self.batch.ByteSize() == 0:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            batch, size = self.take()
+            await stream.write(batch)
+            self.sent += size
+        closed.result()
+
+    async def watch(self, stream):
+        # the call ends on its own only when the peer goes away
+        try:
+            await stream
+        finally:
+            self.ready.set()
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "pending": self.pending,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+        }
+
+
+class Federation(federation_pb2_grpc.FederationServiceServicer):
+    """Links independent server nodes, each reachable at the ``host:port`` in
+    ``peers``, so a subscriber on any node gets alerts for every device.
+
+    A consistent-hash ring over the node addresses assigns each device_id
+    an owner node. Readings that reach another node are forwarded to the
+    owner, so all of a device's readings are evaluated in one place. Each
+    node tells the owner of a device when it gains its first or loses its
+    last subscriber for it, and every peer about pattern subscriptions. An
+    alert only crosses to the nodes that asked for it.
+    """
+
+    def __init__(self, node, peers, alert_manager, device_service, **link_options):
+        self.node = node
+        self.ring = HashRing([node, *peers])
+        # hashing is the costly part of finding an owner; a new ring needs a
+        # new cache
+        self.owner_of = functools.lru_cache(OWNER_CACHE_SIZE)(self.ring.owner)
+        self.alert_manager = alert_manager
+        self.device_service = device_service
+        self.links = {peer: PeerLink(self, peer, **link_options) for peer in peers}
+        # device_id -> peers with subscribers for it, and what each peer asked for
+        self.remote_interest = collections.defaultdict(set)
+        self.remote_patterns = PatternIndex()
+        self.interest_of = {}
+        # the Link call each peer is currently streaming to us on
+        self.inbound = {}
+        self.tasks = []
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(link.run()) for link in self.links.values()]
+        self.alert_manager.publisher = self
+        self.device_service.router = self
+
+    def owner(self, device_id):
+        # readings carry int ids and subscriptions str ones
+        return self.owner_of(str(device_id))
+
+    def add_interest(self, peer, batch):
+        """Adds this node's interest that concerns ``peer`` to ``batch``."""
+        for device_id in self.alert_manager.subscribers:
+            if self.owner(device_id) == peer:
+                batch.interest.add(device_id=device_id, present=True)
+        for pattern in self.alert_manager.pattern_index.clients:
+            batch.interest.add(pattern_json=json.dumps(pattern), present=True)
+
+    async def Link(self, request_iterator, context):
+        peer = None
+        device_service = self.device_service
+        alert_manager = self.alert_manager
+        try:
+            async for batch in request_iterator:
+                if batch.node:
+                    peer = batch.node
+                    # a new link replaces whatever the peer's last one told us
+                    self.drop_interest(peer)
+                    self.inbound[peer] = context
+                for interest in batch.interest:
+                    self.apply_interest(peer, interest)
+                for alert in batch.alerts:
+                    alert_manager.deliver(
+                        alert.device_id, alert.payload, alert.device_type
+                    )
+                for data in batch.readings:
+                    await device_service.process_reading(data)
+                for rows in batch.batches:
+                    await device_service.process_batch(rows)
+                if batch.rules_json:
+                    device_service.set_rules(json.loads(batch.rules_json))
+        finally:
+            if peer is not None and self.inbound.get(peer) is context:
+                del self.inbound[peer]
+                self.drop_interest(peer)
+        return federation_pb2.LinkResponse()
+
+    def apply_interest(self, peer, interest):
+        devices, patterns = self.interest_of.setdefault(peer, (set(), set()))
+        if interest.pattern_json:
+            pattern = tuple(json.loads(interest.pattern_json))
+            if interest.present:
+                patterns.add(pattern)
+                self.remote_patterns.add(pattern, peer)
+            elif pattern in patterns:
+                patterns.discard(pattern)
+                self.remote_patterns.remove(pattern, peer)
+            return
+        device_id = interest.device_id
+        if interest.present:
+            devices.add(device_id)
+            self.remote_interest[device_id].add(peer)
+        elif device_id in devices:
+            devices.discard(device_id)
+            peers = self.remote_interest[device_id]
+            peers.discard(peer)
+            if not peers:
+                del self.remote_interest[device_id]
+
+    def drop_interest(self, peer):
+        devices, patterns = self.interest_of.pop(peer, ((), ()))
+        for device_id in devices:
+            peers = self.remote_interest[device_id]
+            peers.discard(peer)
+            if not peers:
+                del self.remote_interest[device_id]
+        for pattern in patterns:
+            self.remote_patterns.remove(pattern, peer)
+
+    # publisher interface used by AlertManager and DeviceService
+
+    def interest_changed(self, device_id, present):
+        owner = self.owner(device_id)
+        if owner == self.node:
+            return
+        batch = self.links[owner].control_batch()
+        if batch is not None:
+            batch.interest.add(device_id=device_id, present=present)
+
+    def pattern_interest_changed(self, pattern, present):
+        pattern_json = json.dumps(pattern)
+        for link in self.links.values():
+            batch = link.control_batch()
+            if batch is not None:
+                batch.interest.add(pattern_json=pattern_json, present=present)
+
+    def interested(self, device_id, device_type):
+        if device_id in self.remote_interest:
+            return True
+        return bool(self.remote_patterns) and bool(
+            self.remote_patterns.match(device_id, device_type)
+        )
+
+    def publish(self, device_id, device_type, payload):
+        peers = self.remote_interest.get(device_id, ())
+        if self.remote_patterns:
+            matched = self.remote_patterns.match(device_id, device_type)
+            if matched:
+                matched.update(peers)
+                peers = matched
+        for peer in peers:
+            batch = self.links[peer].data_batch()
+            if batch is not None:
+                batch.alerts.add(
+                    device_id=device_id, device_type=device_type, payload=payload
+                )
+
+    # router interface used by DeviceService
+
+    def share_rules(self, rules_json):
+        for link in self.links.values():
+            batch = link.control_batch()
+            if batch is not None:
+                batch.rules_json = rules_json
+
+    def owns(self, device_id):
+        return self.owner(device_id) == self.node
+
+    def owner_label(self, device_id):
+        return f"node {self.owner(device_id)}"
+
+    def forward_reading(self, data):
+        batch = self.links[self.owner(data.device_id)].data_batch()
+        if batch is not None:
+            batch.readings.append(data)
+
+    # forwards the rows other nodes own and returns the local ones, or None
+    def route_batch(self, batch):
+        owner = self.owner
+        owners = [owner(device_id) for device_id in batch.device_ids]
+        if all(node == self.node for node in owners):
+            return batch
+
+        parts = split_batch(batch, owners)
+        local = parts.pop(self.node, None)
+        for node, part in parts.items():
+            forwarded = self.links[node].data_batch(len(part.device_ids))
+            if forwarded is not None:
+                forwarded.batches.append(part)
+        return local
+
+    def stats(self):
+        return {peer: link.stats() for peer, link in self.links.items()}
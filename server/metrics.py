@@ -0,0 +1,156 @@
+import asyncio
+import bisect
+import collections
+
+from gen import device_pb2
+
+# seconds from a reading arriving to its alert sitting in subscriber queues
+ENQUEUE_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Counters for the ingest and alert pipeline.
+
+    Everything on the hot path is a plain integer or dict increment; queue
+    gauges are read from the alert manager only when metrics are rendered.
+    """
+
+    def __init__(self):
+        self.readings = collections.Counter()
+        self.strategy_hits = collections.Counter()
+        self.alerts = 0
+        self.deliveries = 0
+        self.enqueue_latency = Histogram(ENQUEUE_BUCKETS)
+
+    def render(self, alert_manager=None):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("iot_readings_total", "counter", "Device readings ingested.")
+        for device_type, count in sorted(self.readings.items()):
+            lines.append(
+                f'iot_readings_total{{device_type="{type_name(device_type)}"}} {count}'
+            )
+
+        family("iot_strategy_hits_total", "counter", "Readings that met a strategy.")
+        for device_type, count in sorted(self.strategy_hits.items()):
+            lines.append(
+                f'iot_strategy_hits_total{{device_type="{type_name(device_type)}"}} '
+                f"{count}"
+            )
+
+        family("iot_alerts_total", "counter", "Alerts fanned out to subscribers.")
+        lines.append(f"iot_alerts_total {self.alerts}")
+        deliveries = self.deliveries
+        if alert_manager is not None:
+            # a debounced alert counts once its window's summary is queued
+            deliveries += alert_manager.debouncer.summaries
+        family("iot_alert_deliveries_total", "counter", "Alerts queued for a client.")
+        lines.append(f"iot_alert_deliveries_total {deliveries}")
+
+        name = "iot_ingest_to_enqueue_seconds"
+        family(name, "histogram", "Time from reading ingest to alert enqueue.")
+        cumulative = 0
+        histogram = self.enqueue_latency
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum {histogram.sum}")
+        lines.append(f"{name}_count {histogram.count}")
+
+        if alert_manager is not None:
+            stats = alert_manager.client_stats()
+            for name, key, kind, help_text in (
+                ("iot_client_queue_depth", "depth", "gauge", "Pending responses."),
+                ("iot_client_queue_lag_seconds", "lag", "gauge", "Oldest alert age."),
+                (
+                    "iot_client_alerts_dropped_total",
+                    "dropped",
+                    "counter",
+                    "Alerts dropped by the overflow policy.",
+                ),
+                (
+                    "iot_client_alerts_coalesced_total",
+                    "coalesced",
+                    "counter",
+                    "Alerts merged into a pending one.",
+                ),
+            ):
+                family(name, kind, help_text)
+                for client_id, client in sorted(stats.items()):
+                    lines.append(
+                        f'{name}{{client_id="{escape(client_id)}"}} {client[key]}'
+                    )
+
+        lines.append("")
+        return "\n".join(lines)
+
+
+def type_name(device_type):
+    try:
+        return device_pb2.DeviceType.Name(device_type)
+    except ValueError:
+        return str(device_type)
+
+
+def escape(label):
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+async def serve_metrics(metrics, alert_manager, port, host="127.0.0.1"):
+    """Serve ``GET /metrics`` in the Prometheus text format."""
+
+    async def handle(reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1] == b"/metrics":
+                status = "200 OK"
+                body = metrics.render(alert_manager).encode()
+            else:
+                status = "404 Not Found"
+                body = b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,168 @@
+import bisect
+
+from gen import device_pb2
+
+# pattern tuples: (TYPE, device_type), (RANGE, first, last), (PREFIX, prefix)
+TYPE = "type"
+RANGE = "range"
+PREFIX = "prefix"
+
+
+def from_proto(pattern):
+    kind = pattern.WhichOneof("match")
+    if kind == "device_type":
+        return (TYPE, pattern.device_type)
+    if kind == "id_range":
+        first, last = pattern.id_range.first, pattern.id_range.last
+        if first > last:
+            raise ValueError(f"Empty device id range {first}-{last}")
+        return (RANGE, first, last)
+    if kind == "prefix":
+        return (PREFIX, pattern.prefix)
+    raise ValueError("Pattern has no match set")
+
+
+def describe(pattern):
+    kind = pattern[0]
+    if kind == TYPE:
+        try:
+            name = device_pb2.DeviceType.Name(pattern[1])
+        except ValueError:
+            name = str(pattern[1])
+        return f"devices of type {name}"
+    if kind == RANGE:
+        return f"devices {pattern[1]}-{pattern[2]}"
+    return f"devices {pattern[1]}*"
+
+
+class RangeIndex:
+    """Inclusive (first, last) intervals, kept in small sorted lists so they
+    can be added and removed one at a time.
+
+    Class k holds the intervals whose width (last - first) is below 2**k,
+    so one containing a point starts at most 2**k - 1 before it. Each class
+    is split into blocks of 2**k starting points, so a stab only reads the
+    two blocks that window can fall in, per class, and insert and delete
+    only shift the intervals of one block.
+    """
+
+    def __init__(self):
+        # width class -> number of intervals, (class, block) -> intervals
+        self.widths = {}
+        self.blocks = {}
+
+    def __len__(self):
+        return sum(self.widths.values())
+
+    def add(self, interval):
+        k = (interval[1] - interval[0]).bit_length()
+        self.widths[k] = self.widths.get(k, 0) + 1
+        bisect.insort(self.blocks.setdefault((k, interval[0] >> k), []), interval)
+
+    def remove(self, interval):
+        k = (interval[1] - interval[0]).bit_length()
+        key = (k, interval[0] >> k)
+        intervals = self.blocks[key]
+        del intervals[bisect.bisect_left(intervals, interval)]
+        if not intervals:
+            del self.blocks[key]
+        self.widths[k] -= 1
+        if not self.widths[k]:
+            del self.widths[k]
+
+    def stab(self, point):
+        """Yield the intervals containing ``point``."""
+        blocks = self.blocks
+        for k in self.widths:
+            block = point >> k
+            intervals = blocks.get((k, block - 1))
+            if intervals is not None:
+                # starts in the block before, at or after point - 2**k + 1
+                start = bisect.bisect_left(intervals, (point - (1 << k) + 1,))
+                for i in range(start, len(intervals)):
+                    if intervals[i][1] >= point:
+                        yield intervals[i]
+            intervals = blocks.get((k, block))
+            if intervals is not None:
+                for interval in intervals:
+                    if interval[0] > point:
+                        break
+                    if interval[1] >= point:
+                        yield interval
+
+
+class PatternIndex:
+    """Clients subscribed by pattern, indexed so matching one alert costs
+    a dict lookup per device type and prefix length plus a bisect per
+    range width class, and then grows only with the number of matching
+    patterns. Subscribing and unsubscribing update the indexes in place."""
+
+    def __init__(self):
+        # pattern -> client_ids; the per-kind maps share these sets
+        self.clients = {}
+        self.by_type = {}
+        self.prefixes = {}
+        self.longest_prefix = 0
+        self.ranges = {}
+        self.range_index = RangeIndex()
+
+    def __len__(self):
+        return len(self.clients)
+
+    def add(self, pattern, client_id):
+        """Returns True if ``pattern`` had no clients before."""
+        clients = self.clients.get(pattern)
+        if clients is not None:
+            clients.add(client_id)
+            return False
+        clients = self.clients[pattern] = {client_id}
+        kind = pattern[0]
+        if kind == TYPE:
+            self.by_type[pattern[1]] = clients
+        elif kind == PREFIX:
+            self.prefixes[pattern[1]] = clients
+            self.longest_prefix = max(self.longest_prefix, len(pattern[1]))
+        else:
+            self.ranges[pattern[1:]] = clients
+            self.range_index.add(pattern[1:])
+        return True
+
+    def remove(self, pattern, client_id):
+        """Returns True if ``pattern`` lost its last client."""
+        clients = self.clients.get(pattern)
+        if clients is None:
+            return False
+        clients.discard(client_id)
+        if clients:
+            return False
+        del self.clients[pattern]
+        kind = pattern[0]
+        if kind == TYPE:
+            del self.by_type[pattern[1]]
+        elif kind == PREFIX:
+            del self.prefixes[pattern[1]]
+        else:
+            del self.ranges[pattern[1:]]
+            self.range_index.remove(pattern[1:])
+        return True
+
+    def match(self, device_id, device_type):
+        """New set of the client_ids with a pattern matching the device."""
+        matched = set()
+        clients = self.by_type.get(device_type)
+        if clients:
+            matched |= clients
+        prefixes = self.prefixes
+        if prefixes:
+            for end in range(min(len(device_id), self.longest_prefix) + 1):
+                clients = prefixes.get(device_id[:end])
+                if clients:
+                    matched |= clients
+        if self.ranges:
+            try:
+                number = int(device_id)
+            except ValueError:
+                return matched
+            for interval in self.range_index.stab(number):
+                matched |= self.ranges[interval]
+        return matched
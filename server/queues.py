@@ -0,0 +1,165 @@
+import collections
+import time
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+
+# why a queue was closed, reported to the stream that was reading it
+OVERFLOW = "overflow"
+
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE, DISCONNECT)
+
+
+class AlertQueue:
+    """Per-client outbound queue that never blocks the producer.
+
+    ACKs are kept apart from alerts and are never dropped. Alerts are held
+    to ``maxsize`` entries; what happens past that depends on the policy:
+    drop the oldest alert, drop the incoming one, keep only the latest
+    pending alert per device (``coalesce``, which also merges below the
+    bound), or close the queue so the stream can be disconnected.
+
+    The reader sets ``listener``, which is called whenever a response
+    arrives or the queue closes, and drains the queue with ``pop``.
+    """
+
+    __slots__ = (
+        "maxsize",
+        "policy",
+        "acks",
+        "alerts",
+        "closed",
+        "close_reason",
+        "listener",
+        "enqueued",
+        "delivered",
+        "dropped",
+        "coalesced",
+        "max_lag",
+    )
+
+    def __init__(self, maxsize=1024, policy=DROP_OLDEST):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {policy!r}")
+        self.maxsize = maxsize
+        self.policy = policy
+        # rarely more than one pending, so a list; a deque's first block
+        # alone costs more than an idle stream's other queue state
+        self.acks = []
+        # (device_id, enqueued_at, response); keyed by device when coalescing
+        if policy == COALESCE:
+            self.alerts = collections.OrderedDict()
+        else:
+            self.alerts = collections.deque()
+        self.closed = False
+        self.close_reason = None
+        self.listener = None
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_lag = 0.0
+
+    def __len__(self):
+        return len(self.acks) + len(self.alerts)
+
+    def put_ack(self, response):
+        if self.closed:
+            return
+        self.acks.append(response)
+        self._wake()
+
+    def put_alert(self, device_id, response):
+        if self.closed:
+            return False
+        self.enqueued += 1
+        entry = (device_id, time.monotonic(), response)
+
+        if self.policy == COALESCE:
+            pending = self.alerts.get(device_id)
+            if pending is not None:
+                # keep the original place in line and its age, but the new payload
+                self.alerts[device_id] = (device_id, pending[1], response)
+                self.coalesced += 1
+                return True
+            if len(self.alerts) >= self.maxsize:
+                self.alerts.popitem(last=False)
+                self.dropped += 1
+            self.alerts[device_id] = entry
+        elif len(self.alerts) < self.maxsize:
+            self.alerts.append(entry)
+        elif self.policy == DROP_OLDEST:
+            self.alerts.popleft()
+            self.alerts.append(entry)
+            self.dropped += 1
+        elif self.policy == DROP_NEWEST:
+            self.dropped += 1
+            return False
+        else:
+            self.dropped += 1
+            self.close(OVERFLOW)
+            return False
+
+        self._wake()
+        return True
+
+    def close(self, reason=None):
+        if not self.closed:
+            self.closed = True
+            self.close_reason = reason
+        self._wake()
+
+    def clear(self):
+        self.acks.clear()
+        self.alerts.clear()
+
+    # move what is still pending in other (same policy) into this empty queue
+    def take_pending(self, other):
+        self.acks.extend(other.acks)
+        other.acks.clear()
+        self.alerts, other.alerts = other.alerts, self.alerts
+        self._wake()
+
+    def lag(self):
+        if not self.alerts:
+            return 0.0
+        if self.policy == COALESCE:
+            oldest = next(iter(self.alerts.values()))
+        else:
+            oldest = self.alerts[0]
+        return time.monotonic() - oldest[1]
+
+    def stats(self):
+        return {
+            "depth": len(self),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "lag": self.lag(),
+            "max_lag": self.max_lag,
+            "closed": self.closed,
+        }
+
+    # the next response, or None if there is none
+    def pop(self):
+        if self.acks:
+            return self.acks.pop(0)
+        if self.alerts:
+            if self.policy == COALESCE:
+                _, (_, enqueued_at, response) = self.alerts.popitem(last=False)
+            else:
+                _, enqueued_at, response = self.alerts.popleft()
+            lag = time.monotonic() - enqueued_at
+            if lag > self.max_lag:
+                self.max_lag = lag
+            self.delivered += 1
+            return response
+        return None
+
+    def _wake(self):
+        if self.listener is not None:
+            self.listener()
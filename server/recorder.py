@@ -0,0 +1,128 @@
+import asyncio
+import os
+import struct
+import threading
+
+# length of the message, then which message it is
+RECORD = struct.Struct("<IB")
+DATA = 0
+BATCH = 1
+INGEST = 2
+SEGMENT_SUFFIX = ".rec"
+
+
+def records(buffer):
+    """Yield (kind, message bytes) per record, stopping at the end of the
+    buffer or at a record torn by a crash."""
+    position = 0
+    end = len(buffer)
+    unpack = RECORD.unpack_from
+    while position + RECORD.size <= end:
+        length, kind = unpack(buffer, position)
+        start = position + RECORD.size
+        position = start + length
+        if position > end:
+            return
+        yield kind, buffer[start:position]
+
+
+def segment_paths(directory):
+    return [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(SEGMENT_SUFFIX)
+    ]
+
+
+class Recorder:
+    """Records the device messages the server receives to segment files in
+    ``directory``, byte for byte as they came off the wire, for backtests
+    and repeatable ingest benchmarks.
+
+    Messages are captured by the request deserializers, so recording costs
+    an append to a buffer and never re-encodes. A background task writes
+    the buffer out every ``flush_interval`` seconds in a worker thread. If
+    the disk falls more than ``max_buffer`` bytes behind, messages are
+    dropped and counted rather than held. A restarted server starts a new
+    segment after the existing ones.
+    """
+
+    def __init__(
+        self,
+        directory,
+        segment_bytes=64 * 1024 * 1024,
+        flush_interval=0.1,
+        max_buffer=64 * 1024 * 1024,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        existing = segment_paths(directory)
+        self.index = (
+            int(os.path.basename(existing[-1])[: -len(SEGMENT_SUFFIX)]) + 1
+            if existing
+            else 1
+        )
+        # a flush cancelled by close may still be writing on its thread
+        self.lock = threading.Lock()
+        self.file = None
+        self.file_size = 0
+        self.buffer = bytearray()
+        self.recorded = 0
+        self.dropped = 0
+        self.task = None
+
+    def deserializer(self, kind, from_string):
+        pack = RECORD.pack
+
+        def deserialize(payload):
+            buffer = self.buffer
+            if len(buffer) < self.max_buffer:
+                buffer += pack(len(payload), kind)
+                buffer += payload
+                self.recorded += 1
+            else:
+                self.dropped += 1
+            return from_string(payload)
+
+        return deserialize
+
+    def write(self, data):
+        with self.lock:
+            if self.file is None or self.file_size >= self.segment_bytes:
+                if self.file is not None:
+                    self.file.close()
+                name = f"{self.index:08d}{SEGMENT_SUFFIX}"
+                self.index += 1
+                self.file = open(os.path.join(self.directory, name), "ab")
+                self.file_size = 0
+            self.file.write(data)
+            self.file.flush()
+            self.file_size += len(data)
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        data, self.buffer = self.buffer, bytearray()
+        await asyncio.get_running_loop().run_in_executor(None, self.write, data)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,218 @@
+import asyncio
+import json
+import math
+import os
+
+from gen import device_pb2
+from server.strategies import (
+    EdgeStrategy,
+    EwmaStrategy,
+    HysteresisStrategy,
+    MotionSensorStrategy,
+    RateOfChangeStrategy,
+    ThresholdStrategy,
+    WindowMeanStrategy,
+    evaluate_batch,
+)
+
+# rule "kind" -> strategy class; the other keys of a rule are its arguments
+KINDS = {
+    "threshold": ThresholdStrategy,
+    "motion": MotionSensorStrategy,
+    "ewma": EwmaStrategy,
+    "window_mean": WindowMeanStrategy,
+    "hysteresis": HysteresisStrategy,
+    "rate_of_change": RateOfChangeStrategy,
+    "edge": EdgeStrategy,
+}
+# arguments that are true or false; every other argument is a number
+FLAG_ARGUMENTS = {"state"}
+
+DEFAULT_RULES = {
+    "device_types": {
+        "THERMOMETER": {"kind": "threshold", "threshold": 65},
+        "SMART_PLUG": {"kind": "threshold", "threshold": 200},
+        "MOTION_SENSOR": {"kind": "motion", "state": True},
+    }
+}
+
+# alert on crossings rather than on every reading past the threshold
+STATEFUL_RULES = {
+    "device_types": {
+        "THERMOMETER": {"kind": "hysteresis", "enter": 65, "exit": 63},
+        "SMART_PLUG": {"kind": "hysteresis", "enter": 200, "exit": 180},
+        "MOTION_SENSOR": {"kind": "edge", "state": True},
+    }
+}
+
+
+# device type given to overridden readings in a batch; every DeviceType
+# value, UNKNOWN included, may have a type rule
+OVERRIDDEN = -1
+
+
+class RuleError(ValueError):
+    pass
+
+
+class RuleSet:
+    """Compiled rules: one strategy per device_type plus per-device overrides.
+
+    A RuleSet is never modified once built; reloading builds a new one and
+    swaps the reference, so a stream always sees one complete rule set.
+    """
+
+    def __init__(self, config, by_type, by_device, specs, version):
+        self.config = config
+        self.by_type = by_type
+        self.by_device = by_device
+        self.specs = specs
+        self.version = version
+
+    def lookup(self, device_id, device_type):
+        strategy = self.by_device.get(device_id)
+        if strategy is None:
+            return self.by_type.get(device_type)
+        return strategy
+
+    def evaluate(self, device_ids, device_types, values, vectorized=None):
+        """Batch evaluation: per-type rules run through evaluate_batch, while
+        readings of overridden devices are checked one by one, so the cost
+        follows the readings and not the number of rules."""
+        by_device = self.by_device
+        overridden = (
+            [i for i, device_id in enumerate(device_ids) if device_id in by_device]
+            if by_device
+            else ()
+        )
+        if overridden:
+            device_types = list(device_types)
+            for i in overridden:
+                # matches no type rule, so evaluate_batch skips these
+                device_types[i] = OVERRIDDEN
+        mask = evaluate_batch(
+            self.by_type, device_types, values, vectorized, device_ids=device_ids
+        )
+        for i in overridden:
+            device_id = device_ids[i]
+            mask[i] = by_device[device_id].observe(device_id, values[i])
+        return mask
+
+
+def is_number(value):
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and math.isfinite(value)
+    )
+
+
+def compile_rule(spec):
+    if not isinstance(spec, dict) or spec.get("kind") not in KINDS:
+        raise RuleError(f"Rule needs a kind out of {', '.join(KINDS)}: {spec!r}")
+    arguments = {key: value for key, value in spec.items() if key != "kind"}
+    for key, value in arguments.items():
+        if key in FLAG_ARGUMENTS:
+            if not isinstance(value, bool):
+                raise RuleError(
+                    f"Bad {spec['kind']} rule {spec!r}: {key} must be true or false"
+                )
+        elif not is_number(value):
+            raise RuleError(f"Bad {spec['kind']} rule {spec!r}: {key} must be a number")
+    try:
+        strategy = KINDS[spec["kind"]](**arguments)
+        # a dry run on a second instance, as stateful strategies would keep
+        # the reading, so a rule that cannot evaluate fails here and not on
+        # the first alert
+        KINDS[spec["kind"]](**arguments).should_send(0.0)
+    except (TypeError, ValueError, ArithmeticError, LookupError) as e:
+        raise RuleError(f"Bad {spec['kind']} rule {spec!r}: {e}") from None
+    return strategy
+
+
+def compile_rules(config, previous=None):
+    """Build a RuleSet from a rules config.
+
+    Strategies whose rule is unchanged from ``previous`` are carried over,
+    so stateful rules keep their per-device state across a reload.
+    """
+    if not isinstance(config, dict) or set(config) - {"device_types", "devices"}:
+        raise RuleError('Rules need only "device_types" and "devices" sections')
+    for section in ("device_types", "devices"):
+        if not isinstance(config.get(section, {}), dict):
+            raise RuleError(f'"{section}" must map names to rules')
+    reuse = previous.specs if previous is not None else {}
+    specs = {}
+
+    def build(key, spec):
+        canonical = json.dumps(spec, sort_keys=True)
+        old = reuse.get(key)
+        strategy = old[1] if old is not None and old[0] == canonical else None
+        if strategy is None:
+            strategy = compile_rule(spec)
+        specs[key] = (canonical, strategy)
+        return strategy
+
+    by_type = {}
+    for name, spec in config.get("device_types", {}).items():
+        try:
+            device_type = device_pb2.DeviceType.Value(name)
+        except ValueError:
+            raise RuleError(f"Unknown device type {name}") from None
+        by_type[device_type] = build(("type", device_type), spec)
+
+    by_device = {}
+    for device_id, spec in config.get("devices", {}).items():
+        try:
+            device_id = int(device_id)
+        except (TypeError, ValueError):
+            raise RuleError(f"Device ids must be integers, got {device_id}") from None
+        by_device[device_id] = build(("device", device_id), spec)
+
+    version = previous.version + 1 if previous is not None else 1
+    return RuleSet(config, by_type, by_device, specs, version)
+
+
+def load_rules(path):
+    with open(path) as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError as e:
+            raise RuleError(f"{path}: {e}") from None
+
+
+class RuleWatcher:
+    """Reloads a rules file whenever its modification time changes."""
+
+    def __init__(self, path, apply, interval=1.0):
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self.mtime = None
+        self.task = None
+
+    def load(self):
+        # a broken file is reported once, not on every check
+        self.mtime = os.stat(self.path).st_mtime_ns
+        rules = self.apply(load_rules(self.path))
+        print(f"Loaded rules version {rules.version} from {self.path}")
+        return rules
+
+    def check(self):
+        try:
+            if os.stat(self.path).st_mtime_ns == self.mtime:
+                return
+            self.load()
+        except (OSError, ValueError) as e:
+            # keep serving the rules we have; RuleError is a ValueError, as
+            # are undecodable files
+            print(f"Rules not reloaded: {e}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
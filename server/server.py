@@ -1,171 +1,1356 @@
 import grpc
+from grpc._cython import cygrpc
 from gen import device_pb2
 from gen import device_pb2_grpc
 
 from gen import alert_pb2
 from gen import alert_pb2_grpc
+from gen import admin_pb2
+from gen import admin_pb2_grpc
+from gen import federation_pb2_grpc
 
 import collections
+import json
 
+import argparse
 import asyncio
+import random
+import signal
+import time
 
-from abc import ABC, abstractmethod
+from datetime import datetime, timezone
 
+try:
+    import uvloop
+except ImportError:  # only needed for --uvloop
+    uvloop = None
 
-# strategy interface
-class DeviceStrategy(ABC):
-    @abstractmethod
-    def should_send(self, data: any) -> bool:
-        pass
+from server.alert_log import AlertLog
+from server.debounce import Debouncer
+from server.federation import Federation
+from server.metrics import Metrics, serve_metrics
+from server.patterns import PatternIndex, describe, from_proto
+from server.recorder import BATCH, DATA, INGEST, Recorder
+from server.queues import DROP_OLDEST, OVERFLOW, OVERFLOW_POLICIES, AlertQueue
+from server.sessions import IDLE, SUPERSEDED, SessionManager
+from server.snapshot import Snapshotter
+from server.rules import (
+    DEFAULT_RULES,
+    STATEFUL_RULES,
+    RuleError,
+    RuleWatcher,
+    compile_rules,
+)
+from server.strategies import fired_indices
+from server.timeseries import MINUTE, SECOND, TimeSeriesStore
+from server.tracing import (
+    DISPATCH,
+    EVALUATE,
+    FANOUT,
+    HISTORY,
+    QUEUE_WAIT,
+    STAGES,
+    WRITE,
+    Tracer,
+    profile_calls,
+    profile_stacks,
+)
+from server.workers import WorkerMesh, serve_workers
 
 
-class ThermometerStrategy(DeviceStrategy):
-    def __init__(self, threshold):
-        self.threshold = threshold
+class AlertManager:
+    def __init__(self, queue_size=1024, overflow_policy=DROP_OLDEST):
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        # client_id -> {device_id: member}, and the inverted device_id -> members
+        # index used for fan-out so an alert only touches the clients that care
+        # about it. A member is the client_id, or (client_id, window) for a
+        # debounced subscription.
+        self.subscriptions = collections.defaultdict(dict)
+        self.subscribers = collections.defaultdict(set)
+        # client_id -> {pattern: member}, and the index matching alerts to them
+        self.patterns = collections.defaultdict(dict)
+        self.pattern_index = PatternIndex()
+        self.queues = {}
+        self.debouncer = Debouncer(self.queues)
+        # relays alerts to other server processes; told when a device or
+        # pattern gains its first or loses its last local subscriber
+        self.publisher = None
 
-    def should_send(self, data: any) -> bool:
-        if data > self.threshold:
-            return True
-        else:
-            return False
+    def subscribe(self, client_id, device_id, queue, debounce=0.0):
+        self.subscribe_many(client_id, (device_id,), queue, debounce)
 
+    def subscribe_many(self, client_id, device_ids, queue, debounce=0.0):
+        member = (client_id, debounce) if debounce > 0 else client_id
+        devices = self.subscriptions[client_id]
+        subscribers = self.subscribers
+        publisher = self.publisher
+        if publisher is None and devices.keys().isdisjoint(device_ids):
+            # only new subscriptions: nothing to replace and no one to tell
+            devices.update(dict.fromkeys(device_ids, member))
+            for device_id in device_ids:
+                subscribers[device_id].add(member)
+            self.queues[client_id] = queue
+            return
+        for device_id in device_ids:
+            old = devices.get(device_id)
+            if old is not None and old != member:
+                subscribers[device_id].discard(old)
+            devices[device_id] = member
+            clients = subscribers[device_id]
+            if not clients and publisher is not None:
+                publisher.interest_changed(device_id, True)
+            clients.add(member)
+        self.queues[client_id] = queue
 
-class MotionSensorStrategy(DeviceStrategy):
-    def __init__(self, state):
-        self.state = state
+    def unsubscribe(self, client_id, device_id):
+        devices = self.subscriptions.get(client_id)
+        if devices is None or device_id not in devices:
+            return
+        member = devices.pop(device_id)
+        if not devices:
+            del self.subscriptions[client_id]
+        self._drop_subscriber(device_id, member)
 
-    def should_send(self, data: any) -> bool:
-        if data == self.state:
-            return data == self.state
-        else:
-            return not data == self.state
+    def subscribe_pattern(self, client_id, pattern, queue, debounce=0.0):
+        member = (client_id, debounce) if debounce > 0 else client_id
+        patterns = self.patterns[client_id]
+        old = patterns.get(pattern)
+        if old is not None and old != member:
+            self._drop_pattern(pattern, old)
+        patterns[pattern] = member
+        if self.pattern_index.add(pattern, member) and self.publisher is not None:
+            self.publisher.pattern_interest_changed(pattern, True)
+        self.queues[client_id] = queue
+
+    def unsubscribe_pattern(self, client_id, pattern):
+        patterns = self.patterns.get(client_id)
+        if patterns is None or pattern not in patterns:
+            return
+        member = patterns.pop(pattern)
+        if not patterns:
+            del self.patterns[client_id]
+        self._drop_pattern(pattern, member)
 
+    def remove_client(self, client_id):
+        for device_id, member in self.subscriptions.pop(client_id, {}).items():
+            self._drop_subscriber(device_id, member)
+        for pattern, member in self.patterns.pop(client_id, {}).items():
+            self._drop_pattern(pattern, member)
+        self.queues.pop(client_id, None)
 
-class SmartPlugStrategy(DeviceStrategy):
-    def __init__(self, threshold):
-        self.threshold = threshold
+    def _drop_pattern(self, pattern, member):
+        if self.pattern_index.remove(pattern, member) and self.publisher is not None:
+            self.publisher.pattern_interest_changed(pattern, False)
 
-    def should_send(self, data: any) -> bool:
-        if data > self.threshold:
+    def has_subscriptions(self, client_id):
+        return client_id in self.subscriptions or client_id in self.patterns
+
+    def interested(self, device_id, device_type):
+        if device_id in self.subscribers:
             return True
-        else:
-            return False
+        return bool(self.pattern_index) and bool(
+            self.pattern_index.match(device_id, device_type)
+        )
 
+    def _drop_subscriber(self, device_id, member):
+        clients = self.subscribers.get(device_id)
+        if clients is not None:
+            clients.discard(member)
+            if not clients:
+                del self.subscribers[device_id]
+                if self.publisher is not None:
+                    self.publisher.interest_changed(device_id, False)
 
-class AlertManager:
-    def __init__(self):
-        self.subscriptions = collections.defaultdict(set)
-        self.queues = {}
+    def subscribers_of(self, device_id):
+        return self.subscribers.get(device_id, ())
+
+    # put_alert never blocks, so a slow client can't stall ingest; ``alert``
+    # is the decoded payload when the caller has it, for the debouncer
+    def deliver(self, device_id, payload, device_type=device_pb2.UNKNOWN, alert=None):
+        subscribers = self.subscribers.get(device_id, ())
+        if self.pattern_index:
+            matched = self.pattern_index.match(device_id, device_type)
+            if matched:
+                matched.update(subscribers)
+                subscribers = matched
+        queues = self.queues
+        delivered = 0
+        debounced = None
+        for member in subscribers:
+            if type(member) is tuple:
+                # a client matching more than once gets the alert once,
+                # right away if any match is, else by its shortest window
+                if debounced is None:
+                    debounced = {}
+                window = debounced.get(member[0])
+                if window is None or member[1] < window:
+                    debounced[member[0]] = member[1]
+                continue
+            queue = queues.get(member)
+            if queue is not None and queue.put_alert(device_id, payload):
+                delivered += 1
+        if debounced:
+            offer = self.debouncer.offer
+            for client_id, window in debounced.items():
+                if client_id not in subscribers and offer(
+                    client_id, window, device_id, payload, alert
+                ):
+                    delivered += 1
+        return delivered
+
+    def new_queue(self):
+        return AlertQueue(self.queue_size, self.overflow_policy)
+
+    def client_stats(self):
+        return {client_id: queue.stats() for client_id, queue in self.queues.items()}
+
+
+# fan-out queues alerts already encoded; ACKs are still queued as messages
+def serialize_alert_response(response):
+    if type(response) is bytes:
+        return response
+    return response.SerializeToString()
+
+
+def add_alert_service_to_server(servicer, server):
+    # same as alert_pb2_grpc.add_AlertServiceServicer_to_server, except that
+    # pre-encoded alert payloads are written to the wire as-is
+    rpc_method_handlers = {
+        "StreamAlerts": grpc.stream_stream_rpc_method_handler(
+            servicer.StreamAlerts,
+            request_deserializer=alert_pb2.AlertRequest.FromString,
+            response_serializer=serialize_alert_response,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+        "AlertService", rpc_method_handlers
+    )
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers("AlertService", rpc_method_handlers)
+
+
+def add_device_service_to_server(servicer, server):
+    # same as device_pb2_grpc.add_DeviceServiceServicer_to_server, except that
+    # readings are decoded through the tracer so a sampled decode is timed,
+    # and device messages through the recorder when there is one
+    decode_data = device_pb2.Data.FromString
+    decode_batch = device_pb2.DataBatch.FromString
+    decode_ingest = device_pb2.IngestRequest.FromString
+    recorder = servicer.recorder
+    if recorder is not None:
+        decode_data = recorder.deserializer(DATA, decode_data)
+        decode_batch = recorder.deserializer(BATCH, decode_batch)
+        decode_ingest = recorder.deserializer(INGEST, decode_ingest)
+    rpc_method_handlers = {
+        "StreamDeviceData": grpc.stream_unary_rpc_method_handler(
+            servicer.StreamDeviceData,
+            request_deserializer=servicer.tracer.deserializer(decode_data),
+            response_serializer=device_pb2.Response.SerializeToString,
+        ),
+        "StreamDeviceBatches": grpc.stream_unary_rpc_method_handler(
+            servicer.StreamDeviceBatches,
+            request_deserializer=decode_batch,
+            response_serializer=device_pb2.Response.SerializeToString,
+        ),
+        "StreamIngest": grpc.stream_stream_rpc_method_handler(
+            servicer.StreamIngest,
+            request_deserializer=decode_ingest,
+            response_serializer=device_pb2.IngestResponse.SerializeToString,
+        ),
+        "QueryHistory": grpc.unary_unary_rpc_method_handler(
+            servicer.QueryHistory,
+            request_deserializer=device_pb2.HistoryRequest.FromString,
+            response_serializer=device_pb2.HistoryResponse.SerializeToString,
+        ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+        "DeviceService", rpc_method_handlers
+    )
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers("DeviceService", rpc_method_handlers)
+
+
+# how a closed session queue ends the stream that was reading it
+CLOSE_STATUS = {
+    OVERFLOW: (
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+        "Alert queue overflowed; client is too slow",
+    ),
+    SUPERSEDED: (
+        grpc.StatusCode.ABORTED,
+        "Another stream connected with the same client_id",
+    ),
+    IDLE: (grpc.StatusCode.DEADLINE_EXCEEDED, "Session evicted after idling"),
+}
+
+
+class Replay:
+    # queued ahead of alerts so the stream sends the backlog before live ones
+    __slots__ = ("after_offset", "since_ns", "upto")
+
+    def __init__(self, after_offset, since_ns, upto):
+        self.after_offset = after_offset
+        self.since_ns = since_ns
+        self.upto = upto
 
 
 class AlertService(alert_pb2_grpc.AlertServiceServicer):
-    def __init__(self, alert_manager: AlertManager):
+    def __init__(
+        self,
+        alert_manager: AlertManager,
+        session_manager=None,
+        alert_log=None,
+        tracer=None,
+    ):
         self.alert_manager = alert_manager
+        if session_manager is None:
+            session_manager = SessionManager(alert_manager)
+        self.session_manager = session_manager
+        self.alert_log = alert_log
+        self.tracer = tracer if tracer is not None else Tracer()
 
     async def StreamAlerts(self, request_iterator, context):
-        queue = asyncio.Queue()
-        client_id = None
+        await AlertStream(self, context).run(request_iterator)
 
-        async def handle_requests():
-            nonlocal client_id
+
+# what writing to a call raises once the client is gone: an RPC error, or,
+# from the write already in flight, a cygrpc error such as ExecuteBatchError
+CALL_GONE = (
+    grpc.aio.AioRpcError,
+    asyncio.InvalidStateError,
+    ConnectionError,
+    cygrpc.BaseError,
+)
+
+
+class AlertStream:
+    """One StreamAlerts call, bound to the client_id named in its first
+    request.
+
+    Requests are handled in the call's own task. Responses are written by a
+    task that the session queue starts when it gets something to send and
+    that ends once the queue is empty, so an idle stream costs one task and
+    these slots.
+    """
+
+    __slots__ = (
+        "service",
+        "context",
+        "task",
+        "session",
+        "queue",
+        "writer",
+        "skip_below",
+    )
+
+    def __init__(self, service, context):
+        self.service = service
+        self.context = context
+        self.task = None
+        self.session = None
+        self.queue = None
+        self.writer = None
+        # queued alerts older than a finished replay were already sent by it
+        self.skip_below = None
+
+    async def run(self, request_iterator):
+        self.task = asyncio.current_task()
+        try:
             async for request in request_iterator:
-                if request.HasField("subscribe"):
-                    client_id = request.subscribe.client_id
-                    device_id = request.subscribe.device_id
-                    self.alert_manager.subscriptions[client_id].add(device_id)
-                    self.alert_manager.queues[client_id] = queue
+                session = self.session
+                if session is not None and session.owner is not self:
+                    break
+                self.handle(request)
+            if self.session is None:
+                # the client half-closed without ever naming itself
+                return
+            # a half-closed stream keeps delivering until its queue closes
+            await asyncio.get_running_loop().create_future()
+        except asyncio.CancelledError:
+            queue = self.queue
+            if queue is None or not queue.closed:
+                raise
+            code, details = CLOSE_STATUS[queue.close_reason]
+            await self.context.abort(code, details)
+        finally:
+            if self.writer is not None:
+                self.writer.cancel()
+            session = self.session
+            if session is not None:
+                if self.queue.listener == self.wake:
+                    self.queue.listener = None
+                self.service.session_manager.detach(session, self)
+
+    def handle(self, request):
+        request_type = request.WhichOneof("request_type")
+        if request_type is None:
+            return
+        client_id = getattr(request, request_type).client_id
+        session = self.session
+        if session is None:
+            session = self.session = self.service.session_manager.attach(
+                client_id, self
+            )
+            self.queue = session.queue
+            self.queue.listener = self.wake
+            if len(self.queue):
+                # alerts buffered while the client was away
+                self.wake()
+        elif client_id != session.client_id:
+            self.queue.put_ack(
+                alert_pb2.AlertResponse(
+                    ack=alert_pb2.AckResponse(
+                        message=f"Stream belongs to {session.client_id}",
+                        success=False,
+                    )
+                )
+            )
+            return
+        session.touch()
+        queue = self.queue
+        alert_manager = self.service.alert_manager
+        alert_log = self.service.alert_log
 
-                    await queue.put(
+        if request_type in ("subscribe", "unsubscribe"):
+            message = getattr(request, request_type)
+            pattern = None
+            if message.HasField("pattern"):
+                try:
+                    pattern = from_proto(message.pattern)
+                except ValueError as e:
+                    queue.put_ack(
                         alert_pb2.AlertResponse(
-                            ack=alert_pb2.AckResponse(
-                                message=f"Subscribed to {device_id}", success=True
-                            )
+                            ack=alert_pb2.AckResponse(message=str(e), success=False)
                         )
                     )
+                    return
 
-                elif request.HasField("unsubscribe"):
-                    client_id = request.unsubscribe.client_id
-                    device_id = request.unsubscribe.device_id
-                    self.alert_manager.subscriptions[client_id].discard(device_id)
+        if request_type == "subscribe":
+            debounce = message.debounce_ms / 1000
+            if pattern is not None:
+                alert_manager.subscribe_pattern(client_id, pattern, queue, debounce)
+                target = describe(pattern)
+            else:
+                target = message.device_id
+                alert_manager.subscribe(client_id, target, queue, debounce)
+            if debounce:
+                target += f" with {message.debounce_ms} ms debounce"
 
-                    await queue.put(
-                        alert_pb2.AlertResponse(
-                            ack=alert_pb2.AckResponse(
-                                message=f"Unsubscribed from {device_id}", success=True
-                            )
+            queue.put_ack(
+                alert_pb2.AlertResponse(
+                    ack=alert_pb2.AckResponse(
+                        message=f"Subscribed to {target}", success=True
+                    )
+                )
+            )
+
+        elif request_type == "unsubscribe":
+            if pattern is not None:
+                alert_manager.unsubscribe_pattern(client_id, pattern)
+                target = describe(pattern)
+            else:
+                target = message.device_id
+                alert_manager.unsubscribe(client_id, target)
+
+            queue.put_ack(
+                alert_pb2.AlertResponse(
+                    ack=alert_pb2.AckResponse(
+                        message=f"Unsubscribed from {target}", success=True
+                    )
+                )
+            )
+
+        elif request_type in ("bulk_subscribe", "bulk_unsubscribe"):
+            message = getattr(request, request_type)
+            try:
+                patterns = [from_proto(p) for p in message.patterns]
+            except ValueError as e:
+                queue.put_ack(
+                    alert_pb2.AlertResponse(
+                        ack=alert_pb2.AckResponse(message=str(e), success=False)
+                    )
+                )
+                return
+            device_ids = message.device_ids
+            if request_type == "bulk_subscribe":
+                debounce = message.debounce_ms / 1000
+                alert_manager.subscribe_many(client_id, device_ids, queue, debounce)
+                for pattern in patterns:
+                    alert_manager.subscribe_pattern(client_id, pattern, queue, debounce)
+                verb = "Subscribed to"
+            else:
+                for device_id in device_ids:
+                    alert_manager.unsubscribe(client_id, device_id)
+                for pattern in patterns:
+                    alert_manager.unsubscribe_pattern(client_id, pattern)
+                verb = "Unsubscribed from"
+            queue.put_ack(
+                alert_pb2.AlertResponse(
+                    ack=alert_pb2.AckResponse(
+                        message=f"{verb} {len(device_ids)} devices"
+                        f" and {len(patterns)} patterns",
+                        success=True,
+                        count=len(device_ids) + len(patterns),
+                    )
+                )
+            )
+
+        elif request_type == "replay":
+            if alert_log is None:
+                queue.put_ack(
+                    alert_pb2.AlertResponse(
+                        ack=alert_pb2.AckResponse(
+                            message="Alert log is disabled", success=False
                         )
                     )
+                )
+                return
+            replay = request.replay
+            after_offset = since_ns = None
+            if replay.WhichOneof("start") == "since_unix_nanos":
+                since_ns = replay.since_unix_nanos
+            else:
+                after_offset = replay.after_offset
+            queue.put_ack(Replay(after_offset, since_ns, alert_log.next_offset))
 
-        request_task = asyncio.create_task(handle_requests())
+    # called by the queue whenever it gets a response or is closed
+    def wake(self):
+        if self.writer is None:
+            self.writer = asyncio.get_running_loop().create_task(self.write())
+
+    async def write(self):
+        queue = self.queue
+        context = self.context
+        tracer = self.service.tracer
+        try:
+            while not queue.closed:
+                # the next alert's age, read before pop takes it
+                traced = tracer.enabled and not queue.acks and tracer.sample()
+                if traced:
+                    waited = queue.lag()
+                response = queue.pop()
+                if response is None:
+                    return
+                if type(response) is Replay:
+                    await self.replay(response)
+                    continue
+                if self.skip_below is not None and type(response) is bytes:
+                    offset = alert_pb2.AlertResponse.FromString(response).alert.offset
+                    if offset < self.skip_below:
+                        continue
+                    self.skip_below = None
+                if traced:
+                    started = time.perf_counter()
+                    await context.write(response)
+                    tracer.observe(QUEUE_WAIT, waited)
+                    tracer.observe(WRITE, time.perf_counter() - started)
+                    continue
+                await context.write(response)
+            # only the call's own task can end it with a status
+            self.task.cancel()
+        except CALL_GONE:
+            # the call is gone; gRPC cancels its task
+            self.task.cancel()
+        finally:
+            self.writer = None
+
+    async def replay(self, replay):
+        client_id = self.session.client_id
+        alert_manager = self.service.alert_manager
+        devices = set(alert_manager.subscriptions.get(client_id, ()))
+        patterns = PatternIndex()
+        for pattern in alert_manager.patterns.get(client_id, ()):
+            patterns.add(pattern, client_id)
+        count = 0
+        write = self.context.write
+        for offset, device_id, payload in self.service.alert_log.read(
+            replay.after_offset, replay.since_ns
+        ):
+            if offset >= replay.upto:
+                break
+            if device_id not in devices:
+                if not patterns:
+                    continue
+                device_type = alert_pb2.AlertResponse.FromString(
+                    payload
+                ).alert.device_type
+                if not patterns.match(device_id, device_type):
+                    continue
+            count += 1
+            await write(payload)
+        self.skip_below = replay.upto
+        await write(
+            alert_pb2.AlertResponse(
+                ack=alert_pb2.AckResponse(
+                    message=f"Replayed {count} alerts", success=True
+                )
+            )
+        )
 
-        while True:
-            response = await queue.get()
-            yield response
+
+RESOLUTIONS = {device_pb2.SECOND: SECOND, device_pb2.MINUTE: MINUTE}
+
+
+def format_timestamp(unix_nanos):
+    """ISO-8601 in UTC with a Z suffix, for the deprecated string fields."""
+    seconds, nanos = divmod(unix_nanos, 1_000_000_000)
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    return moment.replace(microsecond=nanos // 1000, tzinfo=None).isoformat() + "Z"
 
 
 class DeviceService(device_pb2_grpc.DeviceServiceServicer):
-    def __init__(self, alert_manager: AlertManager):
+    def __init__(self, alert_manager: AlertManager, metrics=None, log_sample_rate=0.0):
         self.alert_manager = alert_manager
-        self.device_strategies = {
-            device_pb2.THERMOMETER: ThermometerStrategy(65),
-            device_pb2.SMART_PLUG: SmartPlugStrategy(200),
-            device_pb2.MOTION_SENSOR: MotionSensorStrategy(True),
-        }
+        self.metrics = metrics if metrics is not None else Metrics()
+        # fraction of readings printed; 0 keeps logging off the hot path
+        self.log_sample_rate = log_sample_rate
+        # in multi-worker mode, hands readings for other workers' devices over
+        self.router = None
+        # durable record of every alert fired, for replay after a disconnect
+        self.alert_log = None
+        # recent readings per device for QueryHistory
+        self.history = None
+        # swapped whole by set_rules; streams pick up the new set per reading
+        self.rules = compile_rules(DEFAULT_RULES)
+        # also fill the deprecated string timestamp of alerts, for clients
+        # that do not read timestamp_unix_nanos yet
+        self.string_timestamps = False
+        # unacked batches a StreamIngest device may have in flight, and how
+        # long the server sits on processed batches before acking them
+        self.ingest_window = 16
+        self.ingest_ack_interval = 0.05
+        self.tracer = Tracer()
+        # writes incoming device messages to disk for backtests
+        self.recorder = None
 
-    async def send_alert_to_subscribers(self, device_id, message, timestamp):
+    def set_rules(self, config):
+        self.rules = compile_rules(config, self.rules)
+        return self.rules
+
+    async def send_alert_to_subscribers(
+        self,
+        device_id,
+        message,
+        timestamp,
+        received_at=None,
+        device_type=device_pb2.UNKNOWN,
+        value=0.0,
+    ):
         device_id_str = str(device_id)
-        for client_id, subscribed_devices in self.alert_manager.subscriptions.items():
-            if device_id_str in subscribed_devices:
-                queue = self.alert_manager.queues.get(client_id)
-                if queue:
-                    await queue.put(
-                        alert_pb2.AlertResponse(
-                            alert=alert_pb2.AlertNotification(
-                                device_id=device_id_str,
-                                message=message,
-                                timestamp=timestamp,
-                            )
-                        )
-                    )
+        alert_manager = self.alert_manager
+        publisher = alert_manager.publisher
+        alert_log = self.alert_log
+        if (
+            alert_log is None
+            and not alert_manager.interested(device_id_str, device_type)
+            and (
+                publisher is None
+                or not publisher.interested(device_id_str, device_type)
+            )
+        ):
+            return
+
+        # built and encoded once, then shared by every subscriber's stream
+        alert = alert_pb2.AlertNotification(
+            device_id=device_id_str,
+            message=message,
+            offset=alert_log.next_offset if alert_log is not None else 0,
+            device_type=device_type,
+            value=value,
+        )
+        if type(timestamp) is str:
+            # from a device still sending the deprecated string field
+            alert.timestamp = timestamp
+        else:
+            alert.timestamp_unix_nanos = timestamp
+            if self.string_timestamps:
+                alert.timestamp = format_timestamp(timestamp)
+        payload = alert_pb2.AlertResponse(alert=alert).SerializeToString()
+        if alert_log is not None:
+            alert_log.append(device_id_str, payload)
+
+        delivered = alert_manager.deliver(device_id_str, payload, device_type, alert)
+        if publisher is not None:
+            publisher.publish(device_id_str, device_type, payload)
+
+        metrics = self.metrics
+        metrics.alerts += 1
+        metrics.deliveries += delivered
+        if received_at is not None:
+            metrics.enqueue_latency.observe(time.perf_counter() - received_at)
 
     async def StreamDeviceData(self, request_iterator, context):
+        router = self.router
+        tracer = self.tracer
 
         async for data in request_iterator:
-            payload_type = data.WhichOneof("payload")
-            payload_value = getattr(data, payload_type)
-
-            if payload_type == "temperature":
-                value = payload_value.temperature
-            elif payload_type == "wattage":
-                value = payload_value.wattage
-            elif payload_type == "motion":
-                value = payload_value.motion
-            else:
+            if router is not None and not router.owns(data.device_id):
+                router.forward_reading(data)
                 continue
-            print(data.device_id, data.device_type, data.timestamp, value)
-            strategy = self.device_strategies.get(data.device_type)
-            if strategy and strategy.should_send(value):
-                await self.send_alert_to_subscribers(
-                    data.device_id, f"Alert! Value = {value}", data.timestamp
+            await self.process_reading(
+                data, time.perf_counter(), tracer.enabled and tracer.claim(data)
+            )
+
+        return device_pb2.Response(status="Success")
+
+    async def process_reading(self, data, received_at=None, traced=False):
+        if traced:
+            started = time.perf_counter()
+        payload_type = data.WhichOneof("payload")
+        if payload_type is None:
+            return
+        payload_value = getattr(data, payload_type)
+
+        if payload_type == "temperature":
+            value = payload_value.temperature
+        elif payload_type == "wattage":
+            value = payload_value.wattage
+        elif payload_type == "motion":
+            value = payload_value.motion
+        else:
+            return
+        if traced:
+            dispatched = time.perf_counter()
+            self.tracer.observe(DISPATCH, dispatched - started)
+        metrics = self.metrics
+        metrics.readings[data.device_type] += 1
+        if self.log_sample_rate and random.random() < self.log_sample_rate:
+            print(
+                data.device_id,
+                data.device_type,
+                data.timestamp_unix_nanos or data.timestamp,
+                value,
+            )
+        if self.history is not None:
+            self.history.append(data.device_id, time.time_ns(), float(value))
+        if traced:
+            recorded = time.perf_counter()
+            self.tracer.observe(HISTORY, recorded - dispatched)
+        strategy = self.rules.lookup(data.device_id, data.device_type)
+        fired = strategy and strategy.observe(data.device_id, value)
+        if traced:
+            evaluated = time.perf_counter()
+            self.tracer.observe(EVALUATE, evaluated - recorded)
+        if fired:
+            metrics.strategy_hits[data.device_type] += 1
+            await self.send_alert_to_subscribers(
+                data.device_id,
+                f"Alert! Value = {value}",
+                data.timestamp_unix_nanos or data.timestamp,
+                received_at,
+                data.device_type,
+                value,
+            )
+            if traced:
+                self.tracer.observe(FANOUT, time.perf_counter() - evaluated)
+
+    async def process_batch(self, batch, received_at=None):
+        device_types = batch.device_types
+        values = batch.values
+        metrics = self.metrics
+        metrics.readings.update(device_types)
+        if self.history is not None:
+            now = time.time_ns()
+            append = self.history.append
+            for device_id, value in zip(batch.device_ids, values):
+                append(device_id, now, value)
+        mask = self.rules.evaluate(batch.device_ids, device_types, values)
+        timestamps = batch.timestamps_unix_nanos or batch.timestamps
+
+        alerts = []
+        strategy_hits = metrics.strategy_hits
+        for i in fired_indices(mask):
+            device_type = device_types[i]
+            strategy_hits[device_type] += 1
+            value = values[i]
+            if device_type == device_pb2.MOTION_SENSOR:
+                value = value != 0.0
+            alerts.append(
+                (
+                    batch.device_ids[i],
+                    f"Alert! Value = {value}",
+                    timestamps[i],
+                    device_type,
+                    value,
+                )
+            )
+
+        for device_id, message, timestamp, device_type, value in alerts:
+            await self.send_alert_to_subscribers(
+                device_id, message, timestamp, received_at, device_type, value
+            )
+
+    async def ingest_batch(self, batch):
+        """Processes the local rows of ``batch`` and forwards the others to
+        their workers; False if its columns disagree in length."""
+        count = len(batch.device_ids)
+        if (
+            len(batch.device_types) != count
+            or len(batch.values) != count
+            or count not in (len(batch.timestamps_unix_nanos), len(batch.timestamps))
+        ):
+            return False
+        received_at = time.perf_counter()
+        if self.router is not None:
+            batch = self.router.route_batch(batch)
+            if batch is None:
+                return True
+        await self.process_batch(batch, received_at)
+        return True
+
+    async def StreamDeviceBatches(self, request_iterator, context):
+
+        async for batch in request_iterator:
+            if not await self.ingest_batch(batch):
+                await context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    "DataBatch columns must all have the same length",
                 )
 
         return device_pb2.Response(status="Success")
 
+    async def StreamIngest(self, request_iterator, context):
+        # batches are processed as they are read, so the device runs at most
+        # ingest_window batches ahead of the server and waits for acks
+        # rather than piling readings up in the server's buffers
+        window = self.ingest_window
+        processed = 0
+        acked = 0
+        progress = asyncio.Event()
+        error = None
+
+        async def handle_requests():
+            nonlocal processed, error
+            async for request in request_iterator:
+                if request.sequence != processed + 1:
+                    error = (
+                        grpc.StatusCode.INVALID_ARGUMENT,
+                        f"Expected batch {processed + 1}, got {request.sequence}",
+                    )
+                elif request.sequence > acked + window:
+                    error = (
+                        grpc.StatusCode.RESOURCE_EXHAUSTED,
+                        "Batch sent without credit",
+                    )
+                elif not await self.ingest_batch(request.batch):
+                    error = (
+                        grpc.StatusCode.INVALID_ARGUMENT,
+                        "DataBatch columns must all have the same length",
+                    )
+                if error is not None:
+                    break
+                processed = request.sequence
+                # ack early once half the window is used, so a fast device
+                # never stalls waiting for the timer
+                if processed - acked >= (window + 1) // 2:
+                    progress.set()
+            progress.set()
+
+        request_task = asyncio.create_task(handle_requests())
+        try:
+            yield device_pb2.IngestResponse(credits=window)
+            finished = False
+            while not finished:
+                try:
+                    await asyncio.wait_for(progress.wait(), self.ingest_ack_interval)
+                except asyncio.TimeoutError:
+                    pass
+                progress.clear()
+                # read first: a batch processed after this is acked next round
+                finished = request_task.done()
+                if processed > acked:
+                    acked = processed
+                    yield device_pb2.IngestResponse(
+                        acked_sequence=acked, credits=window
+                    )
+            request_task.result()
+            if error is not None:
+                await context.abort(*error)
+        finally:
+            request_task.cancel()
+
+    async def QueryHistory(self, request, context):
+        history = self.history
+        if history is None:
+            await context.abort(
+                grpc.StatusCode.FAILED_PRECONDITION, "History is disabled"
+            )
+        router = self.router
+        if router is not None and not router.owns(request.device_id):
+            await context.abort(
+                grpc.StatusCode.FAILED_PRECONDITION,
+                f"Device {request.device_id} is stored by"
+                f" {router.owner_label(request.device_id)}",
+            )
+
+        start = request.start_unix_nanos
+        end = request.end_unix_nanos or time.time_ns()
+        if request.resolution == device_pb2.RAW:
+            timestamps, values = history.query(request.device_id, start, end)
+            return device_pb2.HistoryResponse(timestamps=timestamps, values=values)
+
+        width = RESOLUTIONS.get(request.resolution)
+        if width not in history.widths():
+            await context.abort(
+                grpc.StatusCode.INVALID_ARGUMENT,
+                f"No rollups kept for resolution {request.resolution}",
+            )
+        starts, mins, maxs, means, counts = history.rollup(
+            request.device_id, width, start, end
+        )
+        return device_pb2.HistoryResponse(
+            timestamps=starts, min=mins, max=maxs, mean=means, count=counts
+        )
+
+
+# longest profile the admin RPC runs, so a typo can't leave one going
+MAX_PROFILE_SECONDS = 300
+
+
+class AdminService(admin_pb2_grpc.AdminServiceServicer):
+    def __init__(self, device_service: DeviceService):
+        self.device_service = device_service
+        self.profiling = False
+
+    def rules_response(self, success, message):
+        rules = self.device_service.rules
+        return admin_pb2.RulesResponse(
+            success=success,
+            message=message,
+            version=rules.version,
+            rules_json=json.dumps(rules.config),
+        )
+
+    async def GetRules(self, request, context):
+        return self.rules_response(True, "")
+
+    async def SetRules(self, request, context):
+        try:
+            config = json.loads(request.rules_json)
+            rules = self.device_service.set_rules(config)
+        except (ValueError, RuleError) as e:
+            return self.rules_response(False, str(e))
+        router = self.device_service.router
+        if router is not None:
+            router.share_rules(request.rules_json)
+        return self.rules_response(True, f"Rules version {rules.version} applied")
+
+    def tracing_response(self):
+        tracer = self.device_service.tracer
+        response = admin_pb2.TracingResponse(
+            enabled=tracer.enabled, sample_rate=tracer.sample_rate
+        )
+        for stage in STAGES:
+            histogram = tracer.histograms[stage]
+            response.stages.add(
+                stage=stage,
+                bounds=histogram.buckets,
+                counts=histogram.counts,
+                count=histogram.count,
+                sum=histogram.sum,
+            )
+        return response
 
-async def serve():
-    server = grpc.aio.server()
-    alert_manager = AlertManager()
-    device_pb2_grpc.add_DeviceServiceServicer_to_server(
-        DeviceService(alert_manager), server
+    async def GetTracing(self, request, context):
+        return self.tracing_response()
+
+    async def SetTracing(self, request, context):
+        tracer = self.device_service.tracer
+        if request.HasField("sample_rate"):
+            if not 0.0 <= request.sample_rate <= 1.0:
+                await context.abort(
+                    grpc.StatusCode.INVALID_ARGUMENT,
+                    "sample_rate must be between 0 and 1",
+                )
+            tracer.sample_rate = request.sample_rate
+        if request.HasField("enabled"):
+            tracer.enabled = request.enabled
+        if request.reset:
+            tracer.reset()
+        return self.tracing_response()
+
+    async def Profile(self, request, context):
+        if not 0.0 < request.seconds <= MAX_PROFILE_SECONDS:
+            await context.abort(
+                grpc.StatusCode.INVALID_ARGUMENT,
+                f"seconds must be more than 0 and at most {MAX_PROFILE_SECONDS}",
+            )
+        if self.profiling:
+            await context.abort(
+                grpc.StatusCode.FAILED_PRECONDITION, "A profile is already running"
+            )
+        self.profiling = True
+        try:
+            if request.mode == admin_pb2.SAMPLING:
+                interval = (request.interval_ms or 5.0) / 1000
+                data, summary = await profile_stacks(request.seconds, interval)
+            else:
+                data, summary = await profile_calls(request.seconds)
+        finally:
+            self.profiling = False
+        return admin_pb2.ProfileResponse(data=data, summary=summary)
+
+
+# for many mostly idle streams: a cap on streams per connection, smaller
+# read buffers and messages, no BDP-driven window growth, and keepalives
+# that find dead peers without tolerating ping floods
+HIGH_CONNECTION_OPTIONS = [
+    ("grpc.max_concurrent_streams", 1000),
+    ("grpc.max_receive_message_length", 1024 * 1024),
+    ("grpc.max_send_message_length", 1024 * 1024),
+    ("grpc.max_metadata_size", 8 * 1024),
+    ("grpc.http2.bdp_probe", 0),
+    ("grpc.experimental.tcp_read_chunk_size", 4 * 1024),
+    ("grpc.experimental.tcp_max_read_chunk_size", 64 * 1024),
+    ("grpc.keepalive_time_ms", 60_000),
+    ("grpc.keepalive_timeout_ms", 20_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.http2.min_recv_ping_interval_without_data_ms", 30_000),
+    ("grpc.http2.max_ping_strikes", 2),
+]
+
+
+async def serve(
+    queue_size=1024,
+    overflow_policy=DROP_OLDEST,
+    grace_period=0.0,
+    idle_timeout=None,
+    port=50051,
+    metrics_port=None,
+    log_sample_rate=0.0,
+    worker=None,
+    alert_log_dir=None,
+    alert_log_options=None,
+    history_size=600,
+    history_seconds=300,
+    history_minutes=120,
+    stateful_strategies=False,
+    rules_path=None,
+    string_timestamps=False,
+    ingest_window=16,
+    high_connections=False,
+    node=None,
+    peers=(),
+    record_dir=None,
+    record_segment_bytes=64 * 1024 * 1024,
+    snapshot_path=None,
+    snapshot_interval=60.0,
+    snapshot_grace=300.0,
+):
+    options = list(HIGH_CONNECTION_OPTIONS) if high_connections else []
+    if worker is not None:
+        # every worker binds the shared port; the kernel spreads connections
+        options.append(("grpc.so_reuseport", 1))
+    server = grpc.aio.server(options=options)
+    alert_manager = AlertManager(queue_size, overflow_policy)
+    session_manager = SessionManager(alert_manager, grace_period, idle_timeout)
+    metrics = Metrics()
+    device_service = DeviceService(alert_manager, metrics, log_sample_rate)
+    device_service.string_timestamps = string_timestamps
+    device_service.ingest_window = ingest_window
+    if stateful_strategies:
+        device_service.set_rules(STATEFUL_RULES)
+    rule_watcher = None
+    if rules_path is not None:
+        rule_watcher = RuleWatcher(rules_path, device_service.set_rules)
+        rule_watcher.load()
+    if history_size:
+        device_service.history = TimeSeriesStore(
+            history_size, ((SECOND, history_seconds), (MINUTE, history_minutes))
+        )
+    alert_log = None
+    if alert_log_dir is not None:
+        alert_log = AlertLog(alert_log_dir, **(alert_log_options or {}))
+        device_service.alert_log = alert_log
+    if record_dir is not None:
+        device_service.recorder = Recorder(record_dir, record_segment_bytes)
+    snapshotter = None
+    if snapshot_path is not None:
+        snapshotter = Snapshotter(
+            snapshot_path,
+            alert_manager,
+            session_manager,
+            device_service,
+            snapshot_interval,
+            snapshot_grace,
+        )
+        started = time.perf_counter()
+        restored = snapshotter.restore()
+        if restored is not None:
+            print(
+                f"Restored {restored['subscriptions']} subscriptions and"
+                f" {restored['patterns']} patterns for {restored['clients']} clients,"
+                f" and state for {restored['devices']} devices, from {snapshot_path}"
+                f" in {time.perf_counter() - started:.2f} s"
+            )
+    add_device_service_to_server(device_service, server)
+    add_alert_service_to_server(
+        AlertService(alert_manager, session_manager, alert_log, device_service.tracer),
+        server,
     )
-    alert_pb2_grpc.add_AlertServiceServicer_to_server(
-        AlertService(alert_manager), server
+    admin_pb2_grpc.add_AdminServiceServicer_to_server(
+        AdminService(device_service), server
     )
-    server.add_insecure_port("[::]:50051")
+    federation = None
+    if peers:
+        node = node or f"127.0.0.1:{port}"
+        federation = Federation(node, peers, alert_manager, device_service)
+        federation_pb2_grpc.add_FederationServiceServicer_to_server(federation, server)
+    server.add_insecure_port(f"[::]:{port}")
+    name = "Server"
+    if worker is not None:
+        index, workers, socket_dir = worker
+        # shard-aware devices can stream straight to the worker that owns them
+        server.add_insecure_port(f"[::]:{port + 1 + index}")
+        await WorkerMesh(
+            index, workers, socket_dir, alert_manager, device_service
+        ).start()
+        name = f"Worker {index}"
+        if metrics_port is not None:
+            metrics_port += index
     await server.start()
-    print("Server started on port 50051")
-    await server.wait_for_termination()
+    session_manager.start()
+    if federation is not None:
+        federation.start()
+        name = f"Node {node}"
+    if rule_watcher is not None:
+        rule_watcher.start()
+    print(f"{name} started on port {port}")
+    if device_service.history is not None:
+        size = device_service.history.bytes_per_device()
+        print(f"History uses {size} bytes per device")
+    if alert_log is not None:
+        alert_log.start()
+        print(f"Alert log in {alert_log_dir}, next offset {alert_log.next_offset}")
+    if device_service.recorder is not None:
+        device_service.recorder.start()
+        print(f"Recording device messages to {record_dir}")
+    if snapshotter is not None:
+        snapshotter.start()
+        # deploys stop the server with SIGTERM: stop as on ^C, while clients
+        # are still attached, so the last snapshot keeps their subscriptions
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel
+        )
+    if metrics_port is not None:
+        await serve_metrics(metrics, alert_manager, metrics_port)
+        print(f"Metrics on http://127.0.0.1:{metrics_port}/metrics")
+    try:
+        await server.wait_for_termination()
+    finally:
+        if alert_log is not None:
+            await alert_log.close()
+        if device_service.recorder is not None:
+            await device_service.recorder.close()
+        if snapshotter is not None:
+            await snapshotter.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(serve())
+    parser = argparse.ArgumentParser(description="IoT alert server")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="server processes sharing the port, each owning a device_id shard",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=1024,
+        help="max pending alerts per client before the overflow policy applies",
+    )
+    parser.add_argument(
+        "--overflow-policy", choices=OVERFLOW_POLICIES, default=DROP_OLDEST
+    )
+    parser.add_argument(
+        "--session-grace",
+        type=float,
+        default=0.0,
+        help="seconds a disconnected client keeps its subscriptions and alerts",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        help="evict streams with no subscriptions after this many quiet seconds",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="serve Prometheus metrics on this local port (+ worker index)",
+    )
+    parser.add_argument(
+        "--log-sample-rate",
+        type=float,
+        default=0.0,
+        help="fraction of device readings to print",
+    )
+    parser.add_argument(
+        "--alert-log",
+        metavar="DIR",
+        default=None,
+        help="persist alerts to segment files in DIR so clients can replay them",
+    )
+    parser.add_argument("--alert-log-segment-bytes", type=int, default=64 * 1024 * 1024)
+    parser.add_argument(
+        "--alert-log-max-bytes",
+        type=int,
+        default=None,
+        help="delete the oldest sealed segments beyond this total size",
+    )
+    parser.add_argument(
+        "--alert-log-max-age",
+        type=float,
+        default=None,
+        help="delete sealed segments older than this many seconds",
+    )
+    parser.add_argument(
+        "--alert-log-compact",
+        action="store_true",
+        help="keep only the newest alert per device in sealed segments",
+    )
+    parser.add_argument(
+        "--history-size",
+        type=int,
+        default=600,
+        help="raw readings kept per device for QueryHistory; 0 disables history",
+    )
+    parser.add_argument(
+        "--history-seconds",
+        type=int,
+        default=300,
+        help="1-second rollup buckets kept per device",
+    )
+    parser.add_argument(
+        "--history-minutes",
+        type=int,
+        default=120,
+        help="1-minute rollup buckets kept per device",
+    )
+    parser.add_argument(
+        "--stateful-strategies",
+        action="store_true",
+        help="alert once per threshold crossing and per motion start",
+    )
+    parser.add_argument(
+        "--rules",
+        metavar="FILE",
+        default=None,
+        help="JSON alert rules, reloaded whenever the file changes",
+    )
+    parser.add_argument(
+        "--string-timestamps",
+        action="store_true",
+        help="also send alert timestamps as ISO-8601 strings, for older clients",
+    )
+    parser.add_argument(
+        "--ingest-window",
+        type=int,
+        default=16,
+        help="batches a StreamIngest device may send ahead of the server's acks",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="DIR",
+        default=None,
+        help="record incoming device messages to DIR for python -m server.backtest",
+    )
+    parser.add_argument("--record-segment-bytes", type=int, default=64 * 1024 * 1024)
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        default=None,
+        help="save subscriptions and rule state to FILE, and restore them at startup",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=60.0,
+        help="seconds between snapshots",
+    )
+    parser.add_argument(
+        "--snapshot-grace",
+        type=float,
+        default=300.0,
+        help="seconds restored subscriptions wait for their client to reconnect",
+    )
+    parser.add_argument(
+        "--peers",
+        nargs="+",
+        metavar="HOST:PORT",
+        default=[],
+        help="other nodes to federate with; devices are split among all nodes",
+    )
+    parser.add_argument(
+        "--node",
+        metavar="HOST:PORT",
+        default=None,
+        help="this node's address as its peers list it (default 127.0.0.1:PORT)",
+    )
+    parser.add_argument(
+        "--high-connections",
+        action="store_true",
+        help="tune the server for many mostly idle streams",
+    )
+    parser.add_argument(
+        "--uvloop",
+        action="store_true",
+        help="run the event loop on uvloop (pip install uvloop)",
+    )
+    args = parser.parse_args()
+    if args.alert_log is not None and args.workers > 1:
+        parser.error("--alert-log is not supported with --workers > 1")
+    if args.record is not None and args.workers > 1:
+        parser.error("--record is not supported with --workers > 1")
+    if args.snapshot is not None and args.workers > 1:
+        parser.error("--snapshot is not supported with --workers > 1")
+    if args.peers and (args.workers > 1 or args.alert_log is not None):
+        parser.error("--peers is not supported with --workers > 1 or --alert-log")
+    if args.uvloop and uvloop is None:
+        parser.error("--uvloop needs the uvloop package")
+    options = dict(
+        queue_size=args.queue_size,
+        overflow_policy=args.overflow_policy,
+        grace_period=args.session_grace,
+        idle_timeout=args.idle_timeout,
+        port=args.port,
+        metrics_port=args.metrics_port,
+        log_sample_rate=args.log_sample_rate,
+        alert_log_dir=args.alert_log,
+        alert_log_options=dict(
+            segment_bytes=args.alert_log_segment_bytes,
+            max_bytes=args.alert_log_max_bytes,
+            max_age=args.alert_log_max_age,
+            compact=args.alert_log_compact,
+        ),
+        history_size=args.history_size,
+        history_seconds=args.history_seconds,
+        history_minutes=args.history_minutes,
+        stateful_strategies=args.stateful_strategies,
+        rules_path=args.rules,
+        string_timestamps=args.string_timestamps,
+        ingest_window=args.ingest_window,
+        high_connections=args.high_connections,
+        node=args.node,
+        peers=args.peers,
+        record_dir=args.record,
+        record_segment_bytes=args.record_segment_bytes,
+        snapshot_path=args.snapshot,
+        snapshot_interval=args.snapshot_interval,
+        snapshot_grace=args.snapshot_grace,
+    )
+    if args.workers > 1:
+        serve_workers(args.workers, use_uvloop=args.uvloop, **options)
+    else:
+        if args.uvloop:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        try:
+            asyncio.run(serve(**options))
+        except asyncio.CancelledError:
+            # stopped by SIGTERM, after the last snapshot
+            pass
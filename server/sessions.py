@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+SUPERSEDED = "superseded"
+IDLE = "idle"
+
+
+class Session:
+    __slots__ = ("client_id", "queue", "owner", "detached_at", "last_active", "grace")
+
+    def __init__(self, client_id, queue):
+        self.client_id = client_id
+        self.queue = queue
+        # the StreamAlerts call currently delivering this session, if any
+        self.owner = None
+        self.detached_at = None
+        self.last_active = time.monotonic()
+        # how long it is kept once detached, if not the manager's grace period
+        self.grace = None
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+
+class SessionManager:
+    """Tracks which StreamAlerts call serves each client_id.
+
+    A session outlives its stream for ``grace_period`` seconds: subscriptions
+    stay registered and alerts keep buffering in its queue, so a client that
+    reconnects with the same client_id picks up where it left off. Sessions
+    with no subscriptions that send nothing for ``idle_timeout`` seconds are
+    evicted and their stream is closed.
+    """
+
+    def __init__(self, alert_manager, grace_period=0.0, idle_timeout=None):
+        self.alert_manager = alert_manager
+        self.grace_period = grace_period
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        # how long sessions restored from a snapshot wait for their client
+        self.restore_grace = 0.0
+        self.reaper = None
+
+    def attach(self, client_id, owner):
+        session = self.sessions.get(client_id)
+        if session is None:
+            session = Session(client_id, self.alert_manager.new_queue())
+            self.sessions[client_id] = session
+        elif session.owner is not None:
+            # a second stream for a live client takes over; the old one is closed
+            previous = session.queue
+            session.queue = self.alert_manager.new_queue()
+            session.queue.take_pending(previous)
+            previous.close(SUPERSEDED)
+        elif session.queue.closed:
+            session.queue = self.alert_manager.new_queue()
+
+        session.owner = owner
+        session.detached_at = None
+        session.grace = None
+        session.touch()
+        self.alert_manager.queues[client_id] = session.queue
+        return session
+
+    def detach(self, session, owner):
+        if session.owner is not owner:
+            return
+        session.owner = None
+        session.detached_at = time.monotonic()
+        if self.grace_period <= 0 or session.queue.closed:
+            self.expire(session)
+
+    def restore(self, client_id, grace):
+        """A detached session for a client whose subscriptions are being
+        restored, kept for ``grace`` seconds for the client to reconnect."""
+        session = Session(client_id, self.alert_manager.new_queue())
+        session.detached_at = time.monotonic()
+        session.grace = grace
+        self.sessions[client_id] = session
+        self.restore_grace = max(self.restore_grace, grace)
+        return session
+
+    def expire(self, session):
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+        if self.alert_manager.queues.get(session.client_id) is session.queue:
+            self.alert_manager.remove_client(session.client_id)
+        session.queue.clear()
+
+    def sweep(self):
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            if session.owner is None:
+                grace = self.grace_period if session.grace is None else session.grace
+                if now - session.detached_at >= grace:
+                    self.expire(session)
+            elif (
+                self.idle_timeout is not None
+                and now - session.last_active >= self.idle_timeout
+                and not self.alert_manager.has_subscriptions(session.client_id)
+            ):
+                session.owner = None
+                session.queue.close(IDLE)
+                self.expire(session)
+
+    async def run(self):
+        timeouts = [
+            t for t in (self.grace_period, self.idle_timeout, self.restore_grace) if t
+        ]
+        if not timeouts:
+            return
+        interval = min(1.0, min(timeouts) / 2)
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def start(self):
+        if self.reaper is None:
+            self.reaper = asyncio.create_task(self.run())
+
+    def stats(self):
+        attached = sum(1 for s in self.sessions.values() if s.owner is not None)
+        return {"attached": attached, "detached": len(self.sessions) - attached}
@@ -0,0 +1,257 @@
+import asyncio
+import gc
+import marshal
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"IOTSNAP1"
+# crc32 of the rest, length of the body, record kind; the body is marshal data
+HEADER = struct.Struct("<IIB")
+SUBSCRIPTIONS = 0
+PATTERNS = 1
+STRATEGY = 2
+END = 3
+
+# subscriptions captured per turn of the event loop while saving
+CHUNK = 10000
+
+
+def encode(kind, body):
+    body = marshal.dumps(body)
+    rest = struct.pack("<IB", len(body), kind) + body
+    return struct.pack("<I", zlib.crc32(rest)) + rest
+
+
+def records(buffer):
+    """Yield (kind, body) per record, stopping at the end of the buffer or
+    the first torn or corrupt record."""
+    position = len(MAGIC)
+    end = len(buffer)
+    while position + HEADER.size <= end:
+        crc, length, kind = HEADER.unpack_from(buffer, position)
+        record_end = position + HEADER.size + length
+        if record_end > end or zlib.crc32(buffer[position + 4 : record_end]) != crc:
+            return
+        yield kind, marshal.loads(buffer[position + HEADER.size : record_end])
+        position = record_end
+
+
+def group_by_member(client_id, items):
+    """(client_id, debounce, targets) records for a client's subscriptions,
+    one per debounce window."""
+    groups = {}
+    for target, member in items:
+        groups.setdefault(member, []).append(target)
+    return [
+        (client_id, member[1] if type(member) is tuple else 0.0, targets)
+        for member, targets in groups.items()
+    ]
+
+
+def strategy_state(strategy):
+    """Slot order of the devices a stateful strategy has seen, its columns
+    and, for window strategies, the rings, all as plain bytes."""
+    state = strategy.state
+    columns = {name: column.tobytes() for name, column in state.columns.items()}
+    rings = getattr(strategy, "rings", None)
+    return list(state.slots), columns, rings.tobytes() if rings is not None else None
+
+
+def load_strategy_state(strategy, device_ids, columns, rings):
+    state = strategy.state
+    if len(state) or set(columns) != set(state.columns):
+        return False
+    count = len(device_ids)
+    for name, column in state.columns.items():
+        if len(columns[name]) != count * column.itemsize:
+            return False
+    window = getattr(strategy, "rings", None)
+    if window is not None and (
+        rings is None or len(rings) != count * strategy.window * window.itemsize
+    ):
+        return False
+    for name, column in state.columns.items():
+        column.frombytes(columns[name])
+    if window is not None:
+        window.frombytes(rings)
+    state.slots.update(zip(device_ids, range(count)))
+    return True
+
+
+class Snapshotter:
+    """Saves the subscription registry and per-device strategy state to
+    ``path`` every ``interval`` seconds, and loads them back at startup.
+
+    Saving copies at most ``CHUNK`` subscriptions per turn of the event loop
+    and writes the file in a worker thread, so alerts keep flowing while a
+    large registry is saved. The file is replaced atomically. Restored
+    clients get a detached session that is held for ``restore_grace``
+    seconds, so a client that reconnects with the same client_id has its
+    subscriptions, and the alerts fired in between, without resubscribing.
+    """
+
+    def __init__(
+        self,
+        path,
+        alert_manager,
+        session_manager,
+        device_service,
+        interval=60.0,
+        restore_grace=300.0,
+    ):
+        self.path = path
+        self.alert_manager = alert_manager
+        self.session_manager = session_manager
+        self.device_service = device_service
+        self.interval = interval
+        self.restore_grace = restore_grace
+        self.task = None
+        # a save cancelled by close may still be writing on its thread
+        self.lock = threading.Lock()
+        self.saves = 0
+        self.last_save_seconds = 0.0
+
+    async def capture(self):
+        alert_manager = self.alert_manager
+        chunks = [MAGIC]
+        counts = {"subscriptions": 0, "patterns": 0, "devices": 0}
+        for kind, registry, count in (
+            (SUBSCRIPTIONS, alert_manager.subscriptions, "subscriptions"),
+            (PATTERNS, alert_manager.patterns, "patterns"),
+        ):
+            batch, size = [], 0
+            for client_id in list(registry):
+                targets = registry.get(client_id)
+                if not targets:
+                    continue
+                items = list(targets.items())
+                for start in range(0, len(items), CHUNK):
+                    batch += group_by_member(client_id, items[start : start + CHUNK])
+                    size += min(CHUNK, len(items) - start)
+                    if size >= CHUNK:
+                        chunks.append(encode(kind, batch))
+                        counts[count] += size
+                        batch, size = [], 0
+                        # the registry may change here; each client is
+                        # copied as it is when its turn comes
+                        await asyncio.sleep(0)
+            if batch:
+                chunks.append(encode(kind, batch))
+                counts[count] += size
+        for key, (canonical, strategy) in self.device_service.rules.specs.items():
+            if strategy.stateful and len(strategy.state):
+                device_ids, columns, rings = strategy_state(strategy)
+                chunks.append(
+                    encode(STRATEGY, (key, canonical, device_ids, columns, rings))
+                )
+                counts["devices"] += len(device_ids)
+                await asyncio.sleep(0)
+        chunks.append(encode(END, counts))
+        return chunks, counts
+
+    def write(self, chunks):
+        temporary = self.path + ".tmp"
+        with self.lock:
+            with open(temporary, "wb") as f:
+                f.writelines(chunks)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+
+    async def save(self):
+        started = time.perf_counter()
+        chunks, counts = await self.capture()
+        await asyncio.get_running_loop().run_in_executor(None, self.write, chunks)
+        self.saves += 1
+        self.last_save_seconds = time.perf_counter() - started
+        return counts
+
+    def restore(self):
+        """Loads the snapshot at ``path``, if there is a complete one, and
+        returns what it restored; None if there was nothing to restore."""
+        try:
+            with open(self.path, "rb") as f:
+                buffer = f.read()
+        except FileNotFoundError:
+            return None
+        if not buffer.startswith(MAGIC):
+            print(f"Ignoring {self.path}: not a snapshot")
+            return None
+        # restoring creates a container per subscription, and the collector
+        # would scan the growing registry over and over; it lives as long as
+        # the server, so it is frozen out of later collections as well
+        gc.disable()
+        try:
+            loaded = list(records(buffer))
+            if not loaded or loaded[-1][0] != END:
+                print(f"Ignoring {self.path}: snapshot is incomplete")
+                return None
+            return self.load(loaded)
+        finally:
+            gc.freeze()
+            gc.enable()
+
+    def load(self, loaded):
+        alert_manager = self.alert_manager
+        sessions = self.session_manager.sessions
+        restore_session = self.session_manager.restore
+        specs = self.device_service.rules.specs
+        restored = {"clients": 0, "subscriptions": 0, "patterns": 0, "devices": 0}
+
+        def queue_of(client_id):
+            session = sessions.get(client_id)
+            if session is None:
+                session = restore_session(client_id, self.restore_grace)
+                restored["clients"] += 1
+            return session.queue
+
+        for kind, body in loaded:
+            if kind == SUBSCRIPTIONS:
+                for client_id, debounce, device_ids in body:
+                    alert_manager.subscribe_many(
+                        client_id, device_ids, queue_of(client_id), debounce
+                    )
+                    restored["subscriptions"] += len(device_ids)
+            elif kind == PATTERNS:
+                for client_id, debounce, patterns in body:
+                    queue = queue_of(client_id)
+                    for pattern in patterns:
+                        alert_manager.subscribe_pattern(
+                            client_id, pattern, queue, debounce
+                        )
+                    restored["patterns"] += len(patterns)
+            elif kind == STRATEGY:
+                key, canonical, device_ids, columns, rings = body
+                # only into the same rule; a changed rule starts over
+                spec = specs.get(key)
+                if (
+                    spec is not None
+                    and spec[0] == canonical
+                    and spec[1].stateful
+                    and load_strategy_state(spec[1], device_ids, columns, rings)
+                ):
+                    restored["devices"] += len(device_ids)
+        return restored
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except OSError as e:
+                print(f"Snapshot to {self.path} failed: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Stops the periodic saves and saves once more, so a restart loses
+        nothing."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.save()
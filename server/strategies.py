@@ -0,0 +1,288 @@
+import array
+from abc import ABC, abstractmethod
+
+try:
+    import numpy as np
+except ImportError:  # batch evaluation falls back to the scalar should_send path
+    np = None
+
+# below this many readings array conversion costs more than it saves
+VECTORIZE_MIN_BATCH = 256
+
+
+# strategy interface
+class DeviceStrategy(ABC):
+    # stateful strategies see each device's readings in order via observe
+    stateful = False
+
+    @abstractmethod
+    def should_send(self, data: any) -> bool:
+        pass
+
+    def observe(self, device_id, data) -> bool:
+        return self.should_send(data)
+
+    # batch interface: one mask entry per value, same answers as should_send
+    def evaluate(self, values):
+        return [self.should_send(value) for value in values]
+
+
+class ThermometerStrategy(DeviceStrategy):
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def should_send(self, data: any) -> bool:
+        if data > self.threshold:
+            return True
+        else:
+            return False
+
+    def evaluate(self, values):
+        if np is None:
+            return super().evaluate(values)
+        return np.asarray(values, dtype=np.float64) > self.threshold
+
+
+class MotionSensorStrategy(DeviceStrategy):
+    def __init__(self, state):
+        self.state = state
+
+    def should_send(self, data: any) -> bool:
+        if data == self.state:
+            return data == self.state
+        else:
+            return not data == self.state
+
+    def evaluate(self, values):
+        if np is None:
+            return super().evaluate(values)
+        # should_send fires whether or not the reading matches the state
+        return np.ones(len(values), dtype=bool)
+
+
+class SmartPlugStrategy(DeviceStrategy):
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def should_send(self, data: any) -> bool:
+        if data > self.threshold:
+            return True
+        else:
+            return False
+
+    def evaluate(self, values):
+        if np is None:
+            return super().evaluate(values)
+        return np.asarray(values, dtype=np.float64) > self.threshold
+
+
+class ThresholdStrategy(DeviceStrategy):
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def should_send(self, data: any) -> bool:
+        return data > self.threshold
+
+    def evaluate(self, values):
+        if np is None:
+            return super().evaluate(values)
+        return np.asarray(values, dtype=np.float64) > self.threshold
+
+
+class StateTable:
+    """Per-device strategy state packed into parallel array columns.
+
+    A device gets a slot on its first reading; each column then costs a few
+    bytes per device instead of a Python object.
+    """
+
+    def __init__(self, **columns):
+        self.slots = {}
+        self.columns = {name: array.array(code) for name, code in columns.items()}
+
+    def __len__(self):
+        return len(self.slots)
+
+    def slot(self, device_id):
+        slot = self.slots.get(device_id)
+        if slot is None:
+            slot = self.slots[device_id] = len(self.slots)
+            for column in self.columns.values():
+                column.append(0)
+        return slot
+
+
+class StatefulStrategy(DeviceStrategy):
+    stateful = True
+
+    def should_send(self, data: any) -> bool:
+        return self.observe(None, data)
+
+    @abstractmethod
+    def observe(self, device_id, data) -> bool:
+        pass
+
+
+class EwmaStrategy(StatefulStrategy):
+    """Fires while the exponentially weighted mean is above ``threshold``."""
+
+    def __init__(self, threshold, alpha=0.2):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be above 0 and at most 1")
+        self.threshold = threshold
+        self.alpha = alpha
+        self.state = StateTable(mean="d", seen="b")
+        self.means = self.state.columns["mean"]
+        self.seen = self.state.columns["seen"]
+
+    def observe(self, device_id, data) -> bool:
+        slot = self.state.slot(device_id)
+        if self.seen[slot]:
+            mean = self.means[slot] + self.alpha * (data - self.means[slot])
+        else:
+            mean = data
+            self.seen[slot] = 1
+        self.means[slot] = mean
+        return mean > self.threshold
+
+
+class WindowMeanStrategy(StatefulStrategy):
+    """Fires while the mean of the last ``window`` readings is above
+    ``threshold``; the mean is kept as a running sum."""
+
+    def __init__(self, threshold, window=10):
+        if not isinstance(window, int) or window < 1:
+            raise ValueError("window must be a positive whole number")
+        self.threshold = threshold
+        self.window = window
+        self.state = StateTable(total="d", count="l", position="l")
+        self.totals = self.state.columns["total"]
+        self.counts = self.state.columns["count"]
+        self.positions = self.state.columns["position"]
+        # slot * window + i holds a device's i-th ring entry
+        self.rings = array.array("d")
+
+    def observe(self, device_id, data) -> bool:
+        slot = self.state.slot(device_id)
+        window = self.window
+        if len(self.rings) <= slot * window:
+            self.rings.extend([0.0] * window)
+        i = slot * window + self.positions[slot]
+        if self.counts[slot] == window:
+            self.totals[slot] -= self.rings[i]
+        else:
+            self.counts[slot] += 1
+        self.rings[i] = data
+        self.totals[slot] += data
+        self.positions[slot] = (self.positions[slot] + 1) % window
+        return self.totals[slot] / self.counts[slot] > self.threshold
+
+
+class HysteresisStrategy(StatefulStrategy):
+    """Fires once when a reading rises above ``enter`` and re-arms only after
+    a reading falls below ``exit``, so a value hovering at the threshold
+    raises one alert instead of a storm."""
+
+    def __init__(self, enter, exit):
+        if exit > enter:
+            raise ValueError("exit must not be above enter")
+        self.enter = enter
+        self.exit = exit
+        self.state = StateTable(active="b")
+        self.active = self.state.columns["active"]
+
+    def observe(self, device_id, data) -> bool:
+        slot = self.state.slot(device_id)
+        if self.active[slot]:
+            if data < self.exit:
+                self.active[slot] = 0
+            return False
+        if data > self.enter:
+            self.active[slot] = 1
+            return True
+        return False
+
+
+class RateOfChangeStrategy(StatefulStrategy):
+    """Fires when a reading differs from the device's previous one by more
+    than ``max_delta``."""
+
+    def __init__(self, max_delta):
+        self.max_delta = max_delta
+        self.state = StateTable(last="d", seen="b")
+        self.last = self.state.columns["last"]
+        self.seen = self.state.columns["seen"]
+
+    def observe(self, device_id, data) -> bool:
+        slot = self.state.slot(device_id)
+        fired = self.seen[slot] and abs(data - self.last[slot]) > self.max_delta
+        self.last[slot] = data
+        self.seen[slot] = 1
+        return bool(fired)
+
+
+class EdgeStrategy(StatefulStrategy):
+    """Fires when a device's reading changes to ``state``, not on every
+    reading that equals it; a device's first reading counts as a change."""
+
+    def __init__(self, state=True):
+        self.target = bool(state)
+        # 0 unseen, 1 last reading False, 2 last reading True
+        self.state = StateTable(last="b")
+        self.last = self.state.columns["last"]
+
+    def observe(self, device_id, data) -> bool:
+        slot = self.state.slot(device_id)
+        current = 2 if data else 1
+        changed = self.last[slot] != current
+        self.last[slot] = current
+        return changed and bool(data) == self.target
+
+
+def evaluate_batch(strategies, device_types, values, vectorized=None, device_ids=None):
+    """Evaluate a chunk of readings, one strategy call per device type.
+
+    Returns a mask with one entry per reading; readings whose device type
+    has no strategy never fire. ``vectorized`` forces the NumPy path on or
+    off; by default it is used for chunks of ``VECTORIZE_MIN_BATCH`` or more.
+    Stateful strategies are fed reading by reading, in order, and need
+    ``device_ids``.
+    """
+    if vectorized is None:
+        vectorized = len(device_types) >= VECTORIZE_MIN_BATCH
+    if not vectorized or np is None:
+        groups = {}
+        for i, device_type in enumerate(device_types):
+            groups.setdefault(device_type, []).append(i)
+        mask = [False] * len(device_types)
+        for device_type, indices in groups.items():
+            strategy = strategies.get(device_type)
+            if strategy is None:
+                continue
+            if strategy.stateful:
+                for i in indices:
+                    mask[i] = strategy.observe(device_ids[i], values[i])
+            else:
+                for i in indices:
+                    mask[i] = strategy.should_send(values[i])
+        return mask
+
+    device_types = np.fromiter(device_types, dtype=np.int32, count=len(device_types))
+    values = np.fromiter(values, dtype=np.float64, count=len(values))
+    mask = np.zeros(len(device_types), dtype=bool)
+    for device_type, strategy in strategies.items():
+        group = device_types == device_type
+        if not group.any():
+            continue
+        if strategy.stateful:
+            for i in np.flatnonzero(group).tolist():
+                mask[i] = strategy.observe(device_ids[i], values[i])
+        else:
+            mask[group] = strategy.evaluate(values[group])
+    return mask
+
+
+def fired_indices(mask):
+    if np is not None and isinstance(mask, np.ndarray):
+        return np.flatnonzero(mask).tolist()
+    return [i for i, fired in enumerate(mask) if fired]
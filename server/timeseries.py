@@ -0,0 +1,155 @@
+import array
+
+SECOND = 1_000_000_000
+MINUTE = 60 * SECOND
+
+
+def ring_index(head, size, capacity, i):
+    return (head - size + i) % capacity
+
+
+def lower_bound(keys, head, size, target):
+    """Logical position of the first key >= ``target`` in a ring of sorted
+    keys, where ``head`` is the next slot to be written."""
+    capacity = len(keys)
+    low, high = 0, size
+    while low < high:
+        middle = (low + high) // 2
+        if keys[(head - size + middle) % capacity] < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Rollup:
+    """Fixed ring of min/max/sum/count buckets ``width`` nanoseconds wide.
+
+    The newest bucket is updated in place as readings arrive, so queries
+    never touch raw history.
+    """
+
+    __slots__ = ("width", "starts", "mins", "maxs", "sums", "counts", "head", "size")
+
+    def __init__(self, width, capacity):
+        self.width = width
+        self.starts = array.array("q", bytes(8 * capacity))
+        self.mins = array.array("d", bytes(8 * capacity))
+        self.maxs = array.array("d", bytes(8 * capacity))
+        self.sums = array.array("d", bytes(8 * capacity))
+        self.counts = array.array("q", bytes(8 * capacity))
+        self.head = 0
+        self.size = 0
+
+    def add(self, timestamp, value):
+        start = timestamp - timestamp % self.width
+        capacity = len(self.starts)
+        last = (self.head - 1) % capacity
+        if self.size and self.starts[last] == start:
+            if value < self.mins[last]:
+                self.mins[last] = value
+            if value > self.maxs[last]:
+                self.maxs[last] = value
+            self.sums[last] += value
+            self.counts[last] += 1
+            return
+        i = self.head
+        self.starts[i] = start
+        self.mins[i] = self.maxs[i] = self.sums[i] = value
+        self.counts[i] = 1
+        self.head = (i + 1) % capacity
+        if self.size < capacity:
+            self.size += 1
+
+    def query(self, start, end):
+        """Buckets overlapping [start, end) as (starts, mins, maxs, means, counts)."""
+        capacity = len(self.starts)
+        first = lower_bound(
+            self.starts, self.head, self.size, start - start % self.width
+        )
+        last = lower_bound(self.starts, self.head, self.size, end)
+        result = ([], [], [], [], [])
+        for position in range(first, last):
+            i = ring_index(self.head, self.size, capacity, position)
+            result[0].append(self.starts[i])
+            result[1].append(self.mins[i])
+            result[2].append(self.maxs[i])
+            result[3].append(self.sums[i] / self.counts[i])
+            result[4].append(self.counts[i])
+        return result
+
+
+class Series:
+    __slots__ = ("timestamps", "values", "head", "size", "rollups")
+
+    def __init__(self, capacity, rollups):
+        self.timestamps = array.array("q", bytes(8 * capacity))
+        self.values = array.array("d", bytes(8 * capacity))
+        self.head = 0
+        self.size = 0
+        self.rollups = {width: Rollup(width, count) for width, count in rollups}
+
+    def append(self, timestamp, value):
+        capacity = len(self.timestamps)
+        if self.size:
+            # keep the ring sorted even if the clock steps back
+            timestamp = max(timestamp, self.timestamps[(self.head - 1) % capacity])
+        i = self.head
+        self.timestamps[i] = timestamp
+        self.values[i] = value
+        self.head = (i + 1) % capacity
+        if self.size < capacity:
+            self.size += 1
+        for rollup in self.rollups.values():
+            rollup.add(timestamp, value)
+
+    def query(self, start, end):
+        capacity = len(self.timestamps)
+        first = lower_bound(self.timestamps, self.head, self.size, start)
+        last = lower_bound(self.timestamps, self.head, self.size, end)
+        timestamps = []
+        values = []
+        for position in range(first, last):
+            i = ring_index(self.head, self.size, capacity, position)
+            timestamps.append(self.timestamps[i])
+            values.append(self.values[i])
+        return timestamps, values
+
+
+class TimeSeriesStore:
+    """Recent readings per device in preallocated rings.
+
+    Each device gets ``capacity`` raw (timestamp, value) slots plus one ring
+    of rollup buckets per ``(width_ns, buckets)`` pair, allocated on its first
+    reading. Timestamps are server receive times in Unix nanoseconds; motion
+    readings are stored as 1.0 or 0.0.
+    """
+
+    def __init__(self, capacity=600, rollups=((SECOND, 300), (MINUTE, 120))):
+        self.capacity = capacity
+        self.rollup_sizes = tuple((width, count) for width, count in rollups if count)
+        self.series = {}
+
+    def widths(self):
+        return [width for width, _ in self.rollup_sizes]
+
+    def bytes_per_device(self):
+        return 16 * self.capacity + 40 * sum(count for _, count in self.rollup_sizes)
+
+    def append(self, device_id, timestamp, value):
+        series = self.series.get(device_id)
+        if series is None:
+            series = self.series[device_id] = Series(self.capacity, self.rollup_sizes)
+        series.append(timestamp, value)
+
+    def query(self, device_id, start, end):
+        series = self.series.get(device_id)
+        if series is None:
+            return [], []
+        return series.query(start, end)
+
+    def rollup(self, device_id, width, start, end):
+        series = self.series.get(device_id)
+        if series is None:
+            return [], [], [], [], []
+        return series.rollups[width].query(start, end)
@@ -0,0 +1,140 @@
+import asyncio
+import cProfile
+import collections
+import io
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+
+from server.metrics import Histogram
+
+# where a traced reading spends its time, in order
+DECODE = "decode"
+DISPATCH = "dispatch"
+HISTORY = "history"
+EVALUATE = "evaluate"
+FANOUT = "fanout"
+QUEUE_WAIT = "queue_wait"
+WRITE = "write"
+STAGES = (DECODE, DISPATCH, HISTORY, EVALUATE, FANOUT, QUEUE_WAIT, WRITE)
+
+STAGE_BUCKETS = (
+    0.000001,
+    0.0000025,
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+
+
+class Tracer:
+    """Per-stage latency histograms for a sampled fraction of readings.
+
+    A reading is picked when its ``Data`` message is decoded; its decode,
+    dispatch, history, evaluate and fanout stages are then timed on the way
+    through ``process_reading``. Alerts are sampled at the same rate as
+    their streams write them, for the time spent queued and in the write.
+    While disabled the hot path pays one attribute check per stage.
+    """
+
+    def __init__(self, sample_rate=0.01):
+        self.enabled = False
+        self.sample_rate = sample_rate
+        self.histograms = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+        # the last message picked by the deserializer, claimed by its handler
+        self.decoded = None
+
+    def sample(self):
+        return self.enabled and random.random() < self.sample_rate
+
+    def observe(self, stage, seconds):
+        self.histograms[stage].observe(seconds)
+
+    def reset(self):
+        self.histograms = {stage: Histogram(STAGE_BUCKETS) for stage in STAGES}
+
+    def deserializer(self, from_string):
+        def deserialize(payload):
+            if not self.enabled or random.random() >= self.sample_rate:
+                return from_string(payload)
+            started = time.perf_counter()
+            message = from_string(payload)
+            self.observe(DECODE, time.perf_counter() - started)
+            self.decoded = message
+            return message
+
+        return deserialize
+
+    def claim(self, message):
+        """True if ``message`` was sampled when it was decoded."""
+        if self.decoded is message:
+            self.decoded = None
+            return True
+        return False
+
+
+async def profile_calls(seconds):
+    """cProfile of everything the event loop runs for ``seconds``; returns
+    the stats in the format ``pstats.Stats`` loads, and a text summary."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    # before pstats takes the stats over and empties the profiler
+    data = marshal.dumps(profiler.stats)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(30)
+    return data, summary.getvalue()
+
+
+async def profile_stacks(seconds, interval):
+    """Samples the event loop thread's stack every ``interval`` seconds for
+    ``seconds``; returns folded stacks (``outer;inner count`` lines, as
+    flame graph tools read them) and the functions seen most on top."""
+    thread_id = threading.get_ident()
+    stacks = await asyncio.to_thread(sample_stacks, thread_id, seconds, interval)
+    leaves = collections.Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    total = sum(stacks.values()) or 1
+    summary = [f"{total} samples"]
+    summary += [
+        f"{count / total:7.1%}  {frame}" for frame, count in leaves.most_common(30)
+    ]
+    folded = "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+    return folded.encode(), "\n".join(summary) + "\n"
+
+
+def sample_stacks(thread_id, seconds, interval):
+    stacks = collections.Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        if frames:
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return stacks
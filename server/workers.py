@@ -0,0 +1,287 @@
+import asyncio
+import collections
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import struct
+import sys
+import tempfile
+
+from gen import device_pb2
+from server.patterns import PatternIndex
+
+# kind, device type, device_id length, body length; the device type is any
+# int32, as proto3 keeps enum values it does not know
+FRAME = struct.Struct("!BiHI")
+HELLO = 0
+INTEREST = 1
+NO_INTEREST = 2
+ALERT = 3
+READING = 4
+BATCH = 5
+RULES = 6
+PATTERN_INTEREST = 7
+NO_PATTERN_INTEREST = 8
+
+
+def owner_of(device_id, workers):
+    return device_id % workers
+
+
+class WorkerMesh:
+    """Links the worker processes of one server over Unix sockets.
+
+    Worker ``index`` owns the device_ids with ``device_id % workers == index``.
+    Readings that land on another worker are forwarded to their owner, so all
+    of a device's readings are evaluated in one place. Each worker tells its
+    peers which devices have local subscribers, and an alert is only sent to
+    the peers that asked for that device.
+
+    Alerts and readings for a peer wait in its socket buffer; past
+    ``max_pending_bytes``, and while the peer is not connected yet, they
+    are dropped and counted in ``dropped``. Interest and rules are never
+    dropped.
+    """
+
+    def __init__(
+        self,
+        index,
+        workers,
+        socket_dir,
+        alert_manager,
+        device_service,
+        max_pending_bytes=16 * 1024 * 1024,
+    ):
+        self.index = index
+        self.workers = workers
+        self.socket_dir = socket_dir
+        self.alert_manager = alert_manager
+        self.device_service = device_service
+        self.peers = {}
+        # device_id -> indexes of peers with subscribers for it
+        self.remote_interest = collections.defaultdict(set)
+        # pattern subscriptions of peers, with the peer index as the client
+        self.remote_patterns = PatternIndex()
+        self.max_pending_bytes = max_pending_bytes
+        # peer index -> alerts and reading rows dropped for it
+        self.dropped = collections.Counter()
+        self.connecting = []
+        self.server = None
+
+    def socket_path(self, index):
+        return os.path.join(self.socket_dir, f"worker-{index}.sock")
+
+    async def start(self):
+        self.server = await asyncio.start_unix_server(
+            self.handle_peer, self.socket_path(self.index)
+        )
+        self.connecting = [
+            asyncio.create_task(self.connect(index))
+            for index in range(self.workers)
+            if index != self.index
+        ]
+        self.alert_manager.publisher = self
+        self.device_service.router = self
+
+    async def connect(self, index):
+        path = self.socket_path(index)
+        while True:
+            try:
+                _, writer = await asyncio.open_unix_connection(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(0.05)
+        self.peers[index] = writer
+        self.send(writer, HELLO, str(self.index))
+        for device_id in self.alert_manager.subscribers:
+            self.send(writer, INTEREST, device_id)
+        for pattern in self.alert_manager.pattern_index.clients:
+            self.send(writer, PATTERN_INTEREST, body=json.dumps(pattern).encode())
+
+    def send(self, writer, kind, device_id="", body=b"", device_type=0):
+        device_id = device_id.encode()
+        writer.write(
+            FRAME.pack(kind, device_type, len(device_id), len(body)) + device_id + body
+        )
+
+    def send_data(self, index, kind, device_id="", body=b"", device_type=0, count=1):
+        """Sends ``count`` alerts or reading rows to peer ``index``, unless
+        they are dropped."""
+        writer = self.peers.get(index)
+        if (
+            writer is None
+            or writer.is_closing()
+            or writer.transport.get_write_buffer_size() > self.max_pending_bytes
+        ):
+            self.dropped[index] += count
+            return
+        self.send(writer, kind, device_id, body, device_type)
+
+    def broadcast(self, kind, device_id="", body=b""):
+        for writer in self.peers.values():
+            self.send(writer, kind, device_id, body)
+
+    async def handle_peer(self, reader, writer):
+        peer = None
+        try:
+            while True:
+                header = await reader.readexactly(FRAME.size)
+                kind, device_type, device_id_size, body_size = FRAME.unpack(header)
+                device_id = (await reader.readexactly(device_id_size)).decode()
+                body = await reader.readexactly(body_size) if body_size else b""
+
+                if kind == ALERT:
+                    self.alert_manager.deliver(device_id, body, device_type)
+                elif kind == READING:
+                    await self.device_service.process_reading(
+                        device_pb2.Data.FromString(body)
+                    )
+                elif kind == BATCH:
+                    await self.device_service.process_batch(
+                        device_pb2.DataBatch.FromString(body)
+                    )
+                elif kind == RULES:
+                    self.device_service.set_rules(json.loads(body))
+                elif kind == INTEREST:
+                    self.remote_interest[device_id].add(peer)
+                elif kind == NO_INTEREST:
+                    peers = self.remote_interest.get(device_id)
+                    if peers is not None:
+                        peers.discard(peer)
+                        if not peers:
+                            del self.remote_interest[device_id]
+                elif kind == PATTERN_INTEREST:
+                    self.remote_patterns.add(tuple(json.loads(body)), peer)
+                elif kind == NO_PATTERN_INTEREST:
+                    self.remote_patterns.remove(tuple(json.loads(body)), peer)
+                elif kind == HELLO:
+                    peer = int(device_id)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+    # publisher interface used by AlertManager and DeviceService
+
+    def interest_changed(self, device_id, present):
+        self.broadcast(INTEREST if present else NO_INTEREST, device_id)
+
+    def pattern_interest_changed(self, pattern, present):
+        kind = PATTERN_INTEREST if present else NO_PATTERN_INTEREST
+        self.broadcast(kind, body=json.dumps(pattern).encode())
+
+    def interested(self, device_id, device_type):
+        if device_id in self.remote_interest:
+            return True
+        return bool(self.remote_patterns) and bool(
+            self.remote_patterns.match(device_id, device_type)
+        )
+
+    def publish(self, device_id, device_type, payload):
+        peers = self.remote_interest.get(device_id, ())
+        if self.remote_patterns:
+            matched = self.remote_patterns.match(device_id, device_type)
+            if matched:
+                matched.update(peers)
+                peers = matched
+        for index in peers:
+            self.send_data(index, ALERT, device_id, payload, device_type)
+
+    # router interface used by DeviceService
+
+    # rules set through one worker's admin RPC apply to all of them
+    def share_rules(self, rules_json):
+        self.broadcast(RULES, body=rules_json.encode())
+
+    def owns(self, device_id):
+        return device_id % self.workers == self.index
+
+    def forward_reading(self, data):
+        owner = owner_of(data.device_id, self.workers)
+        self.send_data(owner, READING, body=data.SerializeToString())
+
+    # forwards the rows other workers own and returns the local ones, or None
+    def route_batch(self, batch):
+        workers = self.workers
+        owners = [device_id % workers for device_id in batch.device_ids]
+        if all(owner == self.index for owner in owners):
+            return batch
+
+        parts = split_batch(batch, owners)
+        local = parts.pop(self.index, None)
+        for owner, part in parts.items():
+            self.send_data(
+                owner, BATCH, body=part.SerializeToString(), count=len(part.device_ids)
+            )
+        return local
+
+    def owner_label(self, device_id):
+        return f"worker {owner_of(device_id, self.workers)}"
+
+    def stats(self):
+        stats = {}
+        for index in range(self.workers):
+            if index != self.index:
+                writer = self.peers.get(index)
+                stats[index] = {
+                    "connected": writer is not None,
+                    "pending_bytes": (
+                        writer.transport.get_write_buffer_size() if writer else 0
+                    ),
+                    "dropped": self.dropped[index],
+                }
+        return stats
+
+
+def split_batch(batch, owners):
+    """Splits ``batch`` into a DataBatch per owner, given each row's owner."""
+    parts = collections.defaultdict(device_pb2.DataBatch)
+    nanos = bool(batch.timestamps_unix_nanos)
+    timestamps = batch.timestamps_unix_nanos if nanos else batch.timestamps
+    for i, owner in enumerate(owners):
+        part = parts[owner]
+        part.device_ids.append(batch.device_ids[i])
+        part.device_types.append(batch.device_types[i])
+        if nanos:
+            part.timestamps_unix_nanos.append(timestamps[i])
+        else:
+            part.timestamps.append(timestamps[i])
+        part.values.append(batch.values[i])
+    return parts
+
+
+def run_worker(index, workers, socket_dir, use_uvloop, kwargs):
+    # deferred because server.server imports this module
+    from server.server import serve, uvloop
+
+    if use_uvloop:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(serve(worker=(index, workers, socket_dir), **kwargs))
+
+
+def serve_workers(workers, use_uvloop=False, **kwargs):
+    """Run ``workers`` server processes sharing one port via SO_REUSEPORT."""
+    # turn SIGTERM into an exit so the workers are stopped with us
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="iot-workers-") as socket_dir:
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(index, workers, socket_dir, use_uvloop, kwargs),
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            # one worker dying takes the whole server down
+            multiprocessing.connection.wait([p.sentinel for p in processes])
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()